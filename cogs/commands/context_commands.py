@@ -1,10 +1,9 @@
 import functools
 import random
 from datetime import datetime
-from io import BytesIO
 
 import discord
-from cogs.commands.info.tags import prepare_tag_embed, prepare_tag_view
+from cogs.commands.info.tags import prepare_tag_embed, prepare_tag_file, prepare_tag_view
 from cogs.commands.info.userinfo import handle_userinfo
 from data.services import guild_service
 from discord.ext import commands
@@ -17,8 +16,7 @@ from utils.views import PFPButton, PFPView
 from utils.views.menus.report import manual_report
 from utils.views.menus.report_action import WarnView
 
-support_tags = [tag.name for tag in guild_service.get_guild(
-).tags if "support" in tag.name]
+support_tags = [tag.name for tag in guild_service.get_tags() if "support" in tag.name]
 
 tag_cooldown = CooldownMapping.from_cooldown(
     1, 5, MessageTextBucket.custom)
@@ -48,13 +46,10 @@ async def handle_support_tag(ctx: GIRContext, member: discord.Member) -> None:
         raise commands.BadArgument("That tag is on cooldown.")
 
     # if the Tag has an image, add it to the embed
-    file = tag.image.read()
-    if file is not None:
-        file = discord.File(BytesIO(
-            file), filename="image.gif" if tag.image.content_type == "image/gif" else "image.png")
+    file = prepare_tag_file(tag)
 
     title = f"Hey {member.mention}, have a look at this!"
-    await ctx.respond_or_edit(content=title, embed=prepare_tag_embed(tag), file=file or discord.utils.MISSING, view=prepare_tag_view(tag))
+    await ctx.respond_or_edit(content=title, embed=prepare_tag_embed(tag), file=file, view=prepare_tag_view(tag))
 
 
 async def handle_avatar(ctx, member: discord.Member):
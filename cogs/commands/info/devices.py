@@ -4,8 +4,7 @@ from collections import defaultdict
 import discord
 from discord import app_commands
 from discord.ext import commands
-from utils import (GIRContext, cfg, get_ios_cfw, transform_context,
-                   transform_groups)
+from utils import GIRContext, cfg, get_appledb, transform_context
 from utils.framework import (DeviceTransformer, VersionOnDevice,
                              always_whisper,
                              ensure_invokee_role_lower_than_bot, whisper)
@@ -52,13 +51,13 @@ class Devices(commands.Cog):
             else:
                 return
 
-        response = await get_ios_cfw()
+        appledb = await get_appledb()
 
         # change the user's nickname!
         firmware = version.get("version")
         firmware = re.sub(r' beta (\d+)', r'b\1', firmware)
         device_id = device.get("devices")[0]
-        detailed_device = [ d for d in response.get("device") if d.get('key') == device_id ][0]
+        detailed_device = appledb.devices[device_id]
         name = detailed_device["soc"]
         new_nick = f"{new_nick} [{name}, {firmware}]"
 
@@ -10,11 +10,11 @@ import discord
 import psutil
 from datetime import datetime
 
-from data.services import user_service
+from data.services import guild_service, tag_image_cache, user_service
 from discord import app_commands
 from discord.ext import commands
 from discord.utils import format_dt
-from utils import GIRContext, cfg, transform_context, format_number
+from utils import GIRContext, appledb_load_stats, canister_package_cache, cfg, http_client, warmup, transform_context, format_number
 from utils.framework import mod_and_up, whisper
 
 def get_cpu_model():
@@ -146,6 +146,27 @@ class Stats(commands.Cog):
                         value=f"{floor(process.memory_info().rss/1000/1000)} MiB")
         embed.add_field(name="Python Version", value=platform.python_version())
 
+        guild_cache = guild_service.cache_stats
+        embed.add_field(name="Guild Cache",
+                        value=f"{format_number(guild_cache['hits'])} hits, {format_number(guild_cache['misses'])} misses, {format_number(guild_cache['refreshes'])} refreshes")
+
+        embed.add_field(name="Tag Image Cache",
+                        value=f"{tag_image_cache.hit_rate:.1%} hit rate, {len(tag_image_cache)} images, {floor(tag_image_cache.size / 1024 / 1024)} MiB")
+
+        if warmup.durations:
+            embed.add_field(name="Startup",
+                            value=", ".join(f"{name} {seconds:.1f}s" for name, seconds in warmup.durations.items()) + ("" if warmup.is_ready() else " (not ready)"))
+
+        embed.add_field(name="Canister Search Cache",
+                        value=f"{canister_package_cache.hit_rate:.1%} hit rate, {len(canister_package_cache)} searches")
+
+        embed.add_field(name="HTTP Requests",
+                        value=f"{format_number(http_client.total_requests)} requests, {format_number(http_client.total_errors)} errors, {http_client.average_latency() * 1000:.0f}ms average")
+
+        if appledb_load_stats["loads"]:
+            embed.add_field(name="AppleDB",
+                            value=f"{floor(appledb_load_stats['size'] / 1024 / 1024)} MiB, parsed in {appledb_load_stats['parse_seconds'] * 1000:.0f}ms, indexed in {appledb_load_stats['index_seconds'] * 1000:.0f}ms, {floor(appledb_load_stats['peak_memory'] / 1024 / 1024)} MiB peak while parsing and indexing")
+
         await ctx.respond(embed=embed, ephemeral=ctx.whisper)
 
 
@@ -1,16 +1,19 @@
 import re
+import traceback
 from datetime import datetime
 from io import BytesIO
 
 import discord
 from data.model.tag import Tag
 from data.services.guild_service import guild_service
+from data.services.image_cache import tag_image_cache
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord.ext.commands.cooldowns import CooldownMapping
 from utils import GIRContext, cfg, transform_context, format_number
 from utils.framework import (MessageTextBucket, gatekeeper,
                              genius_or_submod_and_up, whisper, ImageAttachment)
+from utils.logging import logger
 from utils.views import Menu, tags_autocomplete, EditTagModal, TagModal
 
 
@@ -20,7 +23,7 @@ def format_tag_page(_, entries, current_page, all_pages):
         title=f'All tags', color=discord.Color.blurple())
     for tag in entries:
         desc = f"Added by: {tag.added_by_tag}\nUsed {format_number(tag.use_count)} times"
-        if tag.image.read() is not None:
+        if tag.image.grid_id is not None:
             desc += "\nHas image attachment"
         embed.add_field(name=tag.name, value=desc)
     embed.set_footer(
@@ -46,14 +49,36 @@ def prepare_tag_embed(tag):
     embed.timestamp = tag.added_date
     embed.color = discord.Color.blue()
 
-    if tag.image.read() is not None:
-        embed.set_image(url="attachment://image.gif" if tag.image.content_type ==
+    image = tag_image_cache.read(tag.image)
+    if image is not None:
+        embed.set_image(url="attachment://image.gif" if image.content_type ==
                         "image/gif" else "attachment://image.png")
     embed.set_footer(
         text=f"Added by {tag.added_by_tag} | Used {format_number(tag.use_count)} times")
     return embed
 
 
+def prepare_tag_file(tag):
+    """Given a tag object, prepare the file to attach for its image, if it has one.
+    The image bytes are served from the image cache where possible.
+
+    Parameters
+    ----------
+    tag : Tag
+        Tag object from database
+
+    Returns
+    -------
+    discord.File
+        The image to attach, or discord.utils.MISSING
+    """
+    image = tag_image_cache.read(tag.image)
+    if image is None:
+        return discord.utils.MISSING
+
+    return discord.File(BytesIO(image.data), filename="image.gif" if image.content_type == "image/gif" else "image.png")
+
+
 def prepare_tag_view(tag: Tag):
     if not tag.button_links or tag.button_links is None:
         return discord.utils.MISSING
@@ -80,6 +105,24 @@ class Tags(commands.Cog):
         self.bot = bot
         self.tag_cooldown = CooldownMapping.from_cooldown(
             1, 5, MessageTextBucket.custom)
+        self.flush_uses.start()
+
+    async def cog_unload(self):
+        self.flush_uses.cancel()
+        # make sure no uses are lost when the bot shuts down
+        try:
+            guild_service.tag_store.flush_uses()
+        except Exception:
+            logger.error(traceback.format_exc())
+
+    @tasks.loop(seconds=30)
+    async def flush_uses(self):
+        """Background task to write the tag uses counted in memory to the database."""
+
+        try:
+            await guild_service.tag_store.flush_uses_async()
+        except Exception:
+            logger.error(traceback.format_exc())
 
     # @app_commands.guilds(cfg.guild_id)
     @app_commands.command(description="Display a tag")
@@ -102,12 +145,7 @@ class Tags(commands.Cog):
             raise commands.BadArgument("That tag is on cooldown.")
 
         # if the Tag has an image, add it to the embed
-        _file = tag.image.read()
-        if _file is not None:
-            _file = discord.File(BytesIO(
-                _file), filename="image.gif" if tag.image.content_type == "image/gif" else "image.png")
-        else:
-            _file = discord.utils.MISSING
+        _file = prepare_tag_file(tag)
 
         if user_to_mention is not None:
             title = f"Hey {user_to_mention.mention}, have a look at this!"
@@ -133,12 +171,7 @@ class Tags(commands.Cog):
             raise commands.BadArgument("That tag is on cooldown.")
 
         # if the Tag has an image, add it to the embed
-        _file = tag.image.read()
-        if _file is not None:
-            _file = discord.File(BytesIO(
-                _file), filename="image.gif" if tag.image.content_type == "image/gif" else "image.png")
-        else:
-            _file = discord.utils.MISSING
+        _file = prepare_tag_file(tag)
 
         if ctx.message.reference is not None:
             title = f"Hey {ctx.message.reference.resolved.author.mention}, have a look at this!"
@@ -151,7 +184,7 @@ class Tags(commands.Cog):
     @transform_context
     @whisper
     async def taglist(self, ctx: GIRContext):
-        _tags = sorted(guild_service.get_guild().tags, key=lambda tag: tag.name)
+        _tags = guild_service.get_tags()
 
         if len(_tags) == 0:
             raise commands.BadArgument("There are no tags defined.")
@@ -200,12 +233,9 @@ class Tags(commands.Cog):
         # store tag in database
         guild_service.add_tag(tag)
 
-        _file = tag.image.read()
-        if _file is not None:
-            _file = discord.File(BytesIO(
-                _file), filename="image.gif" if tag.image.content_type == "image/gif" else "image.png")
+        _file = prepare_tag_file(tag)
 
-        await ctx.send_followup(f"Added new tag!", file=_file or discord.utils.MISSING, embed=prepare_tag_embed(tag) or discord.utils.MISSING, view=prepare_tag_view(tag) or discord.utils.MISSING, delete_after=5)
+        await ctx.send_followup(f"Added new tag!", file=_file, embed=prepare_tag_embed(tag) or discord.utils.MISSING, view=prepare_tag_view(tag) or discord.utils.MISSING, delete_after=5)
 
     @genius_or_submod_and_up()
     @tags.command(description="Edit an existing tag")
@@ -233,11 +263,13 @@ class Tags(commands.Cog):
 
             image = await image.read()
             # save image bytes
+            tag_image_cache.invalidate(tag.image)
             if tag.image is not None:
                 tag.image.replace(image, content_type=content_type)
             else:
                 tag.image.put(image, content_type=content_type)
         else:
+            tag_image_cache.invalidate(tag.image)
             tag.image.delete()
 
         modal = EditTagModal(tag=tag, author=ctx.author)
@@ -253,12 +285,9 @@ class Tags(commands.Cog):
         # store tag in database
         guild_service.edit_tag(tag)
 
-        _file = tag.image.read()
-        if _file is not None:
-            _file = discord.File(BytesIO(
-                _file), filename="image.gif" if tag.image.content_type == "image/gif" else "image.png")
+        _file = prepare_tag_file(tag)
 
-        await ctx.send_followup(f"Edited tag!", file=_file or discord.utils.MISSING, embed=prepare_tag_embed(tag), view=prepare_tag_view(tag) or discord.utils.MISSING, delete_after=5)
+        await ctx.send_followup(f"Edited tag!", file=_file, embed=prepare_tag_embed(tag), view=prepare_tag_view(tag) or discord.utils.MISSING, delete_after=5)
 
     @genius_or_submod_and_up()
     @tags.command(description="Delete a tag")
@@ -273,6 +302,7 @@ class Tags(commands.Cog):
             raise commands.BadArgument("That tag does not exist.")
 
         if tag.image is not None:
+            tag_image_cache.invalidate(tag.image)
             tag.image.delete()
 
         guild_service.remove_tag(name)
@@ -9,7 +9,7 @@ from discord.ext import commands
 from discord.utils import format_dt
 from utils import GIRContext, cfg, transform_context
 from utils.framework import PermissionsFailure, gatekeeper, whisper
-from utils.views import Menu
+from utils.views import LazyPages, Menu
 
 
 def format_xptop_page(ctx, entries, current_page, all_pages):
@@ -57,8 +57,8 @@ def format_cases_page(ctx, entries, current_page, all_pages):
     ----------
     entry : dict
         "The dictionary for the entry"
-    all_pages : list
-        "All entries that we will eventually iterate through"
+    all_pages : LazyPages
+        "All pages that we will eventually iterate through"
     current_page : number
         "The number of the page that we are currently on"
 
@@ -68,14 +68,11 @@ def format_cases_page(ctx, entries, current_page, all_pages):
         "The embed that we will send"
 
     """
-    page_count = 0
+    page_count = all_pages.total
 
     user = ctx.case_user
     u = user_service.get_user(user.id)
 
-    for page in all_pages:
-        for case in page:
-            page_count = page_count + 1
     embed = discord.Embed(
         title=f'Cases - {u.warn_points} warn points', color=discord.Color.blurple())
     embed.set_author(name=user, icon_url=user.display_avatar)
@@ -238,19 +235,18 @@ class UserInfo(commands.Cog):
             raise PermissionsFailure(
                 f"You don't have permissions to check others' cases.")
 
-        # fetch user's cases from our database
-        results = user_service.get_cases(user.id)
-        if len(results.cases) == 0:
+        # count user's cases in our database, filtering out unmute cases
+        # because they are irrelevant. pages are fetched as they are shown
+        total = await user_service.aio.count_cases(user.id, exclude_types=("UNMUTE",))
+        if total == 0:
             return await ctx.send_warning(f'{user.mention} has no cases.', delete_after=5)
 
-        # filter out unmute cases because they are irrelevant
-        cases = [case for case in results.cases if case._type != "UNMUTE"]
-        # reverse so newest cases are first
-        cases.reverse()
+        async def fetch_page(page):
+            return await user_service.aio.get_cases_page(user.id, page, 10, exclude_types=("UNMUTE",))
 
         ctx.case_user = user
 
-        menu = Menu(ctx, cases, per_page=10,
+        menu = Menu(ctx, LazyPages(total, 10, fetch_page), per_page=10,
                     page_formatter=format_cases_page, whisper=ctx.whisper)
         await menu.start()
 
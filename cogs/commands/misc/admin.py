@@ -2,8 +2,8 @@ import traceback
 import discord
 from discord import app_commands
 from discord.ext import commands
-from data.services import guild_service
-from utils import GIRContext, cfg, transform_context, logger
+from data.services import guild_service, job_service, user_service
+from utils import GIRContext, cfg, transform_context, logger, warmup
 from utils.framework import admin_and_up, guild_owner_and_up
 from utils.framework.transformers import ImageAttachment
 
@@ -27,11 +27,10 @@ class Admin(commands.Cog):
     @app_commands.describe(mode="Set mode on or off")
     @transform_context
     async def sabbath(self, ctx: GIRContext, mode: bool = None):
-        g = guild_service.get_guild()
-        g.sabbath_mode = mode if mode is not None else not g.sabbath_mode
-        g.save()
+        mode = mode if mode is not None else not guild_service.get_guild().sabbath_mode
+        guild_service.set_sabbath_mode(mode)
 
-        await ctx.send_success(f"Set sabbath mode to {'on' if g.sabbath_mode else 'off'}!")
+        await ctx.send_success(f"Set sabbath mode to {'on' if mode else 'off'}!")
 
     @commands.command()
     @commands.is_owner()
@@ -49,6 +48,114 @@ class Admin(commands.Cog):
             await ctx.send("Done!")
 
 
+    @commands.command()
+    @commands.is_owner()
+    async def backfill_case_stats(self, ctx: commands.Context):
+        """Rebuild the precomputed case statistics used by /raidstats and /casestats."""
+        if ctx.author.id != cfg.owner_id:
+            return
+
+        try:
+            async with ctx.typing():
+                total = await user_service.aio.backfill_case_stats()
+        except Exception as e:
+            await ctx.send(f"An error occured\n```{e}```")
+            logger.error(traceback.format_exc())
+        else:
+            await ctx.send(f"Done! Counted {total} cases.")
+
+    @commands.command()
+    @commands.is_owner()
+    async def migrate_cases(self, ctx: commands.Context):
+        """Copy cases from the legacy per-user Cases documents to one document per case."""
+        if ctx.author.id != cfg.owner_id:
+            return
+
+        try:
+            async with ctx.typing():
+                migrated = await user_service.aio.migrate_cases()
+                total = await user_service.aio.backfill_case_stats()
+        except Exception as e:
+            await ctx.send(f"An error occured\n```{e}```")
+            logger.error(traceback.format_exc())
+        else:
+            await ctx.send(f"Done! Migrated {migrated} cases, counted {total} cases.")
+
+    @commands.command()
+    @commands.is_owner()
+    async def migrate_tags(self, ctx: commands.Context):
+        """Move tags and memes out of the Guild document into their own collection."""
+        if ctx.author.id != cfg.owner_id:
+            return
+
+        try:
+            async with ctx.typing():
+                moved = await guild_service.aio.migrate_tags()
+        except Exception as e:
+            await ctx.send(f"An error occured\n```{e}```")
+            logger.error(traceback.format_exc())
+        else:
+            await ctx.send(f"Done! Moved {moved} tags and memes.")
+
+    @commands.command()
+    @commands.is_owner()
+    async def migrate_jobs(self, ctx: commands.Context):
+        """Move pending unmutes, reminders, giveaways and birthdays from the old APScheduler job store."""
+        if ctx.author.id != cfg.owner_id:
+            return
+
+        try:
+            async with ctx.typing():
+                migrated, skipped = await job_service.aio.migrate_apscheduler_jobs()
+                await self.bot.tasks.load()
+        except Exception as e:
+            await ctx.send(f"An error occured\n```{e}```")
+            logger.error(traceback.format_exc())
+        else:
+            await ctx.send(f"Done! Migrated {migrated} jobs, skipped {skipped}.")
+
+    @commands.command()
+    @commands.is_owner()
+    async def rebuild_channel_caches(self, ctx: commands.Context):
+        """Rebuild the common issues and rules caches from the whole channel history."""
+        if ctx.author.id != cfg.owner_id:
+            return
+
+        try:
+            async with ctx.typing():
+                await self.bot.issue_cache.fetch_issue_cache(full=True)
+                await self.bot.rule_cache.fetch_rule_cache(full=True)
+        except Exception as e:
+            await ctx.send(f"An error occured\n```{e}```")
+            logger.error(traceback.format_exc())
+        else:
+            await ctx.send(f"Done! Cached {len(self.bot.issue_cache.cache)} issues and {len(self.bot.rule_cache.cache)} rules.")
+
+    @commands.command()
+    @commands.is_owner()
+    async def reload_caches(self, ctx: commands.Context, *names: str):
+        """Reload caches that are normally only loaded once per process, i.e the ban list
+        after a long outage. Reloads all of them if no names are given."""
+        if ctx.author.id != cfg.owner_id:
+            return
+
+        unknown = [name for name in names if name not in warmup.names]
+        if unknown:
+            raise commands.BadArgument(f"Unknown caches: {', '.join(unknown)}. Available: {', '.join(warmup.names)}")
+
+        warmup.mark_stale(*names)
+        try:
+            async with ctx.typing():
+                await warmup.run()
+        except Exception as e:
+            await ctx.send(f"An error occured\n```{e}```")
+            logger.error(traceback.format_exc())
+        else:
+            reloaded = names or warmup.names
+            failed = [name for name in reloaded if name in warmup.failures]
+            timings = ", ".join(f"{name} {warmup.durations[name]:.2f}s" for name in reloaded if name in warmup.durations)
+            await ctx.send(f"Done! Reloaded {timings}." + (f" Failed: {', '.join(failed)}" if failed else ""))
+
     @commands.command()
     @commands.is_owner()
     async def clear_guild_commands(self, ctx: commands.Context, guild_id: int):
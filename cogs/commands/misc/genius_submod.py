@@ -5,7 +5,7 @@ import re
 import discord
 from discord import app_commands
 from discord.ext import commands
-from utils import GIRContext, cfg
+from utils import CachedMessage, GIRContext, cfg, warmup
 from utils.context import transform_context
 from utils.framework import genius_or_submod_and_up, whisper_in_general, submod_or_admin_and_up, ImageAttachment, gatekeeper
 from utils.views import CommonIssueModal, EditCommonIssue, issue_autocomplete, GenericDescriptionModal
@@ -79,7 +79,8 @@ class Genius(commands.Cog):
 
         embed, f, view = await prepare_issue_response(title, description, ctx.author, buttons, image)
 
-        await channel.send(embed=embed, file=f, view=view)
+        message = await channel.send(embed=embed, file=f, view=view)
+        await self.bot.issue_cache.handle_message(message)
         await ctx.send_success("Common issue posted!", delete_after=5, followup=True)
         await self.do_reindex(channel)
 
@@ -99,7 +100,7 @@ class Genius(commands.Cog):
             raise commands.BadArgument(
                 "Issue not found! Title must match one of the embeds exactly, use autocomplete to help!")
 
-        message: discord.Message = self.bot.issue_cache.cache[title]
+        message: CachedMessage = self.bot.issue_cache.cache[title]
 
         # prompt the user for common issue body
         modal = EditCommonIssue(
@@ -117,7 +118,8 @@ class Genius(commands.Cog):
 
         embed, f, view = await prepare_issue_response(title, description, ctx.author, buttons, image)
         embed.set_footer(text=message.embeds[0].footer.text)
-        await message.edit(embed=embed, attachments=[f] if f is not None else [], view=view)
+        edited = await channel.get_partial_message(message.id).edit(embed=embed, attachments=[f] if f is not None else [], view=view)
+        await self.bot.issue_cache.handle_message(edited)
         await ctx.send_success("Common issue edited!", delete_after=5, followup=True)
         await self.do_reindex(channel)
 
@@ -158,7 +160,7 @@ class Genius(commands.Cog):
             raise commands.BadArgument("common issues channel not found")
 
         await ctx.defer(ephemeral=True)
-        res = await self.do_reindex(channel)
+        res = await self.do_reindex(channel, full=True)
 
         if res is None:
             raise commands.BadArgument("Something unexpected occured")
@@ -166,25 +168,26 @@ class Genius(commands.Cog):
         count, page = res
         await ctx.send_success(f"Indexed {count} issues and posted {page} Table of Contents embeds!")
 
-    async def do_reindex(self, channel):
-        contents = {}
-        async for message in channel.history(limit=None, oldest_first=True):
-            if message.author.id != self.bot.user.id:
-                continue
+    async def do_reindex(self, channel, full: bool = False):
+        """Reposts the table of contents of the common issues.
 
-            if not message.embeds:
-                continue
+        The issues and previous table of contents messages come from the issue cache;
+        the channel history is only read again if `full` is set.
+        """
 
-            embed = message.embeds[0]
-            if not embed.footer.text:
-                continue
+        issue_cache = self.bot.issue_cache
+        if full:
+            await issue_cache.fetch_issue_cache(full=True)
 
-            if embed.footer.text.startswith("Submitted by"):
-                contents[f"{embed.title}"] = message
-            elif embed.footer.text.startswith("Table of Contents"):
-                await message.delete()
-            else:
-                continue
+        old_toc_message_ids = list(issue_cache.toc_message_ids)
+        for message_id in old_toc_message_ids:
+            try:
+                await channel.get_partial_message(message_id).delete()
+            except discord.NotFound:
+                pass
+        await issue_cache.handle_delete(channel.id, old_toc_message_ids)
+
+        contents = issue_cache.cache
 
         page = 1
         count = 1
@@ -197,14 +200,13 @@ class Genius(commands.Cog):
             if len(toc_embed.description) + len(this_line) < 4096:
                 toc_embed.description += this_line
             else:
-                await channel.send(embed=toc_embed)
+                await issue_cache.handle_message(await channel.send(embed=toc_embed))
                 page += 1
                 toc_embed.description = ""
                 toc_embed.title = ""
                 toc_embed.set_footer(text=f"Table of Contents • Page {page}")
 
-        self.bot.issue_cache.cache = contents
-        await channel.send(embed=toc_embed)
+        await issue_cache.handle_message(await channel.send(embed=toc_embed))
         return count, page
 
     @genius_or_submod_and_up()
@@ -254,11 +256,14 @@ class Genius(commands.Cog):
     @transform_context
     @whisper_in_general
     async def issue(self, ctx: GIRContext, title: str, user_to_mention: discord.Member = None):
+        if not warmup.is_ready("issues"):
+            raise commands.BadArgument("The common issues are still being loaded, try again in a moment.")
+
         if title not in self.bot.issue_cache:
             raise commands.BadArgument(
                 "Issue not found! Title must match one of the embeds exactly, use autocomplete to help!")
 
-        message: discord.Message = self.bot.issue_cache.cache[title]
+        message: CachedMessage = self.bot.issue_cache.cache[title]
         embed = message.embeds[0]
         view = discord.ui.View()
         components = message.components
@@ -117,7 +117,7 @@ class Giveaway(commands.Cog):
         elif giveaway.is_ended:
             raise commands.BadArgument("That giveaway has already ended.")
 
-        ctx.tasks.tasks.remove_job(str(int(message_id) + 2), 'default')
+        ctx.tasks.cancel_end_giveaway(int(message_id))
         await end_giveaway(giveaway.channel, message_id, giveaway.winners)
 
         await ctx.send_success("Giveaway ended!", delete_after=5)
@@ -3,8 +3,8 @@ import datetime
 import discord
 from discord import app_commands
 from discord.ext import commands
-from utils import (GIRContext, cfg, get_ios_cfw, get_ipsw_firmware_info,
-                   transform_context, transform_groups)
+from utils import (GIRContext, cfg, get_appledb, get_ipsw_firmware_info,
+                   transform_context)
 from utils.framework import whisper, whisper_in_general, whisper_outside_jb_and_geniusbar_unless_genius
 from utils.framework.transformers import (DeviceTransformer,
                                           VersionOnDevice)
@@ -96,15 +96,12 @@ class iOSCFW(commands.Cog):
     @transform_context
     @whisper_outside_jb_and_geniusbar_unless_genius
     async def jailbreak(self, ctx: GIRContext, name: str, user_to_mention: discord.Member = None) -> None:
-        response = await get_ios_cfw()
+        appledb = await get_appledb()
 
-        jbs = response.get("jailbreak")
-        matching_jbs = [jb for jb in jbs if jb.get(
-            "name").lower() == name.lower()]
-        if not matching_jbs:
+        jb = appledb.find_jailbreak(name)
+        if jb is None:
             raise commands.BadArgument("No jailbreak found with that name.")
 
-        jb = matching_jbs[0]
         info = jb.get('info')
 
         color = info.get("color")
@@ -174,20 +171,12 @@ class iOSCFW(commands.Cog):
     @transform_context
     @whisper_in_general
     async def firmware(self, ctx: GIRContext, version: str) -> None:
-        response = await get_ios_cfw()
-        og_version = version
-        for os_version in ["iOS", "tvOS", "watchOS", "audioOS"]:
-            version = version.replace(os_version + " ", "")
-        ios = response.get("ios")
-        # ios = [i for _, i in ios.items()]
+        appledb = await get_appledb()
+        matching_ios = appledb.find_firmware(version)
 
-        ios = [ios for ios in ios if f"{ios.get('osStr')} {ios.get('version')} ({ios.get('build')})" == og_version or ios.get(
-            'uniqueBuild').lower() == version.lower() or ios.get('version').lower() == version.lower()]
-
-        if not ios:
+        if matching_ios is None:
             raise commands.BadArgument("No firmware found with that version.")
 
-        matching_ios = ios[0]
         embed, view = await self.do_firmware_response(ctx, matching_ios)
         await ctx.respond(embed=embed, view=view, ephemeral=ctx.whisper)
 
@@ -198,19 +187,12 @@ class iOSCFW(commands.Cog):
     @transform_context
     @whisper_in_general
     async def betafirmware(self, ctx: GIRContext, version: str) -> None:
-        response = await get_ios_cfw()
-        og_version = version
-        for os_version in ["iOS", "tvOS", "watchOS", "audioOS"]:
-            version = version.replace(os_version + " ", "")
-        ios = response.get("ios")
-        # ios = [i for _, i in ios.items()]
-        ios = [ios for ios in ios if (f"{ios.get('osStr')} {ios.get('version')} ({ios.get('build')})" == og_version or ios.get(
-            'uniqueBuild').lower() == version.lower() or ios.get('version').lower() == version.lower()) and ios.get('beta')]
-
-        if not ios:
+        appledb = await get_appledb()
+        matching_ios = appledb.find_firmware(version, beta=True)
+
+        if matching_ios is None:
             raise commands.BadArgument("No firmware found with that version.")
 
-        matching_ios = ios[0]
         embed, view = await self.do_firmware_response(ctx, matching_ios)
         await ctx.respond(embed=embed, view=view, ephemeral=ctx.whisper)
 
@@ -280,23 +262,16 @@ class iOSCFW(commands.Cog):
     @whisper_in_general
     async def deviceinfo(self, ctx: GIRContext, device: str) -> None:
         await ctx.defer()
-        response = await get_ios_cfw()
-        all_devices = response.get("group")
-        transformed_devices = transform_groups(all_devices)
-        devices = [d for d in transformed_devices if d.get('name').lower() == device.lower(
-        ) or device.lower() in [x.lower() for x in d.get('devices')]]
+        appledb = await get_appledb()
+        matching_device_group = appledb.find_group(device)
 
-        if not devices:
+        if matching_device_group is None:
             raise commands.BadArgument("No device found with that name.")
 
-        matching_device_group = devices[0]
-
         embed = discord.Embed(title=matching_device_group.get(
             'name'), color=discord.Color.random())
 
-        real = response.get("device")
-        models = [
-            dev for dev in real if dev.get('key') in matching_device_group.get("devices")]
+        models = [appledb.devices[key] for key in matching_device_group.get("devices") if key in appledb.devices]
         model_numbers = []
         model_names = ""
         for model_number in models:
@@ -314,10 +289,7 @@ class iOSCFW(commands.Cog):
         embed.add_field(name="Model(s)", value='`' +
                         "`, `".join(model_numbers) + "`", inline=True)
 
-        ios = response.get("ios")
-        # ios = [i for _, i in ios.items()]
-        supported_firmwares = [firmware for firmware in ios if model_number.get(
-            "key") in firmware.get("devices")]
+        supported_firmwares = list(appledb.firmwares_for_device(model_number.get("key")))
         supported_firmwares.sort(key=lambda x: x.get("released") or "")
 
         if supported_firmwares:
@@ -357,27 +329,10 @@ class iOSCFW(commands.Cog):
     @whisper
     async def canijailbreak(self, ctx: GIRContext, device: DeviceTransformer, version: VersionOnDevice) -> None:
         await ctx.defer()
-        response = await get_ios_cfw()
-        found_jbs = []
-        jailbreaks = response.get("jailbreak")
-        # jailbreaks = [jb for _, jb in jailbreaks.items()]
-        for jb in jailbreaks:
-            if jb.get("compatibility") is None:
-                continue
-
-            potential_version = None
-            for jb_version in jb.get("compatibility"):
-                if any(d in jb_version.get("devices") for d in device.get("devices")) and version.get("build") in jb_version.get("firmwares"):
-                    if potential_version is None:
-                        potential_version = jb_version
-                    elif potential_version.get("priority") is None and jb_version.get("priority") is not None:
-                        potential_version = jb_version
-                    elif potential_version.get("priority") is not None and jb_version.get("priority") is not None and jb_version.get("priority") < potential_version.get("priority"):
-                        potential_version = jb_version
-
-            if potential_version is not None:
-                jb["compatibility"] = [potential_version]
-                found_jbs.append(jb)
+        appledb = await get_appledb()
+        # copy so the loaded data keeps every compatibility entry
+        found_jbs = [dict(jb, compatibility=[potential_version]) for jb, potential_version
+                     in appledb.jailbreak_matrix.jailbreaks_for(device.get("devices"), version.get("build"))]
 
         if not found_jbs:
             embed = discord.Embed(
@@ -404,6 +359,38 @@ class iOSCFW(commands.Cog):
                            show_skip_buttons=False, whisper=ctx.whisper)
             await menu.start()
 
+    # @app_commands.guilds(cfg.guild_id)
+    @app_commands.command(description="List the versions a device can be jailbroken on")
+    @app_commands.describe(device="Name or device identifier of the device")
+    @app_commands.autocomplete(device=jailbreakable_device_autocomplete)
+    @transform_context
+    @whisper
+    async def jailbreakableversions(self, ctx: GIRContext, device: DeviceTransformer) -> None:
+        appledb = await get_appledb()
+        ranges = appledb.jailbreakable_version_ranges(device.get("devices")[0])
+
+        if not ranges:
+            embed = discord.Embed(
+                description=f"Sorry, **{device.get('name')}** is not jailbreakable on any version.", color=discord.Color.red())
+            await ctx.respond_or_edit(embed=embed, ephemeral=ctx.whisper)
+            return
+
+        lines = []
+        for lowest, highest in ranges:
+            if lowest is highest:
+                lines.append(f"{lowest.get('osStr')} {lowest.get('version')}")
+            else:
+                lines.append(f"{lowest.get('osStr')} {lowest.get('version')} - {highest.get('version')}")
+
+        description = "\n".join(lines)
+        if len(description) > 4000:
+            description = description[:4000] + "\n..."
+
+        embed = discord.Embed(title=f"Jailbreakable versions for {device.get('name')}",
+                              description=description, color=discord.Color.green())
+        embed.set_footer(text="Use /canijailbreak to see which jailbreaks work on a version • Powered by https://appledb.dev")
+        await ctx.respond_or_edit(embed=embed, ephemeral=ctx.whisper)
+
     # @app_commands.guilds(cfg.guild_id)
     @app_commands.command(description="Find out how to bypass jailbreak detection for an app")
     @app_commands.describe(app="Name of the app")
@@ -411,9 +398,8 @@ class iOSCFW(commands.Cog):
     @transform_context
     @whisper_in_general
     async def bypass(self, ctx: GIRContext, app: str):
-        data = await get_ios_cfw()
-        bypasses = data.get('bypass')
-        matching_apps = [body for body in bypasses if app.lower() in body.get("name").lower() or app.lower() in body.get("bundleId").lower()]
+        appledb = await get_appledb()
+        matching_apps = [body for body in appledb.bypasses if app.lower() in body.get("name").lower() or app.lower() in body.get("bundleId").lower()]
 
         if not matching_apps:
             raise commands.BadArgument(
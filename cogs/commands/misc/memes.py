@@ -1,21 +1,24 @@
 import random
 import re
+import traceback
 from datetime import datetime
 from io import BytesIO
 
 import aiohttp
 import discord
+from cogs.commands.info.tags import prepare_tag_file
 from data.model import Tag
-from data.services import guild_service
+from data.services import guild_service, tag_image_cache
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord.ext.commands.cooldowns import CooldownMapping
-from utils import GIRContext, cfg, format_number, transform_context
+from utils import GIRContext, cfg, format_number, http_client, transform_context
 from utils.framework import (ImageAttachment, MessageTextBucket,
                              find_triggered_filters,
                              find_triggered_raid_phrases, gatekeeper,
                              memed_and_up, mempro_and_up, mod_and_up, whisper)
 from utils.framework.filter import has_only_silent_filtered_words
+from utils.logging import logger
 from utils.views import GenericDescriptionModal, Menu, memes_autocomplete
 
 
@@ -24,7 +27,7 @@ def format_meme_page(_, entries, current_page, all_pages):
         title=f'All memes', color=discord.Color.blurple())
     for meme in entries:
         desc = f"Added by: {meme.added_by_tag}\nUsed {format_number(meme.use_count)} {'time' if meme.use_count == 1 else 'times'}"
-        if meme.image.read() is not None:
+        if meme.image.grid_id is not None:
             desc += "\nHas image attachment"
         embed.add_field(name=meme.name, value=desc)
     embed.set_footer(
@@ -44,6 +47,24 @@ class Memes(commands.Cog):
         self.meme_phrases = ["{user}, have a look at this funny meme! LOL!", "Hey, {user}. Have a look at this knee-slapper!",
                              "{user}, look at this meme! Just don't show Aaron.", "{user} 😂😂😂😂😭😭😭😭"]
         self.snipe_cache = {}
+        self.flush_uses.start()
+
+    async def cog_unload(self):
+        self.flush_uses.cancel()
+        # make sure no uses are lost when the bot shuts down
+        try:
+            guild_service.meme_store.flush_uses()
+        except Exception:
+            logger.error(traceback.format_exc())
+
+    @tasks.loop(seconds=30)
+    async def flush_uses(self):
+        """Background task to write the meme uses counted in memory to the database."""
+
+        try:
+            await guild_service.meme_store.flush_uses_async()
+        except Exception:
+            logger.error(traceback.format_exc())
 
     @app_commands.guilds(cfg.guild_id)
     @app_commands.command(description="Display a meme.")
@@ -65,10 +86,7 @@ class Memes(commands.Cog):
             raise commands.BadArgument("That meme is on cooldown.")
 
         # if the Meme has an image, add it to the embed
-        file = meme.image.read()
-        if file is not None:
-            file = discord.File(BytesIO(
-                file), filename="image.gif" if meme.image.content_type == "image/gif" else "image.png")
+        file = prepare_tag_file(meme)
 
         if user_to_mention is not None:
             title = random.choice(self.meme_phrases).format(
@@ -76,15 +94,14 @@ class Memes(commands.Cog):
         else:
             title = None
 
-        await ctx.respond(content=title, embed=await self.prepare_meme_embed(meme), file=file or discord.utils.MISSING)
+        await ctx.respond(content=title, embed=await self.prepare_meme_embed(meme), file=file)
 
     @app_commands.guilds(cfg.guild_id)
     @app_commands.command(description="List all memes")
     @transform_context
     @whisper
     async def memelist(self, ctx: GIRContext):
-        memes = sorted(guild_service.get_guild().memes,
-                       key=lambda meme: meme.name)
+        memes = guild_service.get_memes()
 
         if len(memes) == 0:
             raise commands.BadArgument("There are no memes defined.")
@@ -142,12 +159,9 @@ class Memes(commands.Cog):
         # store meme in database
         guild_service.add_meme(meme)
 
-        _file = meme.image.read()
-        if _file is not None:
-            _file = discord.File(BytesIO(
-                _file), filename="image.gif" if meme.image.content_type == "image/gif" else "image.png")
+        _file = prepare_tag_file(meme)
 
-        await ctx.respond(f"Added new meme!", file=_file or discord.utils.MISSING, embed=await self.prepare_meme_embed(meme))
+        await ctx.respond(f"Added new meme!", file=_file, embed=await self.prepare_meme_embed(meme))
 
     @mod_and_up()
     @memes.command(description="Edit an existing meme")
@@ -186,22 +200,21 @@ class Memes(commands.Cog):
             image = await image.read()
 
             # save image bytes
+            tag_image_cache.invalidate(meme.image)
             if meme.image is not None:
                 meme.image.replace(image, content_type=_type)
             else:
                 meme.image.put(image, content_type=_type)
         else:
+            tag_image_cache.invalidate(meme.image)
             meme.image.delete()
 
         if not guild_service.edit_meme(meme):
             raise commands.BadArgument("An error occurred editing that meme.")
 
-        _file = meme.image.read()
-        if _file is not None:
-            _file = discord.File(BytesIO(
-                _file), filename="image.gif" if meme.image.content_type == "image/gif" else "image.png")
+        _file = prepare_tag_file(meme)
 
-        await ctx.respond(f"Meme edited!", file=_file or discord.utils.MISSING, embed=await self.prepare_meme_embed(meme))
+        await ctx.respond(f"Meme edited!", file=_file, embed=await self.prepare_meme_embed(meme))
 
     @mod_and_up()
     @memes.command(description="Delete a meme")
@@ -216,6 +229,7 @@ class Memes(commands.Cog):
             raise commands.BadArgument("That meme does not exist.")
 
         if meme.image is not None:
+            tag_image_cache.invalidate(meme.image)
             meme.image.delete()
 
         guild_service.remove_meme(name)
@@ -239,8 +253,9 @@ class Memes(commands.Cog):
         embed.timestamp = meme.added_date
         embed.color = discord.Color.blue()
 
-        if meme.image.read() is not None:
-            embed.set_image(url="attachment://image.gif" if meme.image.content_type ==
+        image = tag_image_cache.read(meme.image)
+        if image is not None:
+            embed.set_image(url="attachment://image.gif" if image.content_type ==
                             "image/gif" else "attachment://image.png")
         embed.set_footer(
             text=f"Added by {meme.added_by_tag} | Used {meme.use_count} {'time' if meme.use_count == 1 else 'times'}")
@@ -292,34 +307,34 @@ class Memes(commands.Cog):
 
         contents_before = await image.read()
         contents = BytesIO(contents_before)
-        async with aiohttp.ClientSession(headers={"token": cfg.resnext_token}) as client:
-            form = aiohttp.FormData()
-            form.add_field(
-                "file", contents, content_type=image.content_type)
-            async with client.post('https://resnext.slim.rocks/', data=form) as resp:
-                if resp.status == 200:
-                    j = await resp.json()
-                    embed = discord.Embed()
-                    confidence = j.get('confidence')
-                    confidence_percent = f"{confidence*100:.1f}%"
-                    embed.description = f"image prediction: {j.get('classification')}\nconfidence: {confidence_percent}"
-                    embed.set_footer(
-                        text=f"Requested by {ctx.author} • /neuralnet • Processed in {j.get('process_time')}s")
-                    embed.set_image(url="attachment://image.png")
-
-                    if confidence < 0.25:
-                        embed.color = discord.Color.red()
-                    elif confidence < 0.5:
-                        embed.color = discord.Color.yellow()
-                    elif confidence < 0.75:
-                        embed.color = discord.Color.orange()
-                    else:
-                        embed.color = discord.Color.green()
-
-                    await ctx.respond(embed=embed, file=discord.File(BytesIO(contents_before), filename="image.png"))
+        headers = {"token": cfg.resnext_token}
+        form = aiohttp.FormData()
+        form.add_field(
+            "file", contents, content_type=image.content_type)
+        async with http_client.session.post('https://resnext.slim.rocks/', headers=headers, data=form) as resp:
+            if resp.status == 200:
+                j = await resp.json()
+                embed = discord.Embed()
+                confidence = j.get('confidence')
+                confidence_percent = f"{confidence*100:.1f}%"
+                embed.description = f"image prediction: {j.get('classification')}\nconfidence: {confidence_percent}"
+                embed.set_footer(
+                    text=f"Requested by {ctx.author} • /neuralnet • Processed in {j.get('process_time')}s")
+                embed.set_image(url="attachment://image.png")
+
+                if confidence < 0.25:
+                    embed.color = discord.Color.red()
+                elif confidence < 0.5:
+                    embed.color = discord.Color.yellow()
+                elif confidence < 0.75:
+                    embed.color = discord.Color.orange()
                 else:
-                    raise commands.BadArgument(
-                        "An error occurred classifying that image.")
+                    embed.color = discord.Color.green()
+
+                await ctx.respond(embed=embed, file=discord.File(BytesIO(contents_before), filename="image.png"))
+            else:
+                raise commands.BadArgument(
+                    "An error occurred classifying that image.")
 
     memegen = app_commands.Group(name="memegen", description="Generate memes", guild_ids=[
         cfg.guild_id])
@@ -359,23 +374,23 @@ class Memes(commands.Cog):
         await ctx.defer(ephemeral=False)
         contents_before = await image.read()
         contents = BytesIO(contents_before)
-        async with aiohttp.ClientSession(headers={"token": cfg.resnext_token}) as client:
-            form = aiohttp.FormData()
-            form.add_field(
-                "file", contents, content_type=image.content_type)
-            async with client.post(f'https://resnext.slim.rocks/meme?top_text={top_text}&bottom_text={bottom_text}', data=form) as resp:
-                if resp.status == 200:
-                    resp = await resp.read()
-                    embed = discord.Embed()
-                    embed.set_footer(
-                        text=f"Requested by {ctx.author} • /memegen regular")
-                    embed.set_image(url="attachment://image.png")
-                    embed.color = discord.Color.random()
-
-                    await ctx.respond(embed=embed, file=discord.File(BytesIO(resp), filename="image.png"))
-                else:
-                    raise commands.BadArgument(
-                        "An error occurred generating that meme.")
+        headers = {"token": cfg.resnext_token}
+        form = aiohttp.FormData()
+        form.add_field(
+            "file", contents, content_type=image.content_type)
+        async with http_client.session.post(f'https://resnext.slim.rocks/meme?top_text={top_text}&bottom_text={bottom_text}', headers=headers, data=form) as resp:
+            if resp.status == 200:
+                resp = await resp.read()
+                embed = discord.Embed()
+                embed.set_footer(
+                    text=f"Requested by {ctx.author} • /memegen regular")
+                embed.set_image(url="attachment://image.png")
+                embed.color = discord.Color.random()
+
+                await ctx.respond(embed=embed, file=discord.File(BytesIO(resp), filename="image.png"))
+            else:
+                raise commands.BadArgument(
+                    "An error occurred generating that meme.")
 
     @memed_and_up()
     @memegen.command(description="Motivational poster)")
@@ -412,23 +427,23 @@ class Memes(commands.Cog):
         await ctx.defer(ephemeral=False)
         contents_before = await image.read()
         contents = BytesIO(contents_before)
-        async with aiohttp.ClientSession(headers={"token": cfg.resnext_token}) as client:
-            form = aiohttp.FormData()
-            form.add_field(
-                "file", contents, content_type=image.content_type)
-            async with client.post(f'https://resnext.slim.rocks/demotivational-meme?top_text={top_text}&bottom_text={bottom_text}', data=form) as resp:
-                if resp.status == 200:
-                    resp = await resp.read()
-                    embed = discord.Embed()
-                    embed.set_footer(
-                        text=f"Requested by {ctx.author} • /memegen motivate")
-                    embed.set_image(url="attachment://image.png")
-                    embed.color = discord.Color.random()
-
-                    await ctx.respond(embed=embed, file=discord.File(BytesIO(resp), filename="image.png"))
-                else:
-                    raise commands.BadArgument(
-                        "An error occurred generating that meme.")
+        headers = {"token": cfg.resnext_token}
+        form = aiohttp.FormData()
+        form.add_field(
+            "file", contents, content_type=image.content_type)
+        async with http_client.session.post(f'https://resnext.slim.rocks/demotivational-meme?top_text={top_text}&bottom_text={bottom_text}', headers=headers, data=form) as resp:
+            if resp.status == 200:
+                resp = await resp.read()
+                embed = discord.Embed()
+                embed.set_footer(
+                    text=f"Requested by {ctx.author} • /memegen motivate")
+                embed.set_image(url="attachment://image.png")
+                embed.color = discord.Color.random()
+
+                await ctx.respond(embed=embed, file=discord.File(BytesIO(resp), filename="image.png"))
+            else:
+                raise commands.BadArgument(
+                    "An error occurred generating that meme.")
 
     @mod_and_up()
     @memegen.command(description="AI generated text based on a prompt")
@@ -450,35 +465,35 @@ class Memes(commands.Cog):
                 raise commands.BadArgument("That command is on cooldown.")
 
         await ctx.defer(ephemeral=False)
-        async with aiohttp.ClientSession(headers={"Authorization": f"Bearer {cfg.open_ai_token}", "Content-Type": "application/json"}) as client:
-            async with client.post(f"https://api.openai.com/v1/engines/text-davinci-001/completions", json={
-                "prompt": prompt,
-                "temperature": 0.7,
-                "max_tokens": 64,
-                "top_p": 1,
-                "frequency_penalty": 0,
-                "presence_penalty": 0
-            }) as resp:
-
-                if resp.status == 200:
-                    data = await resp.json()
-                    text = data.get("choices")[0].get("text")
-                    text = discord.utils.escape_markdown(text)
-                    if filter_words := await find_triggered_filters(text, ctx.author) or await find_triggered_raid_phrases(text, ctx.author):
-                        if not has_only_silent_filtered_words(filter_words):
-                            text = "A filter was triggered by this response. Please try a different prompt."
-
-                    embed = discord.Embed(color=discord.Color.random())
-                    prompt_formatted = discord.utils.escape_markdown(prompt)
-                    embed.add_field(name="Prompt", value=prompt_formatted[:1024] + "..." if len(
-                        prompt_formatted) > 1024 else prompt_formatted, inline=False)
-                    embed.add_field(
-                        name="Response", value=text or "API did not return a response.", inline=False)
-                    embed.set_footer(
-                        text=f"Requested by {ctx.author} • /memegen aitext")
-                    await ctx.respond(embed=embed)
-                else:
-                    raise commands.BadArgument("An OpenAI API error occured.")
+        headers = {"Authorization": f"Bearer {cfg.open_ai_token}", "Content-Type": "application/json"}
+        async with http_client.session.post(f"https://api.openai.com/v1/engines/text-davinci-001/completions", headers=headers, json={
+            "prompt": prompt,
+            "temperature": 0.7,
+            "max_tokens": 64,
+            "top_p": 1,
+            "frequency_penalty": 0,
+            "presence_penalty": 0
+        }) as resp:
+
+            if resp.status == 200:
+                data = await resp.json()
+                text = data.get("choices")[0].get("text")
+                text = discord.utils.escape_markdown(text)
+                if filter_words := await find_triggered_filters(text, ctx.author) or await find_triggered_raid_phrases(text, ctx.author):
+                    if not has_only_silent_filtered_words(filter_words):
+                        text = "A filter was triggered by this response. Please try a different prompt."
+
+                embed = discord.Embed(color=discord.Color.random())
+                prompt_formatted = discord.utils.escape_markdown(prompt)
+                embed.add_field(name="Prompt", value=prompt_formatted[:1024] + "..." if len(
+                    prompt_formatted) > 1024 else prompt_formatted, inline=False)
+                embed.add_field(
+                    name="Response", value=text or "API did not return a response.", inline=False)
+                embed.set_footer(
+                    text=f"Requested by {ctx.author} • /memegen aitext")
+                await ctx.respond(embed=embed)
+            else:
+                raise commands.BadArgument("An OpenAI API error occured.")
 
     @mod_and_up()
     @app_commands.guilds(cfg.guild_id)
@@ -12,7 +12,7 @@ from discord.ext import commands
 from discord.utils import format_dt
 from PIL import Image
 from utils import (GIRContext, cfg, get_dstatus_components,
-                   get_dstatus_incidents, transform_context)
+                   get_dstatus_incidents, transform_context, warmup)
 from utils.framework import (MONTH_MAPPING, Duration, gatekeeper,
                              give_user_birthday_role, mod_and_up, whisper)
 from utils.framework.transformers import ImageAttachment
@@ -181,6 +181,9 @@ class Misc(commands.Cog):
     @app_commands.describe(user_to_mention="User to mention in response")
     @transform_context
     async def rule(self, ctx: GIRContext, title: str, user_to_mention: discord.Member = None):
+        if not warmup.is_ready("rules"):
+            raise commands.BadArgument("The rules are still being loaded, try again in a moment.")
+
         if title not in self.bot.rule_cache.cache:
             potential_rules = [r for r in self.bot.rule_cache.cache if title.lower() == r.lower(
             ) or title.strip() == f"{r} - {self.bot.rule_cache.cache[r].description}"[:100].strip()]
@@ -269,12 +269,12 @@ class AntiRaid(commands.Cog):
             return
 
         reason = f"Mass ban on {len(all_members)} users with name `{member.name}`"
-        db_guild = guild_service.get_guild()
+        await guild_service.aio.reserve_case_ids(len(all_members))
 
         # ban all members
         for m in all_members:
             self.bot.ban_cache.ban(m.id)
-            log = await add_ban_case(m, ctx.author, reason, db_guild)
+            log = await add_ban_case(m, ctx.author, reason)
             await m.ban(reason=reason)
             
             # send a message to the modlog channel
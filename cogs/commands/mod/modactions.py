@@ -2,13 +2,12 @@ from datetime import datetime, timedelta, timezone
 
 import discord
 import humanize
-from apscheduler.jobstores.base import ConflictingIdError
 from data.model import Case
 from data.services import guild_service, user_service
 from discord import app_commands
 from discord.ext import commands
 from discord.utils import escape_markdown, escape_mentions
-from utils import GIRContext, cfg, transform_context
+from utils import ConflictingJobError, GIRContext, cfg, transform_context, warmup
 from utils.framework import mod_and_up, ModsAndAboveMemberOrUser, Duration, ModsAndAboveMember, UserOnly
 from utils.mod import (add_ban_case, add_kick_case, notify_user,
                        prepare_editreason_log, prepare_liftwarn_log,
@@ -47,9 +46,7 @@ class ModActions(commands.Cog):
         reason = escape_markdown(reason)
         reason = escape_mentions(reason)
 
-        db_guild = guild_service.get_guild()
-
-        log = add_kick_case(target_member=member, mod=ctx.author, reason=reason, db_guild=db_guild)
+        log = add_kick_case(target_member=member, mod=ctx.author, reason=reason)
         await notify_user(member, f"You were kicked from {ctx.guild.name}", log)
 
         await ctx.defer(ephemeral=False)
@@ -66,9 +63,7 @@ class ModActions(commands.Cog):
     async def roblox(self, ctx: GIRContext, member: ModsAndAboveMember) -> None:
         reason = "This Discord server is for iOS jailbreaking, not Roblox. Please join https://discord.gg/jailbreak instead, thank you!"
 
-        db_guild = guild_service.get_guild()
-
-        log = add_kick_case(target_member=member, mod=ctx.author, reason=reason, db_guild=db_guild)
+        log = add_kick_case(target_member=member, mod=ctx.author, reason=reason)
         await notify_user(member, f"You were kicked from {ctx.guild.name}", log)
 
         await ctx.defer(ephemeral=False)
@@ -102,9 +97,7 @@ class ModActions(commands.Cog):
         if time > now + timedelta(days=14):
             raise commands.BadArgument("Mutes can't be longer than 14 days!")
 
-        db_guild = guild_service.get_guild()
         case = Case(
-            _id=db_guild.case_id,
             _type="MUTE",
             date=now,
             mod_id=ctx.author.id,
@@ -119,11 +112,12 @@ class ModActions(commands.Cog):
         try:
             await member.timeout(time, reason=reason)
             ctx.tasks.schedule_untimeout(member.id, time)
-        except ConflictingIdError:
+        except ConflictingJobError:
             raise commands.BadArgument(
                 "The database thinks this user is already muted.")
 
-        guild_service.inc_caseid()
+        # only take a case ID once the mute went through
+        case._id = guild_service.next_case_id()
         user_service.add_case(member.id, case)
 
         log = prepare_mute_log(ctx.author, member, case)
@@ -142,8 +136,6 @@ class ModActions(commands.Cog):
     @app_commands.describe(reason="Reason for unmuting")
     @transform_context
     async def unmute(self, ctx: GIRContext, member: ModsAndAboveMember, reason: str) -> None:
-        db_guild = guild_service.get_guild()
-
         if not member.is_timed_out():
             raise commands.BadArgument("This user is not muted.")
 
@@ -156,13 +148,12 @@ class ModActions(commands.Cog):
             pass
 
         case = Case(
-            _id=db_guild.case_id,
+            _id=guild_service.next_case_id(),
             _type="UNMUTE",
             mod_id=ctx.author.id,
             mod_tag=str(ctx.author),
             reason=reason,
         )
-        guild_service.inc_caseid()
         user_service.add_case(member.id, case)
 
         log = prepare_unmute_log(ctx.author, member, case)
@@ -181,18 +172,19 @@ class ModActions(commands.Cog):
     async def ban(self, ctx: GIRContext, user: ModsAndAboveMemberOrUser, reason: str):
         reason = escape_markdown(reason)
         reason = escape_mentions(reason)
-        db_guild = guild_service.get_guild()
 
         member_is_external = isinstance(user, discord.User)
 
         # if the ID given is of a user who isn't in the guild, try to fetch the profile
         if member_is_external:
+            if not warmup.is_ready("bans"):
+                raise commands.BadArgument("The ban list is still being loaded, try again in a moment.")
             if self.bot.ban_cache.is_banned(user.id):
                 raise commands.BadArgument("That user is already banned!")
 
         await ctx.defer(ephemeral=False)
         self.bot.ban_cache.ban(user.id)
-        log = await add_ban_case(user, ctx.author, reason, db_guild)
+        log = await add_ban_case(user, ctx.author, reason)
 
         if not member_is_external:
             if cfg.ban_appeal_url is None:
@@ -217,12 +209,13 @@ class ModActions(commands.Cog):
     async def staffban(self, ctx: GIRContext, user: ModsAndAboveMemberOrUser, reason: str):
         reason = escape_markdown(reason)
         reason = escape_mentions(reason)
-        db_guild = guild_service.get_guild()
 
         member_is_external = isinstance(user, discord.User)
 
         # if the ID given is of a user who isn't in the guild, try to fetch the profile
         if member_is_external:
+            if not warmup.is_ready("bans"):
+                raise commands.BadArgument("The ban list is still being loaded, try again in a moment.")
             if self.bot.ban_cache.is_banned(user.id):
                 raise commands.BadArgument("That user is already banned!")
 
@@ -236,7 +229,7 @@ class ModActions(commands.Cog):
             return
 
         self.bot.ban_cache.ban(user.id)
-        log = await add_ban_case(user, ctx.author, reason, db_guild)
+        log = await add_ban_case(user, ctx.author, reason)
 
         log.set_field_at(1, name="Mod", value=f"{ctx.guild.name} Staff")
 
@@ -268,6 +261,8 @@ class ModActions(commands.Cog):
         reason = escape_markdown(reason)
         reason = escape_mentions(reason)
 
+        if not warmup.is_ready("bans"):
+            raise commands.BadArgument("The ban list is still being loaded, try again in a moment.")
         if not self.bot.ban_cache.is_banned(user.id):
             raise commands.BadArgument("That user isn't banned!")
 
@@ -279,15 +274,13 @@ class ModActions(commands.Cog):
 
         self.bot.ban_cache.unban(user.id)
 
-        db_guild = guild_service.get_guild()
         case = Case(
-            _id=db_guild.case_id,
+            _id=guild_service.next_case_id(),
             _type="UNBAN",
             mod_id=ctx.author.id,
             mod_tag=str(ctx.author),
             reason=reason,
         )
-        guild_service.inc_caseid()
         user_service.add_case(user.id, case)
 
         log = prepare_unban_log(ctx.author, user, case)
@@ -321,8 +314,7 @@ class ModActions(commands.Cog):
     @app_commands.describe(reason="Reason for lifting the warn")
     @transform_context
     async def liftwarn(self, ctx: GIRContext, member: ModsAndAboveMember, case_id: str, reason: str) -> None:
-        cases = user_service.get_cases(member.id)
-        case = cases.cases.filter(_id=case_id).first()
+        case = user_service.get_case(member.id, case_id)
 
         reason = escape_markdown(reason)
         reason = escape_mentions(reason)
@@ -349,7 +341,7 @@ class ModActions(commands.Cog):
         case.lifted_by_tag = str(ctx.author)
         case.lifted_by_id = ctx.author.id
         case.lifted_date = datetime.now()
-        cases.save()
+        user_service.update_case(member.id, case)
 
         # remove the warn points from the user in DB
         user_service.inc_points(member.id, -1 * int(case.punishment))
@@ -371,8 +363,7 @@ class ModActions(commands.Cog):
     @transform_context
     async def editreason(self, ctx: GIRContext, member: ModsAndAboveMemberOrUser, case_id: str, new_reason: str) -> None:
         # retrieve user's case with given ID
-        cases = user_service.get_cases(member.id)
-        case = cases.cases.filter(_id=case_id).first()
+        case = user_service.get_case(member.id, case_id)
 
         new_reason = escape_markdown(new_reason)
         new_reason = escape_mentions(new_reason)
@@ -385,7 +376,8 @@ class ModActions(commands.Cog):
         old_reason = case.reason
         case.reason = new_reason
         case.date = datetime.now()
-        cases.save()
+        user_service.update_case(member.id, case)
+        user_service.update_case_stats(case, old_reason)
 
         dmed = True
         log = prepare_editreason_log(ctx.author, member, case, old_reason)
@@ -445,9 +437,8 @@ class ModActions(commands.Cog):
         # remove the warn points from the user in DB
         user_service.inc_points(member.id, -1 * points)
 
-        db_guild = guild_service.get_guild()
         case = Case(
-            _id=db_guild.case_id,
+            _id=guild_service.next_case_id(),
             _type="REMOVEPOINTS",
             mod_id=ctx.author.id,
             mod_tag=str(ctx.author),
@@ -455,8 +446,6 @@ class ModActions(commands.Cog):
             reason=reason,
         )
 
-        # increment DB's max case ID for next case
-        guild_service.inc_caseid()
         # add case to db
         user_service.add_case(member.id, case)
 
@@ -86,9 +86,10 @@ class ModUtils(commands.Cog):
         results.is_xp_frozen = True
         results.warn_points = 599
         results.save()
+        user_service.invalidate_xp(member.id)
 
         case = Case(
-            _id=guild_service.get_guild().case_id,
+            _id=guild_service.next_case_id(),
             _type="CLEM",
             mod_id=ctx.author.id,
             mod_tag=str(ctx.author),
@@ -96,8 +97,6 @@ class ModUtils(commands.Cog):
             reason="No reason."
         )
 
-        # incrememnt DB's max case ID for next case
-        guild_service.inc_caseid()
         # add case to db
         user_service.add_case(member.id, case)
 
@@ -112,6 +111,7 @@ class ModUtils(commands.Cog):
         results = user_service.get_user(member.id)
         results.is_xp_frozen = not results.is_xp_frozen
         results.save()
+        user_service.invalidate_xp(member.id)
 
         await ctx.send_success(f"{member.mention}'s xp was {'frozen' if results.is_xp_frozen else 'unfrozen'}.")
 
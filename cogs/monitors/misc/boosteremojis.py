@@ -1,11 +1,10 @@
 import asyncio
 import re
 
-import aiohttp
 import discord
 from data.services import guild_service
 from discord.ext import commands
-from utils import GIROldContext, PromptData, cfg
+from utils import GIROldContext, PromptData, cfg, http_client
 from utils.framework import gatekeeper
 
 
@@ -153,21 +152,21 @@ class BoosterEmojis(commands.Cog):
             await msg.add_reaction('❓')
 
     async def do_content_parsing(self, url):
-        async with aiohttp.ClientSession() as session:
-            async with session.head(url) as resp:
-                if resp.status != 200:
-                    return None
-                elif resp.headers["CONTENT-TYPE"] not in ["image/png", "image/jpeg", "image/gif", "image/webp"]:
-                    return None
-                elif int(resp.headers['CONTENT-LENGTH']) > 257000:
-                    raise commands.BadArgument(
-                        f"Image was too big ({int(resp.headers['CONTENT-LENGTH'])/1000}KB)")
-                else:
-                    async with session.get(url) as resp2:
-                        if resp2.status != 200:
-                            return None
-
-                        return await resp2.read()
+        session = http_client.session
+        async with session.head(url) as resp:
+            if resp.status != 200:
+                return None
+            elif resp.headers["CONTENT-TYPE"] not in ["image/png", "image/jpeg", "image/gif", "image/webp"]:
+                return None
+            elif int(resp.headers['CONTENT-LENGTH']) > 257000:
+                raise commands.BadArgument(
+                    f"Image was too big ({int(resp.headers['CONTENT-LENGTH'])/1000}KB)")
+
+        async with session.get(url) as resp2:
+            if resp2.status != 200:
+                return None
+
+            return await resp2.read()
 
 
 async def setup(bot):
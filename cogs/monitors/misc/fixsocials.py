@@ -7,7 +7,7 @@ import aiohttp
 
 import discord
 from discord.ext import commands
-from utils import cfg
+from utils import cfg, http_client
 
 
 class FixSocials(commands.Cog):
@@ -60,28 +60,26 @@ class FixSocials(commands.Cog):
                 'content-type': 'application/json',
                 'user-agent': 'GIR - slim.rocks/gir',
             }
-            async with aiohttp.ClientSession(headers=headers) as session:
-                url = 'https://api.quickvids.win/v1/shorturl/create'
-                data = {'input_text': tiktok_url}
-                async with session.post(url, json=data, timeout=aiohttp.ClientTimeout(total=5)) as response:
-                    if response.status == 200:
-                        text = await response.text()
-                        data = json.loads(text)
-                        quickvids_url = data['quickvids_url']
-                        return quickvids_url
-                    else:
-                        return None
+            url = 'https://api.quickvids.win/v1/shorturl/create'
+            data = {'input_text': tiktok_url}
+            async with http_client.session.post(url, json=data, headers=headers, timeout=aiohttp.ClientTimeout(total=5)) as response:
+                if response.status == 200:
+                    text = await response.text()
+                    data = json.loads(text)
+                    quickvids_url = data['quickvids_url']
+                    return quickvids_url
+                else:
+                    return None
         except (aiohttp.ClientError, asyncio.TimeoutError):
             return None
 
     @cached(ttl=3600)
     async def is_carousel_tiktok(self, link: str):
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(link, timeout=5) as response:
-                    if response.status == 200:
-                        text = await response.text()
-                        return '>Download All Images</button>' in text
+            async with http_client.session.get(link, timeout=aiohttp.ClientTimeout(total=5)) as response:
+                if response.status == 200:
+                    text = await response.text()
+                    return '>Download All Images</button>' in text
         except (aiohttp.ClientError, asyncio.TimeoutError):
             return False
 
@@ -92,12 +90,11 @@ class FixSocials(commands.Cog):
             return quickvids_url
 
         else:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(link, allow_redirects=False) as response:
-                    if response.status != 301:
-                        return
+            async with http_client.session.get(link, allow_redirects=False) as response:
+                if response.status != 301:
+                    return
 
-                    redirected_url = str(response).split("Location': \'")[1].split("\'")[0]
+                redirected_url = str(response).split("Location': \'")[1].split("\'")[0]
 
             redirected_url = redirected_url.replace('www.tiktok.com', 'tnktok.com')
             if (tracking_id_index := redirected_url.index('?')) is not None:
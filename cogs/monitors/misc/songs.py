@@ -2,13 +2,12 @@ import json
 import random
 import re
 
-import aiohttp
 import discord
 import spotipy
 from discord.ext import commands
 from spotipy.oauth2 import SpotifyOAuth
 
-from utils import cfg
+from utils import cfg, http_client
 from utils.framework import find_triggered_filters, gatekeeper
 from utils.framework.filter import has_only_silent_filtered_words
 from utils.logging import logger
@@ -89,13 +88,12 @@ class Songs(commands.Cog):
             return
 
     async def generate_view(self, message: discord.Message, link: str):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(f'https://api.song.link/v1-alpha.1/links?url={link}') as resp:
-                if resp.status != 200:
-                    return None
+        async with http_client.session.get(f'https://api.song.link/v1-alpha.1/links?url={link}') as resp:
+            if resp.status != 200:
+                return None
 
-                res = await resp.text()
-                res = json.loads(res)
+            res = await resp.text()
+            res = json.loads(res)
 
         spotify_data = res.get('linksByPlatform').get('spotify')
         spotify_uri = spotify_data.get('nativeAppUriDesktop')
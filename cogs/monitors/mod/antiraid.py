@@ -87,6 +87,7 @@ class AntiRaidMonitor(commands.Cog):
         # if ratelimit is triggered, we should ban all the users that joined in the past 8 seconds
         if join_spam_detection_bucket.update_rate_limit(current):
             users = list(self.join_user_mapping.keys())
+            await self.reserve_raid_case_ids(users)
             for user in users:
                 try:
                     user = self.join_user_mapping[user]
@@ -112,7 +113,7 @@ class AntiRaidMonitor(commands.Cog):
 
         # skip user if we manually verified them, i.e they were approved by a moderator
         # using the !verify command when they appealed a ban.
-        if user_service.get_user(member.id).raid_verified:
+        if (await user_service.aio.get_user(member.id)).raid_verified:
             return
 
         # skip if it's an older account (before May 1st 2021)
@@ -154,6 +155,7 @@ class AntiRaidMonitor(commands.Cog):
         current = member.joined_at.replace(tzinfo=timezone.utc).timestamp()
         if bucket.update_rate_limit(current):
             users = [m for m in self.join_overtime_mapping.get(timestamp)]
+            await self.reserve_raid_case_ids([m.id for m in users])
             for user in users:
                 try:
                     await self.raid_ban(user, reason=f"Join spam over time detected (bucket `{timestamp_bucket_for_logging}`)", dm_user=True)
@@ -241,6 +243,7 @@ class AntiRaidMonitor(commands.Cog):
                 await report_spam(self.bot, message, user, title=title)
             else:
                 users = list(self.spam_user_mapping.keys())
+                await self.reserve_raid_case_ids(users)
                 for user in users:
                     try:
                         _ = self.spam_user_mapping[user]
@@ -333,6 +336,13 @@ class AntiRaidMonitor(commands.Cog):
         # delete the message so nobody (accidentally) opens it
         await ctx.guild.message.delete()
 
+    async def reserve_raid_case_ids(self, user_ids):
+        """Reserve case IDs for every user about to be raid banned in one round-trip,
+        instead of allocating them one by one"""
+
+        count = len([_id for _id in user_ids if not self.bot.ban_cache.is_banned(_id)])
+        await guild_service.aio.reserve_case_ids(count)
+
     async def raid_ban(self, user: discord.Member, reason="Raid phrase detected", dm_user=False):
         """Helper function to ban users"""
 
@@ -343,10 +353,8 @@ class AntiRaidMonitor(commands.Cog):
             else:
                 self.bot.ban_cache.ban(user.id)
 
-            db_guild = guild_service.get_guild()
-
             case = Case(
-                _id=db_guild.case_id,
+                _id=guild_service.next_case_id(),
                 _type="BAN",
                 date=datetime.now(),
                 mod_id=self.bot.user.id,
@@ -355,8 +363,7 @@ class AntiRaidMonitor(commands.Cog):
                 reason=reason
             )
 
-            guild_service.inc_caseid()
-            user_service.add_case(user.id, case)
+            await user_service.aio.add_case(user.id, case)
 
             log = prepare_ban_log(self.bot.user, user, case)
 
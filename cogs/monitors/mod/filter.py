@@ -1,14 +1,14 @@
 import json
 import re
+import traceback
 from datetime import datetime, timezone
 
-import aiohttp
 import discord
 from aiocache.decorators import cached
 from data.model import FilterWord
 from data.services import guild_service
-from discord.ext import commands
-from utils import cfg, logger, scam_cache
+from discord.ext import commands, tasks
+from utils import cfg, http_client, logger, scam_cache, warmup
 from utils.framework import gatekeeper, find_triggered_filters
 from utils.framework.filter import has_only_silent_filtered_words
 from utils.mod import mute
@@ -22,6 +22,25 @@ class Filter(commands.Cog):
         self.spoiler_filter = r'\|\|(.*?)\|\|'
         self.spam_cooldown = commands.CooldownMapping.from_cooldown(
             2, 10.0, commands.BucketType.member)
+        self.refresh_scam_urls.start()
+
+    def cog_unload(self):
+        self.refresh_scam_urls.cancel()
+
+    @tasks.loop(hours=1)
+    async def refresh_scam_urls(self):
+        """Background task to keep the scam URL list current, for when the bot
+        stays connected longer than the list's cache lifetime."""
+
+        try:
+            await scam_cache.fetch_scam_cache()
+        except Exception:
+            logger.error(traceback.format_exc())
+
+    @refresh_scam_urls.before_loop
+    async def before_refresh_scam_urls(self):
+        # the first load is part of the warm-up
+        await warmup.wait_ready("scam_urls")
 
     @commands.Cog.listener()
     async def on_reaction_add(self, reaction: discord.Reaction, reacter: discord.Member):
@@ -221,6 +240,9 @@ class Filter(commands.Cog):
         return False
 
     async def scam_filter(self, message: discord.Message):
+        if not warmup.is_ready("scam_urls"):
+            return False
+
         for url in scam_cache.scam_jb_urls:
             if url in message.content.lower():
                 embed = discord.Embed(
@@ -293,13 +315,12 @@ class Filter(commands.Cog):
 
     @cached(ttl=3600)
     async def fetch_cij_or_news_database(self):
-        async with aiohttp.ClientSession() as session:
-            async with session.get("https://raw.githubusercontent.com/DiscordGIR/CIJOrNewsFilter/main/database.json") as resp:
-                if resp.status == 200:
-                    data = await resp.text()
-                    return json.loads(data)
+        async with http_client.session.get("https://raw.githubusercontent.com/DiscordGIR/CIJOrNewsFilter/main/database.json") as resp:
+            if resp.status == 200:
+                data = await resp.text()
+                return json.loads(data)
 
-                return {}
+            return {}
 
     async def detect_cij_or_eta(self, message: discord.Message):
         if message.edited_at is not None:
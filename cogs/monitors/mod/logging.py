@@ -1,21 +1,126 @@
-import aiohttp
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from discord.utils import format_dt
 
+import traceback
+from collections import deque
 from datetime import datetime
 from io import BytesIO
-from typing import List, Union
+from typing import List, Optional, Union
 
 import discord
 from data.services.guild_service import guild_service
 from data.services.user_service import user_service
 from utils.config import cfg
+from utils.http import http_client
+from utils.logging import logger
+from utils.logsink import log_sink
+
+# reactions are posted to the emoji log in batches instead of one webhook call each
+REACTION_LOG_INTERVAL = 5
+# a webhook message can hold at most 10 embeds
+REACTION_LOG_BATCH_SIZE = 10
+# during a reaction storm the oldest entries are dropped past this many
+REACTION_LOG_MAX_QUEUE = 1000
+
+
+class ReactionLogEmitter:
+    """Queues reactions to be logged and posts them to the emoji logging webhook
+    in batches of up to 10 embeds per message.
+
+    The webhook URL is read from the guild once and kept, and the webhook is created
+    if it doesn't exist yet. Requests go through the shared HTTP session; discord.py
+    waits out the webhook's rate limit buckets, and batches that still get rate limited
+    are put back in the queue for the next flush.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.queue = deque(maxlen=REACTION_LOG_MAX_QUEUE)
+        self._webhook_url: Optional[str] = None
+
+    def add(self, reaction: discord.Reaction, member: discord.Member) -> None:
+        embed = discord.Embed(
+            description=f"{reaction.emoji}\n\n{reaction.message.channel.mention} | [Link to message]({reaction.message.jump_url}) | **{member.id}**")
+        embed.set_author(name=str(member), icon_url=member.display_avatar)
+        embed.timestamp = datetime.now()
+        self.queue.append(embed)
+
+    async def _get_webhook(self) -> Optional[discord.Webhook]:
+        if self._webhook_url is None:
+            self._webhook_url = guild_service.get_guild().emoji_logging_webhook
+
+        if self._webhook_url is None:
+            guild = self.bot.get_guild(cfg.guild_id)
+            channel = guild.get_channel(cfg.channels.emoji_logs) if guild is not None else None
+            if channel is None:
+                return None
+
+            self._webhook_url = (await channel.create_webhook(name=f"Webhook {channel.name}")).url
+            await guild_service.aio.set_emoji_logging_webhook(self._webhook_url)
+
+        return discord.Webhook.from_url(self._webhook_url, session=http_client.session)
+
+    async def flush(self) -> None:
+        while self.queue:
+            webhook = await self._get_webhook()
+            if webhook is None:
+                # emoji logging isn't set up, nowhere to send these
+                self.queue.clear()
+                return
+
+            batch = [self.queue.popleft() for _ in range(min(REACTION_LOG_BATCH_SIZE, len(self.queue)))]
+            try:
+                await webhook.send(embeds=batch, allowed_mentions=discord.AllowedMentions(users=False, everyone=False, roles=False))
+            except discord.NotFound:
+                # the webhook was deleted, make a new one on the next flush
+                self._webhook_url = None
+                await guild_service.aio.set_emoji_logging_webhook(None)
+                self.queue.extendleft(reversed(batch))
+                return
+            except discord.HTTPException as e:
+                if e.status == 429:
+                    self.queue.extendleft(reversed(batch))
+                    return
+                raise
+
+
+def format_audit_log_user(action: discord.AuditLogEntry) -> str:
+    """Formats the user that did an audit logged action, who might not be cached."""
+
+    if action.user is None:
+        return f"<@{action.user_id}>"
+    return f'{action.user} ({action.user.mention})'
 
 
 class Logging(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.reaction_log = ReactionLogEmitter(bot)
+        self.flush_reaction_log.start()
+
+    async def cog_unload(self):
+        self.flush_reaction_log.cancel()
+        try:
+            await self.reaction_log.flush()
+        except Exception:
+            logger.error(traceback.format_exc())
+
+    @tasks.loop(seconds=REACTION_LOG_INTERVAL)
+    async def flush_reaction_log(self):
+        """Background task to post the queued reactions to the emoji log."""
+
+        try:
+            await self.reaction_log.flush()
+        except Exception:
+            logger.error(traceback.format_exc())
+
+    @commands.Cog.listener()
+    async def on_audit_log_entry_create(self, entry: discord.AuditLogEntry):
+        if entry.guild.id != cfg.guild_id:
+            return
+
+        self.bot.audit_log_cache.add(entry)
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member) -> None:
@@ -29,7 +134,7 @@ class Logging(commands.Cog):
         if member.guild.id != cfg.guild_id:
             return
 
-        db_user = user_service.get_user(member.id)
+        db_user = await user_service.aio.get_user(member.id)
         channel = member.guild.get_channel(cfg.channels.private_logs)
 
         embed = discord.Embed(title="Member joined")
@@ -46,7 +151,7 @@ class Logging(commands.Cog):
         embed.timestamp = datetime.now()
         embed.set_footer(text=member.id)
 
-        await channel.send(embed=embed)
+        log_sink.send(channel, embed)
 
     @commands.Cog.listener()
     async def on_member_remove(self, member: discord.Member) -> None:
@@ -62,10 +167,10 @@ class Logging(commands.Cog):
 
         channel = member.guild.get_channel(cfg.channels.private_logs)
 
-        async for action in member.guild.audit_logs(limit=1, action=discord.AuditLogAction.kick):
-            if action.target.id == member.id:
-                await self.on_member_kick(action, channel)
-                return
+        action = await self.bot.audit_log_cache.find(member.guild, discord.AuditLogAction.kick, member.id)
+        if action is not None:
+            await self.on_member_kick(action, member, channel)
+            return
 
         embed = discord.Embed(title="Member Left")
         embed.color = discord.Color.purple()
@@ -74,7 +179,7 @@ class Logging(commands.Cog):
             name="User", value=f'{member} ({member.mention})', inline=True)
         embed.timestamp = datetime.now()
         embed.set_footer(text=member.id)
-        await channel.send(embed=embed)
+        log_sink.send(channel, embed)
 
     @commands.Cog.listener()
     async def on_reaction_add(self, reaction: discord.Reaction, member: discord.User):
@@ -89,30 +194,7 @@ class Logging(commands.Cog):
         if reaction.message.channel.is_news():
             return
 
-
-        db_guild = guild_service.get_guild()
-        webhook = db_guild.emoji_logging_webhook
-        if webhook is None:
-            channel = member.guild.get_channel(cfg.channels.emoji_logs)
-            if channel is None:
-                return
-
-            webhook = (await channel.create_webhook(name=f"Webhook {channel.name}")).url
-            db_guild.emoji_logging_webhook = webhook
-            db_guild.save()
-
-        content = f"{reaction.emoji}\n\n{reaction.message.channel.mention} | [Link to message]({reaction.message.jump_url}) | **{member.id}**"
-        body = {
-            "username": str(member),
-            "avatar_url": member.display_avatar,
-            "content": content
-        }
-
-        async with aiohttp.ClientSession() as session:
-            the_webhook: discord.Webhook = discord.Webhook.from_url(
-                webhook, session=session)
-            # send message to webhook
-            await the_webhook.send(**body, allowed_mentions=discord.AllowedMentions(users=False, everyone=False, roles=False))
+        self.reaction_log.add(reaction, member)
 
     @commands.Cog.listener()
     async def on_message_edit(self, before: discord.Message, after: discord.Message) -> None:
@@ -158,7 +240,7 @@ class Logging(commands.Cog):
             name="Channel", value=before.channel.mention + f"\n\n[Link to message]({before.jump_url})", inline=False)
         embed.timestamp = datetime.now()
         embed.set_footer(text=before.author.id)
-        await channel.send(embed=embed)
+        log_sink.send(channel, embed)
 
     @commands.Cog.listener()
     async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent) -> None:
@@ -206,7 +288,7 @@ class Logging(commands.Cog):
 
         embed.set_footer(text=message.author.id)
         embed.timestamp = datetime.now()
-        await channel.send(embed=embed)
+        log_sink.send(channel, embed)
 
     # @commands.Cog.listener()
     # async def on_command_error(self, ctx: GIRContext, error):
@@ -262,7 +344,7 @@ class Logging(commands.Cog):
         embed.add_field(
             name="Channel", value=message.channel.mention, inline=True)
         embed.timestamp = datetime.now()
-        await channel.send(embed=embed)
+        await log_sink.send_urgent(channel, embed)
         await channel.send(file=discord.File(output, 'message.txt'))
 
     @commands.Cog.listener()
@@ -270,6 +352,9 @@ class Logging(commands.Cog):
         if not guild.id == cfg.guild_id:
             return
 
+        # also covers bans that weren't done through the bot
+        self.bot.ban_cache.ban(user.id)
+
         channel = guild.get_channel(cfg.channels.private_logs)
 
         embed = discord.Embed(title="Member Banned")
@@ -279,22 +364,22 @@ class Logging(commands.Cog):
         embed.timestamp = datetime.now()
         embed.set_footer(text=user.id)
 
-        async for action in guild.audit_logs(limit=1, action=discord.AuditLogAction.ban):
-            if action.target.id == user.id:
-                embed.title = "Member Left"
-                embed.color = discord.Color.purple()
-                embed.add_field(
-                    name="Banned by", value=f'{action.user} ({action.user.mention})', inline=True)
-                await channel.send(embed=embed)
-                return
+        action = await self.bot.audit_log_cache.find(guild, discord.AuditLogAction.ban, user.id)
+        if action is not None:
+            embed.title = "Member Left"
+            embed.color = discord.Color.purple()
+            embed.add_field(
+                name="Banned by", value=format_audit_log_user(action), inline=True)
 
-        await channel.send(embed=embed)
+        await log_sink.send_urgent(channel, embed)
 
     @commands.Cog.listener()
     async def on_member_unban(self, guild, user: discord.User):
         if not guild.id == cfg.guild_id:
             return
 
+        self.bot.ban_cache.unban(user.id)
+
         channel = guild.get_channel(cfg.channels.private_logs)
 
         embed = discord.Embed(title="User Unbanned")
@@ -304,25 +389,23 @@ class Logging(commands.Cog):
         embed.timestamp = datetime.now()
         embed.set_footer(text=user.id)
 
-        async for action in guild.audit_logs(limit=1, action=discord.AuditLogAction.unban):
-            if action.target.id == user.id:
-                embed.add_field(
-                    name="Unbanned by", value=f'{action.user} ({action.user.mention})', inline=True)
-                await channel.send(embed=embed)
-                return
+        action = await self.bot.audit_log_cache.find(guild, discord.AuditLogAction.unban, user.id)
+        if action is not None:
+            embed.add_field(
+                name="Unbanned by", value=format_audit_log_user(action), inline=True)
 
-        await channel.send(embed=embed)
+        await log_sink.send_urgent(channel, embed)
 
-    async def on_member_kick(self, action: discord.AuditLogEntry, channel: discord.TextChannel):
+    async def on_member_kick(self, action: discord.AuditLogEntry, member: discord.Member, channel: discord.TextChannel):
         embed = discord.Embed(title="Member Left")
         embed.color = discord.Color.purple()
         embed.add_field(
-            name="User", value=f'{action.target} ({action.target.mention})', inline=True)
+            name="User", value=f'{member} ({member.mention})', inline=True)
         embed.add_field(
-            name="Kicked by", value=f'{action.user} ({action.user.mention})', inline=True)
+            name="Kicked by", value=format_audit_log_user(action), inline=True)
         embed.timestamp = datetime.now()
-        embed.set_footer(text=action.user.id)
-        await channel.send(embed=embed)
+        embed.set_footer(text=action.user_id)
+        await log_sink.send_urgent(channel, embed)
 
     @commands.Cog.listener()
     async def on_member_update(self, before: discord.Member, after: discord.Member):
@@ -363,7 +446,7 @@ class Logging(commands.Cog):
             embed.timestamp = datetime.now()
             embed.set_footer(text=before.id)
 
-            await channel.send(embed=embed)
+            log_sink.send(channel, embed)
             return
 
 
@@ -383,7 +466,7 @@ class Logging(commands.Cog):
 
         private = after.guild.get_channel(cfg.channels.private_logs)
         if private:
-            await private.send(embed=embed)
+            log_sink.send(private, embed)
 
     async def member_roles_update(self, member, roles, added):
         embed = discord.Embed()
@@ -409,7 +492,7 @@ class Logging(commands.Cog):
 
         private = member.guild.get_channel(cfg.channels.private_logs)
         if private:
-            await private.send(embed=embed)
+            log_sink.send(private, embed)
 
     async def member_timeout_update(self, before: discord.Member, after: discord.Member):
         embed = discord.Embed()
@@ -427,11 +510,18 @@ class Logging(commands.Cog):
         embed.set_thumbnail(url=member.display_avatar)
         embed.add_field(
             name="Member", value=f'{member} ({member.mention})', inline=True)
+
+        # timeouts are logged as member updates
+        action = await self.bot.audit_log_cache.find(member.guild, discord.AuditLogAction.member_update, member.id)
+        if action is not None and hasattr(action.after, "timed_out_until"):
+            embed.add_field(
+                name="Moderator", value=format_audit_log_user(action), inline=True)
+
         embed.timestamp = datetime.now()
         embed.set_footer(text=member.id)
         private = member.guild.get_channel(cfg.channels.private_logs)
         if private:
-            await private.send(embed=embed)
+            log_sink.send(private, embed)
 
     @commands.Cog.listener()
     async def on_interaction(self, interaction: discord.Interaction):
@@ -469,7 +559,7 @@ class Logging(commands.Cog):
         embed.set_footer(text=interaction.user.id)
 
         if private is not None:
-            await private.send(embed=embed)
+            log_sink.send(private, embed)
 
     @commands.Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
@@ -500,7 +590,7 @@ class Logging(commands.Cog):
 
         private = member.guild.get_channel(cfg.channels.private_logs)
         if private:
-            await private.send(embed=embed)
+            log_sink.send(private, embed)
 
     @commands.Cog.listener()
     async def on_command_error(self, ctx, error):
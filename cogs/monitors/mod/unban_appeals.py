@@ -108,7 +108,7 @@ class UnbanAppeals(commands.Cog):
         embed.add_field(
             name="XP", value=results.xp if not results.is_clem else "CLEMMED", inline=True)
         embed.add_field(
-            name="Punishments", value=f"{results.warn_points} warn points\n{len(user_service.get_cases(appealer.id).cases)} cases", inline=True)
+            name="Punishments", value=f"{results.warn_points} warn points\n{user_service.count_cases(appealer.id)} cases", inline=True)
 
         embed.add_field(name="Account creation date",
                         value=f"{format_dt(appealer.created_at, style='F')} ({format_dt(appealer.created_at, style='R')})", inline=True)
@@ -116,9 +116,9 @@ class UnbanAppeals(commands.Cog):
 
     async def generate_cases(self, appealer: discord.User):
         results = user_service.get_cases(appealer.id)
-        if not results.cases:
+        if not results:
             return None
-        cases = [case for case in results.cases if case._type != "UNMUTE"]
+        cases = [case for case in results if case._type != "UNMUTE"]
         # reverse so newest cases are first
         cases.reverse()
 
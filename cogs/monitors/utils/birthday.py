@@ -1,35 +1,60 @@
-from datetime import datetime
+import asyncio
+import traceback
+from datetime import datetime, time, timedelta
+from typing import Dict, List, Tuple
 
+import discord
 import pytz
 from data.services import guild_service, user_service
 from discord.ext import commands, tasks
 
-from utils import GIRContext, cfg
+from utils import GIRContext, cfg, logger
 from utils.framework import MONTH_MAPPING, give_user_birthday_role, whisper, gatekeeper
 from utils.views import date_autocompleter
 
 
+# how many members get the birthday role at the same time
+BIRTHDAY_CONCURRENCY = 5
+
+
 class Birthday(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
         self.eastern_timezone = pytz.timezone('US/Eastern')
+        # (month, day) -> IDs of the users whose birthday it is, rebuilt every day
+        self.calendar: Dict[Tuple[int, int], List[int]] = {}
         self.birthday.start()
 
     def cog_unload(self):
         self.birthday.cancel()
 
-    @tasks.loop(seconds=120)
+    def next_midnight(self) -> datetime:
+        today = datetime.now(self.eastern_timezone).date()
+        return self.eastern_timezone.localize(datetime.combine(today + timedelta(days=1), time()))
+
+    @tasks.loop()
     async def birthday(self):
-        """Background task to scan database for users whose birthday it is today.
-        If it's someone's birthday, the bot will assign them the birthday role for 24 hours."""
+        """Background task that gives the birthday role to everyone whose birthday it is,
+        at 12am US Eastern time. The role is taken away 24 hours later by a scheduled job.
+        """
+
+        try:
+            await self.give_birthday_roles()
+        except Exception:
+            # try again tomorrow instead of stopping the loop
+            logger.error(traceback.format_exc())
+
+        await discord.utils.sleep_until(self.next_midnight())
+
+    @birthday.before_loop
+    async def before_birthday(self):
+        await self.bot.wait_until_ready()
+
+    async def give_birthday_roles(self):
+        self.calendar = await user_service.aio.get_birthday_calendar()
 
-        # assign the role at 12am US Eastern time
-        eastern = pytz.timezone('US/Eastern')
-        today = datetime.today().astimezone(eastern)
-        # the date we will check for in the database
-        date = [today.month, today.day]
-        # get list of users whose birthday it is today
-        birthdays = user_service.retrieve_birthdays(date)
+        today = datetime.now(self.eastern_timezone)
+        birthdays = self.calendar.get((today.month, today.day), [])
 
         guild = self.bot.get_guild(cfg.guild_id)
         if not guild:
@@ -39,16 +64,18 @@ class Birthday(commands.Cog):
         if not birthday_role:
             return
 
-        # give each user whose birthday it is today the birthday role
-        for person in birthdays:
-            if person.birthday_excluded:
-                continue
+        members = [member for member in map(guild.get_member, birthdays) if member is not None]
+        semaphore = asyncio.Semaphore(BIRTHDAY_CONCURRENCY)
 
-            user = guild.get_member(person._id)
-            if user is None:
-                return
+        async def give_role(member):
+            async with semaphore:
+                try:
+                    await give_user_birthday_role(self.bot, member, guild)
+                except Exception:
+                    logger.error(f"Failed to give {member} the birthday role: {traceback.format_exc()}")
 
-            await give_user_birthday_role(self.bot, user, guild)
+        await asyncio.gather(*(give_role(member) for member in members))
+        logger.info(f"Gave the birthday role to {len(members)} members")
 
 
 async def setup(bot):
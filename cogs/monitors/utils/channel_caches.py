@@ -0,0 +1,69 @@
+import discord
+from discord.ext import commands
+from utils import cfg
+
+
+class ChannelCaches(commands.Cog):
+    """Keeps the common issues and rules caches up to date with their channels,
+    so they never have to re-read the channel history after startup.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+
+    @property
+    def caches(self):
+        return [self.bot.issue_cache, self.bot.rule_cache]
+
+    def watches(self, channel_id: int) -> bool:
+        return any(cache.channel_id == channel_id for cache in self.caches)
+
+    @commands.Cog.listener()
+    async def on_message(self, message: discord.Message):
+        if message.guild is None or message.guild.id != cfg.guild_id:
+            return
+        if not self.watches(message.channel.id):
+            return
+
+        for cache in self.caches:
+            await cache.handle_message(message)
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        if payload.guild_id != cfg.guild_id:
+            return
+        if not self.watches(payload.channel_id):
+            return
+
+        channel = self.bot.get_channel(payload.channel_id)
+        if channel is None:
+            return
+
+        # the payload only has the changed fields, so get the whole message
+        try:
+            message = await channel.fetch_message(payload.message_id)
+        except discord.NotFound:
+            return
+
+        for cache in self.caches:
+            await cache.handle_message(message)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if payload.guild_id != cfg.guild_id:
+            return
+
+        for cache in self.caches:
+            await cache.handle_delete(payload.channel_id, [payload.message_id])
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        if payload.guild_id != cfg.guild_id:
+            return
+
+        for cache in self.caches:
+            await cache.handle_delete(payload.channel_id, payload.message_ids)
+
+
+async def setup(bot):
+    await bot.add_cog(ChannelCaches(bot))
@@ -3,13 +3,11 @@ import os
 import re
 import traceback
 
-import aiohttp
 import discord
 from discord.ext import commands
 
-from utils import canister_fetch_repos, cfg, logger
+from utils import cfg, get_repo_index, http_client, is_default_repo, logger
 from utils.framework import gatekeeper
-from utils.views import default_repos
 
 
 class RepoWatcher(commands.Cog):
@@ -34,14 +32,12 @@ class RepoWatcher(commands.Cog):
         if url is None:
             return
 
-        repos = await canister_fetch_repos()
-        repos = [repo['uri'].lower() for repo in repos if repo.get('uri')]
-
         potential_repo = url.group(0).rstrip("/").lower()
-        if any(repo in potential_repo for repo in default_repos):
+        if is_default_repo(potential_repo):
             return
 
-        if potential_repo not in repos:
+        repo_index = await get_repo_index()
+        if repo_index.find(potential_repo) is None:
             return
 
         view = discord.ui.View()
@@ -68,26 +64,26 @@ class Tweaks(commands.Cog):
         if not ("apt" in message.content.lower() and "base structure" in message.content.lower() and ("libhooker" or "substitute" or "substrate" in message.content.lower()) and len(message.content.splitlines()) >= 50):
             return
 
-        async with aiohttp.ClientSession(headers={'content-type': 'application/json', 'X-Auth-Token': os.environ.get("PASTEE_TOKEN")}) as session:
-            async with session.post(url='https://api.paste.ee/v1/pastes', json={"description": f"Uploaded by {message.author}", "sections": [{"name": f"Uploaded by {message.author}", "syntax": "text", "contents": message.content}]}) as response:
-                if response.status != 201:
-                    try:
-                        raise Exception(
-                            f"Failed to upload paste: {response.status}")
-                    except Exception:
-                        logger.error(traceback.format_exc())
-
-                resp = await response.json()
-                pastelink = resp.get("link")
-                if pastelink is None:
-                    return
-
-                embed = discord.Embed(
-                    title=f"Tweak list", color=discord.Color.green())
-                embed.description = f"You have pasted a tweak list, to reduce chat spam it can be viewed [here]({pastelink})."
-
-                await message.delete()
-                await message.channel.send(message.author.mention, embed=embed)
+        headers = {'content-type': 'application/json', 'X-Auth-Token': os.environ.get("PASTEE_TOKEN")}
+        async with http_client.session.post(url='https://api.paste.ee/v1/pastes', headers=headers, json={"description": f"Uploaded by {message.author}", "sections": [{"name": f"Uploaded by {message.author}", "syntax": "text", "contents": message.content}]}) as response:
+            if response.status != 201:
+                try:
+                    raise Exception(
+                        f"Failed to upload paste: {response.status}")
+                except Exception:
+                    logger.error(traceback.format_exc())
+
+            resp = await response.json()
+            pastelink = resp.get("link")
+            if pastelink is None:
+                return
+
+            embed = discord.Embed(
+                title=f"Tweak list", color=discord.Color.green())
+            embed.description = f"You have pasted a tweak list, to reduce chat spam it can be viewed [here]({pastelink})."
+
+            await message.delete()
+            await message.channel.send(message.author.mention, embed=embed)
 
 
 class Sileo(commands.Cog):
@@ -1,15 +1,56 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 
 import math
+import traceback
 from random import randint
 from data.services.user_service import user_service
 from utils.config import cfg
+from utils.logging import logger
 
 
 class Xp(commands.Cog):
+    # flush pending XP early once this many users have unsaved increments
+    FLUSH_THRESHOLD = 100
+
     def __init__(self, bot):
         self.bot = bot
+        self.flush_xp.start()
+        self.reconcile_rank_index.start()
+
+    async def cog_unload(self):
+        self.flush_xp.cancel()
+        self.reconcile_rank_index.cancel()
+        # make sure no XP is lost when the bot shuts down
+        self.do_flush()
+
+    @tasks.loop(seconds=5)
+    async def flush_xp(self):
+        """Background task to write the XP accumulated in memory to the database."""
+
+        await self.flush_pending()
+
+    @tasks.loop(minutes=30)
+    async def reconcile_rank_index(self):
+        """Background task to (re)build the leaderboard rank index from the database.
+        The first iteration runs on startup."""
+
+        try:
+            await user_service.rebuild_rank_index()
+        except Exception:
+            logger.error(traceback.format_exc())
+
+    async def flush_pending(self):
+        try:
+            await user_service.flush_xp_async()
+        except Exception:
+            logger.error(traceback.format_exc())
+
+    def do_flush(self):
+        try:
+            user_service.flush_xp()
+        except Exception:
+            logger.error(traceback.format_exc())
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member) -> None:
@@ -18,7 +59,7 @@ class Xp(commands.Cog):
         if member.guild.id != cfg.guild_id:
             return
 
-        user = user_service.get_user(id=member.id)
+        user = await user_service.aio.get_user(id=member.id)
 
         if user.is_xp_frozen or user.is_clem:
             return
@@ -40,17 +81,23 @@ class Xp(commands.Cog):
         if message.channel.id == cfg.channels.bot_commands:
             return
 
-        user = user_service.get_user(id=message.author.id)
-        if user.is_xp_frozen or user.is_clem:
+        if not user_service.has_xp_state(message.author.id):
+            await user_service.aio.load_xp_state(message.author.id)
+
+        _, _, is_frozen = user_service.get_xp_state(message.author.id)
+        if is_frozen:
             return
 
         xp_to_add = randint(0, 11)
-        new_xp, level_before = user_service.inc_xp(
+        new_xp, level_before = user_service.queue_xp(
             message.author.id, xp_to_add)
         new_level = self.get_level(new_xp)
 
         if new_level > level_before:
-            user_service.inc_level(message.author.id)
+            user_service.queue_level(message.author.id, new_level)
+
+        if user_service.pending_xp_count >= self.FLUSH_THRESHOLD:
+            await self.flush_pending()
 
         roles_to_add = self.assess_new_roles(new_level, message.author)
         await self.add_new_roles(message, roles_to_add)
@@ -110,14 +157,14 @@ class StickyRoles(commands.Cog):
 
         roles = [role.id for role in member.roles if role <
                  member.guild.me.top_role and role != member.guild.default_role]
-        user_service.set_sticky_roles(member.id, roles)
+        await user_service.aio.set_sticky_roles(member.id, roles)
 
     @commands.Cog.listener()
     async def on_member_join(self, member: discord.Member):
         if member.guild.id != cfg.guild_id:
             return
 
-        possible_roles = user_service.get_user(member.id).sticky_roles
+        possible_roles = (await user_service.aio.get_user(member.id)).sticky_roles
         roles = [member.guild.get_role(role) for role in possible_roles if member.guild.get_role(
             role) is not None and member.guild.get_role(role) < member.guild.me.top_role]
         await member.add_roles(*roles, reason="Sticky roles")
@@ -1,7 +1,13 @@
 from .case import *
+from .caseentry import *
 from .cases import *
+from .casestat import *
 from .filterword import *
 from .giveaway import *
 from .guild import *
+from .idcounter import *
+from .raidstat import *
+from .scheduledjob import *
 from .tag import *
+from .tagentry import *
 from .user import *
\ No newline at end of file
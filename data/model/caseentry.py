@@ -0,0 +1,17 @@
+import mongoengine
+from .case import Case
+
+class CaseEntry(mongoengine.Document):
+    user_id = mongoengine.IntField(required=True)
+    case    = mongoengine.EmbeddedDocumentField(Case, required=True)
+
+    meta = {
+        'db_alias': 'default',
+        'collection': 'case_entries',
+        'indexes': [
+            ('user_id', '-case._id'),
+            ('user_id', '-case.date'),
+            ('case.mod_id', '-case.date'),
+            'case._type',
+        ]
+    }
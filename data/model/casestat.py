@@ -0,0 +1,15 @@
+import mongoengine
+
+class CaseStat(mongoengine.Document):
+    mod_id  = mongoengine.IntField(required=True)
+    mod_tag = mongoengine.StringField(required=True)
+    reason  = mongoengine.StringField(required=True)
+    count   = mongoengine.IntField(default=0)
+
+    meta = {
+        'db_alias': 'default',
+        'collection': 'case_stats',
+        'indexes': [
+            {'fields': ['mod_id', 'mod_tag', 'reason'], 'unique': True},
+        ]
+    }
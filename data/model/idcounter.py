@@ -0,0 +1,10 @@
+import mongoengine
+
+class IdCounter(mongoengine.Document):
+    _id   = mongoengine.StringField(required=True)
+    value = mongoengine.IntField(default=1)
+
+    meta = {
+        'db_alias': 'default',
+        'collection': 'counters'
+    }
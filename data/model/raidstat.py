@@ -0,0 +1,10 @@
+import mongoengine
+
+class RaidStat(mongoengine.Document):
+    _id   = mongoengine.StringField(required=True)
+    count = mongoengine.IntField(default=0)
+
+    meta = {
+        'db_alias': 'default',
+        'collection': 'raid_stats'
+    }
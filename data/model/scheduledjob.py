@@ -0,0 +1,16 @@
+import mongoengine
+
+class ScheduledJob(mongoengine.Document):
+    _id    = mongoengine.StringField(required=True)
+    kind   = mongoengine.StringField(required=True)
+    # UTC
+    run_at = mongoengine.DateTimeField(required=True)
+    args   = mongoengine.ListField(default=[])
+
+    meta = {
+        'db_alias': 'default',
+        'collection': 'scheduled_jobs',
+        'indexes': [
+            'run_at',
+        ]
+    }
@@ -0,0 +1,14 @@
+import mongoengine
+from .tag import Tag
+
+class TagEntry(mongoengine.Document):
+    kind = mongoengine.StringField(required=True, choices=["tag", "meme"])
+    tag  = mongoengine.EmbeddedDocumentField(Tag, required=True)
+
+    meta = {
+        'db_alias': 'default',
+        'collection': 'tag_entries',
+        'indexes': [
+            {'fields': ['kind', 'tag.name'], 'unique': True},
+        ]
+    }
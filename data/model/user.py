@@ -24,5 +24,8 @@ class User(mongoengine.Document):
 
     meta = {
         'db_alias': 'default',
-        'collection': 'users'
+        'collection': 'users',
+        'indexes': [
+            'birthday',
+        ]
     }
\ No newline at end of file
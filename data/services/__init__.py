@@ -1,2 +1,5 @@
+from .executor import *
 from .guild_service import guild_service
+from .image_cache import tag_image_cache
+from .job_service import job_service
 from .user_service import *
\ No newline at end of file
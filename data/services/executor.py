@@ -0,0 +1,54 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial, wraps
+
+# mongoengine/pymongo calls block, so async code runs them on this pool instead of
+# the event loop. pymongo's client is thread-safe and pools its own connections;
+# the pool is bounded so that a burst of events can't pile up unlimited queries.
+DB_EXECUTOR_WORKERS = 8
+
+db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="database")
+
+
+async def run_in_db_executor(func, *args, **kwargs):
+    """Runs a blocking database call on the database thread pool and waits for the result.
+
+    Parameters
+    ----------
+    func : Callable
+        The blocking function to run
+    *args, **kwargs
+        Arguments to pass to `func`
+
+    Returns
+    -------
+    Any
+        Whatever `func` returns
+    """
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(db_executor, partial(func, *args, **kwargs))
+
+
+class AsyncServiceFacade:
+    """Awaitable view of a service: every synchronous method of the wrapped service
+    is run on the database thread pool, i.e `await user_service.aio.get_user(id)`.
+    Coroutine methods and plain attributes are passed through unchanged.
+
+    Note that methods returning a lazy QuerySet still query the database when the
+    QuerySet is iterated, so those should be materialized inside the service.
+    """
+
+    def __init__(self, service):
+        self._service = service
+
+    def __getattr__(self, name):
+        attr = getattr(self._service, name)
+        if not callable(attr) or asyncio.iscoroutinefunction(attr):
+            return attr
+
+        @wraps(attr)
+        async def wrapper(*args, **kwargs):
+            return await run_in_db_executor(attr, *args, **kwargs)
+
+        return wrapper
@@ -1,10 +1,31 @@
-from aiocache import cached, caches
-from data.model import FilterWord, Guild, Tag, Giveaway
+from collections import deque
+from typing import List
+
+from data.model import FilterWord, Guild, IdCounter, Tag, Giveaway
 from utils import cfg
 
+from .executor import AsyncServiceFacade
+from .tag_store import TagStore
+
 class GuildService:
+    def __init__(self):
+        self._guild: Guild = None
+        # bumped whenever the snapshot is reloaded
+        self.snapshot_version = 0
+        self.cache_stats = {"hits": 0, "misses": 0, "refreshes": 0}
+        self.aio = AsyncServiceFacade(self)
+
+        self._case_id_counter_ready = False
+        self._reserved_case_ids = deque()
+
+        self.tag_store = TagStore("tag")
+        self.meme_store = TagStore("meme")
+
     def get_guild(self) -> Guild:
-        """Returns the state of the main guild from the database.
+        """Returns the state of the main guild. The document is only loaded from the
+        database on the first call, after that a snapshot held in memory is returned.
+        Every mutator in this service keeps that snapshot up to date, so the returned
+        document should be treated as read-only by callers.
 
         Returns
         -------
@@ -12,48 +33,114 @@ class GuildService:
             The Guild document object that holds information about the main guild.
         """
 
-        return Guild.objects(_id=cfg.guild_id).first()
-    
+        if self._guild is None:
+            self.cache_stats["misses"] += 1
+            return self.refresh_guild()
+
+        self.cache_stats["hits"] += 1
+        return self._guild
+
+    def refresh_guild(self) -> Guild:
+        """Reloads the snapshot of the main guild from the database.
+
+        Returns
+        -------
+        Guild
+            The freshly loaded Guild document.
+        """
+
+        self._guild = Guild.objects(_id=cfg.guild_id).first()
+        self.snapshot_version += 1
+        self.cache_stats["refreshes"] += 1
+        return self._guild
+
     def add_tag(self, tag: Tag) -> None:
-        Guild.objects(_id=cfg.guild_id).update_one(push__tags=tag)
+        self.tag_store.add(tag)
 
     def remove_tag(self, tag: str):
-        return Guild.objects(_id=cfg.guild_id).update_one(pull__tags__name=Tag(name=tag).name)
+        return self.tag_store.remove(tag)
 
     def edit_tag(self, tag):
-        return Guild.objects(_id=cfg.guild_id, tags__name=tag.name).update_one(set__tags__S=tag)
+        return self.tag_store.edit(tag)
 
     def get_tag(self, name: str):
-        tag = Guild.objects.get(_id=cfg.guild_id).tags.filter(name=name).first()
-        if tag is None:
-            return
-        tag.use_count += 1
-        self.edit_tag(tag)
-        return tag
+        return self.tag_store.get(name)
+
+    def get_tags(self) -> List[Tag]:
+        return self.tag_store.all()
 
     def add_meme(self, meme: Tag) -> None:
-        Guild.objects(_id=cfg.guild_id).update_one(push__memes=meme)
+        self.meme_store.add(meme)
 
     def remove_meme(self, meme: str):
-        return Guild.objects(_id=cfg.guild_id).update_one(pull__memes__name=Tag(name=meme).name)
+        return self.meme_store.remove(meme)
 
     def edit_meme(self, meme):
-        return Guild.objects(_id=cfg.guild_id, memes__name=meme.name).update_one(set__memes__S=meme)
+        return self.meme_store.edit(meme)
 
     def get_meme(self, name: str):
-        meme = Guild.objects.get(_id=cfg.guild_id).memes.filter(name=name).first()
-        if meme is None:
-            return
-        meme.use_count += 1
-        self.edit_meme(meme)
-        return meme
+        return self.meme_store.get(name)
+
+    def get_memes(self) -> List[Tag]:
+        return self.meme_store.all()
+
+    def migrate_tags(self) -> int:
+        """Moves tags and memes out of the Guild document into their own collection.
+
+        Returns
+        -------
+        int
+            The number of tags and memes that were moved
+        """
+
+        moved = self.tag_store.migrate() + self.meme_store.migrate()
+        self.refresh_guild()
+        return moved
     
-    def inc_caseid(self) -> None:
-        """Increments Guild.case_id, which keeps track of the next available ID to
-        use for a case.
+    def _allocate_case_ids(self, count: int) -> range:
+        """Atomically takes `count` case IDs from the counter document in one round-trip.
+        The counter is created from Guild.case_id the first time it is needed.
+        """
+
+        if not self._case_id_counter_ready:
+            guild = Guild.objects(_id=cfg.guild_id).only('case_id').first()
+            IdCounter.objects(_id="case_id").update_one(upsert=True, set_on_insert__value=guild.case_id)
+            self._case_id_counter_ready = True
+
+        counter = IdCounter.objects(_id="case_id").modify(inc__value=count, new=True)
+        return range(counter.value - count, counter.value)
+
+    def next_case_id(self) -> int:
+        """Returns a new, unique ID to use for a case. IDs previously reserved with
+        `reserve_case_ids` are handed out first, otherwise one is taken from the database.
+
+        Returns
+        -------
+        int
+            The case ID
         """
 
-        Guild.objects(_id=cfg.guild_id).update_one(inc__case_id=1)
+        # deque operations are atomic, so this needs no lock against reserve_case_ids
+        # running on the database threads
+        try:
+            return self._reserved_case_ids.popleft()
+        except IndexError:
+            return self._allocate_case_ids(1)[0]
+
+    def reserve_case_ids(self, count: int) -> None:
+        """Reserves a block of `count` case IDs in memory with a single database round-trip,
+        so that the next calls to `next_case_id` don't need one. Useful before mass bans.
+
+        Parameters
+        ----------
+        count : int
+            How many case IDs to reserve
+        """
+
+        if count <= 0:
+            return
+
+        self._reserved_case_ids.extend(self._allocate_case_ids(count))
 
     def get_giveaway(self, _id: int) -> Giveaway:
         """
@@ -102,19 +189,30 @@ class GuildService:
         if(len(existing) > 0):
             return False
         Guild.objects(_id=cfg.guild_id).update_one(push__raid_phrases=FilterWord(word=phrase, bypass=5, notify=True))
-        await self.get_raid_phrases.cache.clear()
+        self.refresh_guild()
         return True
     
-    @cached(ttl=3600, key="guild_raid_phrases")
     async def get_raid_phrases(self):
         return self.get_guild().raid_phrases
 
     async def remove_raid_phrase(self, phrase: str):
-        await self.get_raid_phrases.cache.clear()
         Guild.objects(_id=cfg.guild_id).update_one(pull__raid_phrases__word=FilterWord(word=phrase).word)
+        self.refresh_guild()
 
     def set_spam_mode(self, mode) -> None:
         Guild.objects(_id=cfg.guild_id).update_one(set__ban_today_spam_accounts=mode)
+        if self._guild is not None:
+            self._guild.ban_today_spam_accounts = mode
+
+    def set_sabbath_mode(self, mode: bool) -> None:
+        Guild.objects(_id=cfg.guild_id).update_one(set__sabbath_mode=mode)
+        if self._guild is not None:
+            self._guild.sabbath_mode = mode
+
+    def set_emoji_logging_webhook(self, webhook: str) -> None:
+        Guild.objects(_id=cfg.guild_id).update_one(set__emoji_logging_webhook=webhook)
+        if self._guild is not None:
+            self._guild.emoji_logging_webhook = webhook
 
     async def add_filtered_word(self, fw: FilterWord) -> None:
         existing = self.get_guild().filter_words.filter(word=fw.word)
@@ -122,66 +220,67 @@ class GuildService:
             return False
 
         Guild.objects(_id=cfg.guild_id).update_one(push__filter_words=fw)
-        await self.get_filtered_words.cache.clear()
+        self.refresh_guild()
         return True
 
-    @cached(ttl=3600, key="guild_filtered_words")
     async def get_filtered_words(self) -> FilterWord:
         return self.get_guild().filter_words
 
     async def remove_filtered_word(self, word: str):
-        await self.get_filtered_words.cache.clear()
-        return Guild.objects(_id=cfg.guild_id).update_one(pull__filter_words__word=FilterWord(word=word).word)
+        res = Guild.objects(_id=cfg.guild_id).update_one(pull__filter_words__word=FilterWord(word=word).word)
+        self.refresh_guild()
+        return res
 
     async def update_filtered_word(self, word: FilterWord):
-        await self.get_filtered_words.cache.clear()
-        return Guild.objects(_id=cfg.guild_id, filter_words__word=word.word).update_one(set__filter_words__S=word)
+        res = Guild.objects(_id=cfg.guild_id, filter_words__word=word.word).update_one(set__filter_words__S=word)
+        self.refresh_guild()
+        return res
 
     def add_whitelisted_guild(self, id: int):
-        g = Guild.objects(_id=cfg.guild_id)
-        g2 = g.first()
-        if id not in g2.filter_excluded_guilds:
-            g.update_one(push__filter_excluded_guilds=id)
+        g = self.get_guild()
+        if id not in g.filter_excluded_guilds:
+            Guild.objects(_id=cfg.guild_id).update_one(push__filter_excluded_guilds=id)
+            g.filter_excluded_guilds.append(id)
             return True
         return False
 
     def remove_whitelisted_guild(self, id: int):
-        g = Guild.objects(_id=cfg.guild_id)
-        g2 = g.first()
-        if id in g2.filter_excluded_guilds:
-            g.update_one(pull__filter_excluded_guilds=id)
+        g = self.get_guild()
+        if id in g.filter_excluded_guilds:
+            Guild.objects(_id=cfg.guild_id).update_one(pull__filter_excluded_guilds=id)
+            g.filter_excluded_guilds.remove(id)
             return True
         return False
 
     def add_ignored_channel(self, id: int):
-        g = Guild.objects(_id=cfg.guild_id)
-        g2 = g.first()
-        if id not in g2.filter_excluded_channels:
-            g.update_one(push__filter_excluded_channels=id)
+        g = self.get_guild()
+        if id not in g.filter_excluded_channels:
+            Guild.objects(_id=cfg.guild_id).update_one(push__filter_excluded_channels=id)
+            g.filter_excluded_channels.append(id)
             return True
         return False
 
     def remove_ignored_channel(self, id: int):
-        g = Guild.objects(_id=cfg.guild_id)
-        g2 = g.first()
-        if id in g2.filter_excluded_channels:
-            g.update_one(pull__filter_excluded_channels=id)
+        g = self.get_guild()
+        if id in g.filter_excluded_channels:
+            Guild.objects(_id=cfg.guild_id).update_one(pull__filter_excluded_channels=id)
+            g.filter_excluded_channels.remove(id)
             return True
         return False
 
     def add_ignored_channel_logging(self, id: int):
-        g = Guild.objects(_id=cfg.guild_id)
-        g2 = g.first()
-        if id not in g2.logging_excluded_channels:
-            g.update_one(push__logging_excluded_channels=id)
+        g = self.get_guild()
+        if id not in g.logging_excluded_channels:
+            Guild.objects(_id=cfg.guild_id).update_one(push__logging_excluded_channels=id)
+            g.logging_excluded_channels.append(id)
             return True
         return False
 
     def remove_ignored_channel_logging(self, id: int):
-        g = Guild.objects(_id=cfg.guild_id)
-        g2 = g.first()
-        if id in g2.logging_excluded_channels:
-            g.update_one(pull__logging_excluded_channels=id)
+        g = self.get_guild()
+        if id in g.logging_excluded_channels:
+            Guild.objects(_id=cfg.guild_id).update_one(pull__logging_excluded_channels=id)
+            g.logging_excluded_channels.remove(id)
             return True
         return False
 
@@ -190,13 +289,17 @@ class GuildService:
 
     def add_locked_channels(self, channel):
         Guild.objects(_id=cfg.guild_id).update_one(push__locked_channels=channel)
+        if self._guild is not None:
+            self._guild.locked_channels.append(channel)
 
     def remove_locked_channels(self, channel):
         Guild.objects(_id=cfg.guild_id).update_one(pull__locked_channels=channel)
+        if self._guild is not None:
+            self._guild.locked_channels = [c for c in self._guild.locked_channels if c != channel]
 
     def set_nsa_mapping(self, channel_id, webhooks):
-        guild = Guild.objects(_id=cfg.guild_id).first()
-        guild.nsa_mapping[str(channel_id)] = webhooks
-        guild.save()
+        Guild.objects(_id=cfg.guild_id).update_one(**{f"set__nsa_mapping__{channel_id}": webhooks})
+        if self._guild is not None:
+            self._guild.nsa_mapping[str(channel_id)] = webhooks
 
 guild_service = GuildService()
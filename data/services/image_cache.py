@@ -0,0 +1,94 @@
+from collections import OrderedDict, namedtuple
+from threading import Lock
+
+from mongoengine.fields import GridFSProxy
+
+# upper bound for the total size of the image bytes held in memory
+TAG_IMAGE_CACHE_BYTES = 64 * 1024 * 1024
+
+CachedImage = namedtuple("CachedImage", ["data", "content_type"])
+
+
+class TagImageCache:
+    """Least recently used cache of tag and meme images, keyed by GridFS file ID.
+    The content type is cached along with the bytes, so an image that is
+    in the cache can be sent without touching GridFS at all.
+
+    GridFS files are never changed in place (editing an image stores a new file),
+    but commands that replace or delete an image should still `invalidate` it
+    so its memory is freed right away.
+    """
+
+    def __init__(self, max_bytes: int = TAG_IMAGE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._images = OrderedDict()
+        self._lock = Lock()
+
+    def read(self, image: GridFSProxy) -> CachedImage:
+        """Returns the bytes and content type of a tag's image,
+        or None if the tag has no image.
+
+        Parameters
+        ----------
+        image : GridFSProxy
+            The `image` field of a Tag
+
+        Returns
+        -------
+        CachedImage
+            Named tuple of (data, content_type)
+        """
+
+        key = image.grid_id
+        if key is None:
+            return None
+
+        with self._lock:
+            cached = self._images.get(key)
+            if cached is not None:
+                self._images.move_to_end(key)
+                self.stats["hits"] += 1
+                return cached
+
+            self.stats["misses"] += 1
+
+        data = image.read()
+        if data is None:
+            return None
+
+        cached = CachedImage(data, image.content_type)
+        if len(data) <= self.max_bytes:
+            with self._lock:
+                if key not in self._images:
+                    self._images[key] = cached
+                    self.size += len(data)
+                self._evict()
+
+        return cached
+
+    def invalidate(self, image: GridFSProxy) -> None:
+        """Forgets the cached bytes of an image, if there are any."""
+
+        with self._lock:
+            cached = self._images.pop(image.grid_id, None)
+            if cached is not None:
+                self.size -= len(cached.data)
+
+    def _evict(self) -> None:
+        while self.size > self.max_bytes:
+            _, evicted = self._images.popitem(last=False)
+            self.size -= len(evicted.data)
+            self.stats["evictions"] += 1
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self._images)
+
+
+tag_image_cache = TagImageCache()
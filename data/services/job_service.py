@@ -0,0 +1,88 @@
+import pickle
+from datetime import datetime, timezone
+from typing import List, Tuple
+
+from data.model import ScheduledJob
+
+from .executor import AsyncServiceFacade
+
+# APScheduler callback name -> job kind, for migrating jobs from the old job store
+LEGACY_JOB_KINDS = {
+    "untimeout_callback": "untimeout",
+    "reminder_callback": "remind",
+    "remove_bday_callback": "remove_bday",
+    "end_giveaway_callback": "end_giveaway",
+    "remove_new_member_role_callback": "remove_new_member_role",
+}
+
+
+def to_utc_naive(date: datetime) -> datetime:
+    """Mongo stores naive UTC datetimes. Naive datetimes are assumed to be UTC already."""
+
+    if date.tzinfo is not None:
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    return date
+
+
+class JobService:
+    """Durable store for the jobs of the scheduler in utils.jobs. The scheduler keeps
+    every pending job in memory; this collection is only read once, at startup,
+    and written to when a job is scheduled, cancelled or done.
+    """
+
+    def __init__(self):
+        self.aio = AsyncServiceFacade(self)
+
+    def get_jobs(self) -> List[ScheduledJob]:
+        return list(ScheduledJob.objects)
+
+    def save_job(self, job_id: str, kind: str, run_at: datetime, args: list) -> None:
+        ScheduledJob.objects(_id=job_id).update_one(
+            upsert=True, set__kind=kind, set__run_at=to_utc_naive(run_at), set__args=list(args))
+
+    def delete_job(self, job_id: str) -> None:
+        ScheduledJob.objects(_id=job_id).delete()
+
+    def migrate_apscheduler_jobs(self) -> Tuple[int, int]:
+        """Copies the jobs APScheduler left in the `jobs` collection to the new job store
+        and removes them from the old one. Needs APScheduler to be installed, since
+        its job states are pickled objects.
+
+        Returns
+        -------
+        Tuple[int, int]
+            How many jobs were migrated, and how many couldn't be read or were of an unknown kind
+        """
+
+        legacy = ScheduledJob._get_db()["jobs"]
+        migrated = skipped = 0
+        for document in legacy.find():
+            try:
+                state = pickle.loads(document["job_state"])
+                kind = LEGACY_JOB_KINDS[state["func"].split(":")[-1]]
+                run_at = state["next_run_time"]
+                args = list(state["args"])
+            except Exception:
+                skipped += 1
+                continue
+
+            if run_at is None:
+                # paused job, nothing to run
+                skipped += 1
+                continue
+
+            if kind == "end_giveaway":
+                job_id = f"{kind}:{args[1]}"
+            elif kind == "remind":
+                job_id = f"{kind}:{args[0]}:{document['_id']}"
+            else:
+                job_id = f"{kind}:{args[0]}"
+
+            self.save_job(job_id, kind, run_at, args)
+            legacy.delete_one({"_id": document["_id"]})
+            migrated += 1
+
+        return migrated, skipped
+
+
+job_service = JobService()
@@ -0,0 +1,69 @@
+import threading
+from typing import List, Tuple
+
+from sortedcontainers import SortedList
+
+
+class XpRankIndex:
+    """In-memory order statistics over every user's XP, so that leaderboard
+    rank and top-N lookups don't have to count or sort the users collection.
+
+    Users are kept in a sorted list keyed on (-xp, -_id), which is the same order
+    as the leaderboard query (`order_by('-xp', '-_id')`). Inserts, removals and
+    rank lookups are all O(log n).
+
+    The index is updated from the event loop and from the database threads (when
+    `UserService.get_user` creates a user), so every access holds a lock.
+    """
+
+    def __init__(self):
+        self._keys = SortedList()
+        self._users = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._users)
+
+    def update(self, _id: int, xp: int, level: int) -> None:
+        """Inserts a user into the index or moves them to their new position.
+
+        Parameters
+        ----------
+        _id : int
+            The user's ID
+        xp : int
+            The user's current XP
+        level : int
+            The user's current level
+        """
+
+        with self._lock:
+            old = self._users.get(_id)
+            self._users[_id] = (xp, level)
+            if old is not None:
+                if old[0] == xp:
+                    return
+                self._keys.remove((-old[0], -_id))
+
+            self._keys.add((-xp, -_id))
+
+    def remove(self, _id: int) -> None:
+        with self._lock:
+            old = self._users.pop(_id, None)
+            if old is not None:
+                self._keys.remove((-old[0], -_id))
+
+    def rank(self, xp: int) -> int:
+        """Returns how many users have at least `xp` XP, i.e the leaderboard
+        position of someone with that much XP.
+        """
+
+        # keys are negated, so everyone with xp >= `xp` sorts before (-xp + 1,)
+        with self._lock:
+            return self._keys.bisect_left((-xp + 1,))
+
+    def top(self, n: int) -> List[Tuple[int, int, int]]:
+        """Returns the first `n` users of the leaderboard as (_id, xp, level) tuples."""
+
+        with self._lock:
+            return [(-neg_id, -neg_xp, self._users[-neg_id][1]) for neg_xp, neg_id in self._keys[:n]]
@@ -0,0 +1,150 @@
+from collections import Counter
+from threading import Lock
+from typing import Dict, List
+
+from data.model import Guild, Tag, TagEntry
+from pymongo import UpdateOne
+from utils import cfg
+
+from .executor import run_in_db_executor
+
+
+class TagStore:
+    """Tags (or memes) of the main guild, each stored as its own TagEntry document.
+
+    All entries of one kind are loaded into a name index in memory on first use,
+    so looking one up doesn't need a database round-trip. Uses are counted in memory
+    and written back in batches with `flush_uses` or `flush_uses_async`.
+    """
+
+    def __init__(self, kind: str):
+        self.kind = kind
+        self._index: Dict[str, Tag] = None
+        # bumped whenever the set of names changes
+        self.version = 0
+        self._pending_uses = Counter()
+        self._load_lock = Lock()
+
+    def _get_index(self) -> Dict[str, Tag]:
+        if self._index is None:
+            with self._load_lock:
+                if self._index is None:
+                    self._index = {entry.tag.name: entry.tag for entry in TagEntry.objects(kind=self.kind)}
+                    self.version += 1
+
+        return self._index
+
+    def get(self, name: str) -> Tag:
+        """Return the entry with the given name and count a use of it,
+        or None if there is no such entry.
+        """
+
+        tag = self._get_index().get(name)
+        if tag is None:
+            return
+
+        tag.use_count += 1
+        self._pending_uses[name] += 1
+        return tag
+
+    def all(self) -> List[Tag]:
+        """Return all entries, sorted by name."""
+
+        return sorted(self._get_index().values(), key=lambda tag: tag.name)
+
+    def names(self) -> List[str]:
+        return list(self._get_index().keys())
+
+    def add(self, tag: Tag) -> None:
+        TagEntry(kind=self.kind, tag=tag).save()
+        self._get_index()[tag.name] = tag
+        self.version += 1
+
+    def edit(self, tag: Tag) -> int:
+        # the stored document gets the in-memory use_count, which already includes pending uses
+        self._pending_uses.pop(tag.name, None)
+        res = TagEntry.objects(kind=self.kind, tag__name=tag.name).update_one(set__tag=tag)
+        if res:
+            self._get_index()[tag.name] = tag
+        return res
+
+    def remove(self, name: str) -> int:
+        self._pending_uses.pop(name, None)
+        res = TagEntry.objects(kind=self.kind, tag__name=name).delete()
+        self._get_index().pop(name, None)
+        self.version += 1
+        return res
+
+    def _take_pending_uses(self):
+        pending, self._pending_uses = self._pending_uses, Counter()
+        operations = [UpdateOne({"kind": self.kind, "tag.name": name}, {"$inc": {"tag.use_count": uses}})
+                      for name, uses in pending.items()]
+        return pending, operations
+
+    def flush_uses(self) -> int:
+        """Writes the uses counted since the last flush to the database with a single bulk write.
+
+        Returns
+        -------
+        int
+            The number of entries that were updated
+        """
+
+        pending, operations = self._take_pending_uses()
+        if not operations:
+            return 0
+
+        try:
+            TagEntry._get_collection().bulk_write(operations, ordered=False)
+        except Exception:
+            self._pending_uses.update(pending)
+            raise
+
+        return len(operations)
+
+    async def flush_uses_async(self) -> int:
+        """Same as `flush_uses`, but the bulk write runs on the database thread pool."""
+
+        pending, operations = self._take_pending_uses()
+        if not operations:
+            return 0
+
+        try:
+            await run_in_db_executor(TagEntry._get_collection().bulk_write, operations, ordered=False)
+        except Exception:
+            self._pending_uses.update(pending)
+            raise
+
+        return len(operations)
+
+    def migrate(self) -> int:
+        """Moves entries of this kind out of the legacy embedded list in the Guild document
+        into their own documents. Entries that were already moved are skipped,
+        and the embedded list is removed afterwards, so this is safe to run again.
+
+        Returns
+        -------
+        int
+            The number of entries that were moved
+        """
+
+        field = "tags" if self.kind == "tag" else "memes"
+        guild = Guild.objects(_id=cfg.guild_id).only(field).first()
+        legacy = getattr(guild, field) or []
+
+        existing = set(entry.tag.name for entry in TagEntry.objects(kind=self.kind).only('tag.name'))
+        entries = []
+        for tag in legacy:
+            if tag.name in existing:
+                continue
+            existing.add(tag.name)
+            entries.append(TagEntry(kind=self.kind, tag=tag))
+        if entries:
+            TagEntry.objects.insert(entries, load_bulk=False)
+
+        Guild.objects(_id=cfg.guild_id).update_one(**{f"unset__{field}": True})
+
+        with self._load_lock:
+            self._index = None
+
+        return len(entries)
@@ -1,7 +1,49 @@
-from typing import Counter
-from data.model import Case, Cases, User
+import time
+from threading import Lock
+from typing import Counter, Dict, List, Tuple
+from bson import ObjectId
+from data.model import Case, CaseEntry, Cases, CaseStat, RaidStat, User
+from pymongo import UpdateOne
+
+from .executor import AsyncServiceFacade, run_in_db_executor
+from .rank_index import XpRankIndex
+
+# raid statistic name -> text that antiraid puts in the case reason
+RAID_CASE_REASONS = {
+    "Join spam": "Join spam detected",
+    "Join spam over time": "Join spam over time detected",
+    "Raid phrase": "Raid phrase detected",
+    "Ping spam": "Ping spam",
+    "Message spam": "Message spam",
+}
+
+
+def normalize_case_reason(reason: str) -> str:
+    string = reason.lower()
+    return ''.join(e for e in string if e.isalnum() or e == " ").strip()
+
+# past this many users, the XP state of users without pending XP is forgotten after a flush
+MAX_XP_STATE_USERS = 50000
 
 class UserService:
+    def __init__(self):
+        # write-behind XP state: user ID -> [xp, level, is_frozen] as last known
+        # locally, and user ID -> [pending xp increment, pending level]
+        self._xp_state = {}
+        self._pending_xp = {}
+        self._flushes_in_flight = 0
+        # built by `rebuild_rank_index`, until then leaderboard queries hit the database
+        self.rank_index: XpRankIndex = None
+        self.aio = AsyncServiceFacade(self)
+
+        # while `backfill_case_stats` runs, the statistics of cases newer than the cases it
+        # counts are held back here, and applied to the rebuilt statistics afterwards.
+        # The lock is only ever held for in-memory bookkeeping, never for a database call.
+        self._case_stats_lock = Lock()
+        self._case_stats_cutoff: ObjectId = None
+        self._held_case_stats = []
+        self._case_writes_in_flight = set()
+
     def get_user(self, id: int) -> User:
         """Look up the User document of a user, whose ID is given by `id`.
         If the user doesn't have a User document in the database, first create that.
@@ -23,16 +65,45 @@ class UserService:
             user = User()
             user._id = id
             user.save()
+            if self.rank_index is not None and id not in self._xp_state:
+                self.rank_index.update(id, user.xp, user.level)
         return user
     
     def leaderboard(self) -> list:
+        if self.rank_index is not None:
+            return [User(_id=_id, xp=xp, level=level) for _id, xp, level in self.rank_index.top(130)]
+
         return User.objects[0:130].only('_id', 'xp').order_by('-xp', '-_id').select_related()
 
     def leaderboard_rank(self, xp):
+        if self.rank_index is not None:
+            return (self.rank_index.rank(xp), len(self.rank_index))
+
         users = User.objects().only('_id', 'xp')
         overall = users().count()
         rank = users(xp__gte=xp).count()
         return (rank, overall)
+
+    async def rebuild_rank_index(self) -> None:
+        """Builds the leaderboard rank index from the users collection and swaps it in.
+        Run on startup and periodically afterwards to reconcile the index with the database.
+        """
+
+        # write pending XP first, so that the database is as current as we are
+        await self.flush_xp_async()
+
+        def fetch_users():
+            return list(User._get_collection().find({}, {"xp": 1, "level": 1}))
+
+        index = XpRankIndex()
+        for user in await run_in_db_executor(fetch_users):
+            index.update(user["_id"], user.get("xp", 0), user.get("level", 0))
+
+        # XP granted while we were reading is only reflected in the local state
+        for _id, (xp, level, _) in list(self._xp_state.items()):
+            index.update(_id, xp, level)
+
+        self.rank_index = index
     
     def inc_points(self, _id: int, points: int) -> None:
         """Increments the warnpoints by `points` of a user whose ID is given by `_id`.
@@ -65,10 +136,179 @@ class UserService:
 
         self.get_user(id)
         User.objects(_id=id).update_one(inc__level=1)
+
+    def get_xp_state(self, id: int) -> list:
+        """Returns the locally known XP state of a user, as [xp, level, is_frozen].
+        The User document is only read the first time we see a user, afterwards
+        the state is kept up to date by `queue_xp` and `queue_level`.
+
+        Parameters
+        ----------
+        id : int
+            The user's ID
+
+        Returns
+        -------
+        list
+            [xp, level, is_frozen], where is_frozen is True for frozen or clemmed users
+        """
+
+        state = self._xp_state.get(id)
+        if state is None:
+            state = self.load_xp_state(id)
+        return state
+
+    def has_xp_state(self, id: int) -> bool:
+        return id in self._xp_state
+
+    def load_xp_state(self, id: int) -> list:
+        """Reads the XP state of a user from their User document, unless another
+        caller already did. Safe to run on the database thread pool.
+        """
+
+        user = self.get_user(id)
+        return self._xp_state.setdefault(id, [user.xp, user.level, user.is_xp_frozen or user.is_clem])
+
+    def queue_xp(self, id: int, xp: int) -> Tuple[int, int]:
+        """Adds XP to a user in memory. The increment is written to the database
+        on the next `flush_xp`.
+
+        Parameters
+        ----------
+        id : int
+            The user's ID
+        xp : int
+            The amount of XP to add
+
+        Returns
+        -------
+        Tuple[int, int]
+            The user's new XP and their level before this increment
+        """
+
+        state = self.get_xp_state(id)
+        level_before = state[1]
+        state[0] += xp
+
+        pending = self._pending_xp.setdefault(id, [0, None])
+        pending[0] += xp
+
+        if self.rank_index is not None:
+            self.rank_index.update(id, state[0], state[1])
+        return (state[0], level_before)
+
+    def queue_level(self, id: int, level: int) -> None:
+        """Sets a user's level in memory, to be written on the next `flush_xp`.
+        """
+
+        state = self.get_xp_state(id)
+        state[1] = level
+        self._pending_xp.setdefault(id, [0, None])[1] = level
+
+        if self.rank_index is not None:
+            self.rank_index.update(id, state[0], level)
+
+    @property
+    def pending_xp_count(self) -> int:
+        return len(self._pending_xp)
+
+    def flush_xp(self) -> int:
+        """Writes every pending XP increment and level up to the database
+        with a single bulk write.
+
+        Returns
+        -------
+        int
+            The number of users that were updated
+        """
+
+        pending, operations = self._take_pending_xp()
+        if not operations:
+            return 0
+
+        try:
+            User._get_collection().bulk_write(operations, ordered=False)
+        except Exception:
+            self._requeue_xp(pending)
+            raise
+
+        self._evict_xp_state()
+        return len(operations)
+
+    async def flush_xp_async(self) -> int:
+        """Same as `flush_xp`, but the bulk write runs on the database thread pool.
+        The pending increments are swapped out on the event loop so that no
+        increment queued during the write is lost.
+        """
+
+        pending, operations = self._take_pending_xp()
+        if not operations:
+            return 0
+
+        self._flushes_in_flight += 1
+        try:
+            await run_in_db_executor(User._get_collection().bulk_write, operations, ordered=False)
+        except Exception:
+            self._requeue_xp(pending)
+            raise
+        finally:
+            self._flushes_in_flight -= 1
+
+        self._evict_xp_state()
+        return len(operations)
+
+    def _take_pending_xp(self):
+        pending, self._pending_xp = self._pending_xp, {}
+        operations = []
+        for id, (xp, level) in pending.items():
+            update = {"$inc": {"xp": xp}}
+            if level is not None:
+                update["$max"] = {"level": level}
+            operations.append(UpdateOne({"_id": id}, update))
+
+        return pending, operations
+
+    def _requeue_xp(self, pending) -> None:
+        # put the increments back so they are retried on the next flush
+        for id, (xp, level) in pending.items():
+            requeued = self._pending_xp.setdefault(id, [0, None])
+            requeued[0] += xp
+            if level is not None and (requeued[1] is None or requeued[1] < level):
+                requeued[1] = level
+
+    def _evict_xp_state(self) -> None:
+        # users whose XP is being written by another flush have to keep their state,
+        # or it would be read back from the database without that XP
+        if self._flushes_in_flight or len(self._xp_state) <= MAX_XP_STATE_USERS:
+            return
+
+        excess = len(self._xp_state) - MAX_XP_STATE_USERS
+        # oldest first; the database threads may add users meanwhile, so iterate over a copy
+        for id in list(self._xp_state):
+            if excess <= 0:
+                break
+            if id not in self._pending_xp:
+                self._xp_state.pop(id, None)
+                excess -= 1
+
+    def invalidate_xp(self, id: int) -> None:
+        """Flushes pending XP and forgets the cached XP state of a user,
+        for when their User document was changed outside of `queue_xp`.
+        """
+
+        if id in self._pending_xp:
+            self.flush_xp()
+        self._xp_state.pop(id, None)
     
-    def get_cases(self, id: int) -> Cases:
-        """Return the Document representing the cases of a user, whose ID is given by `id`
-        If the user doesn't have a Cases document in the database, first create that.
+    def _query_cases(self, id: int, exclude_types=()):
+        query = CaseEntry.objects(user_id=id)
+        if exclude_types:
+            query = query(case___type__nin=list(exclude_types))
+        return query
+
+    def get_cases(self, id: int) -> List[Case]:
+        """Return every case of a user, whose ID is given by `id`, oldest first.
+        Prefer `count_cases` and `get_cases_page` when not all cases are needed.
 
         Parameters
         ----------
@@ -77,23 +317,85 @@ class UserService:
 
         Returns
         -------
-        Cases
-            [description]
+        List[Case]
+            The user's cases
         """
 
-        cases = Cases.objects(_id=id).first()
-        # first we ensure this user has a Cases document in the database before continuing
-        if cases is None:
-            cases = Cases()
-            cases._id = id
-            cases.save()
-        return cases
-    
+        return [entry.case for entry in self._query_cases(id).order_by('case._id')]
+
+    def count_cases(self, id: int, exclude_types=()) -> int:
+        """Counts the cases of a user, whose ID is given by `id`.
+
+        Parameters
+        ----------
+        id : int
+            The user whose cases we want to count.
+        exclude_types : Iterable[str], optional
+            Case types that should not be counted, i.e ("UNMUTE",)
+
+        Returns
+        -------
+        int
+            The number of cases
+        """
+
+        return self._query_cases(id, exclude_types).count()
+
+    def get_cases_page(self, id: int, page: int, per_page: int, exclude_types=()) -> List[Case]:
+        """Return one page of the cases of a user, newest first. Only the cases on that page
+        are read from the database. Cases are ordered by case ID, so a case whose reason
+        was edited (which updates its date) keeps its place.
+
+        Parameters
+        ----------
+        id : int
+            The user whose cases we want to look up.
+        page : int
+            The page to return, starting at 0
+        per_page : int
+            The number of cases on each page
+        exclude_types : Iterable[str], optional
+            Case types that should be left out, i.e ("UNMUTE",)
+
+        Returns
+        -------
+        List[Case]
+            The cases on the page
+        """
+
+        query = self._query_cases(id, exclude_types).order_by('-case._id')
+        return [entry.case for entry in query.skip(page * per_page).limit(per_page)]
+
+    def get_case(self, id: int, case_id: int) -> Case:
+        """Return the case with ID `case_id` of the user whose ID is `id`, or None if there isn't one.
+        """
+
+        try:
+            case_id = int(case_id)
+        except ValueError:
+            return None
+
+        entry = CaseEntry.objects(user_id=id, case___id=case_id).first()
+        if entry is None:
+            return None
+        return entry.case
+
+    def get_warns(self, id: int) -> List[Case]:
+        """Return the warns of a user that haven't been lifted yet, newest case ID first.
+        """
+
+        query = CaseEntry.objects(user_id=id, case___type="WARN", case__lifted__ne=True)
+        return sorted((entry.case for entry in query), key=lambda case: case._id, reverse=True)
+
+    def update_case(self, id: int, case: Case) -> None:
+        """Writes back a case of the user whose ID is `id` after it was modified.
+        """
+
+        CaseEntry.objects(user_id=id, case___id=case._id).update_one(set__case=case)
+
     def add_case(self, _id: int, case: Case) -> None:
-        """Cases holds all the cases for a particular user with id `_id` as an
-        EmbeddedDocumentListField. This function appends a given case object to
-        this list. If this user doesn't have any previous cases, we first add
-        a new Cases document to the database.
+        """Every case is stored as its own CaseEntry document, tagged with the ID of the user
+        it belongs to. This function stores a given case object for a user.
 
         Parameters
         ----------
@@ -103,9 +405,65 @@ class UserService:
             The case we want to add to the user.
         """
 
-        # ensure this user has a cases document before we try to append the new case
-        self.get_cases(_id)
-        Cases.objects(_id=_id).update_one(push__cases=case)
+        entry = CaseEntry(user_id=_id, case=case)
+        with self._case_stats_lock:
+            entry.id = ObjectId()
+            self._case_writes_in_flight.add(entry.id)
+
+        try:
+            entry.save(force_insert=True)
+            with self._case_stats_lock:
+                hold = self._case_stats_cutoff is not None and entry.id > self._case_stats_cutoff
+                if hold:
+                    self._held_case_stats.append((case.mod_id, case.mod_tag, case.reason))
+            if not hold:
+                self._record_case_stats(case.mod_id, case.mod_tag, case.reason)
+        finally:
+            with self._case_stats_lock:
+                self._case_writes_in_flight.discard(entry.id)
+
+    def migrate_cases(self) -> int:
+        """Copies cases from the legacy layout, where each user had a Cases document
+        with an embedded list of cases, to one CaseEntry document per case.
+        Cases that were already copied are skipped, so this is safe to run again.
+
+        Returns
+        -------
+        int
+            The number of cases that were copied
+        """
+
+        migrated = 0
+        for legacy in Cases.objects(cases__0__exists=True).no_cache():
+            existing = set(entry.case._id for entry in CaseEntry.objects(user_id=legacy._id).only('case._id'))
+            entries = [CaseEntry(user_id=legacy._id, case=case) for case in legacy.cases if case._id not in existing]
+            if entries:
+                CaseEntry.objects.insert(entries, load_bulk=False)
+                migrated += len(entries)
+
+        return migrated
+
+    def update_case_stats(self, case: Case, old_reason: str) -> None:
+        """Moves a case between the precomputed statistics after its reason was edited.
+
+        Parameters
+        ----------
+        case : Case
+            The case, with its new reason
+        old_reason : str
+            The reason the case had before
+        """
+
+        self._record_case_stats(case.mod_id, case.mod_tag, old_reason, -1)
+        self._record_case_stats(case.mod_id, case.mod_tag, case.reason)
+
+    def _record_case_stats(self, mod_id: int, mod_tag: str, reason: str, count: int = 1) -> None:
+        CaseStat.objects(mod_id=mod_id, mod_tag=mod_tag, reason=normalize_case_reason(reason)).update_one(
+            inc__count=count, upsert=True)
+
+        for raid_type, raid_reason in RAID_CASE_REASONS.items():
+            if raid_reason in reason:
+                RaidStat.objects(_id=raid_type).update_one(inc__count=count, upsert=True)
 
     def set_warn_kicked(self, _id: int) -> None:
         """Set the `was_warn_kicked` field in the User object of the user, whose ID is given by `_id`,
@@ -125,7 +483,6 @@ class UserService:
 
     def rundown(self, id: int) -> list:
         """Return the 3 most recent cases of a user, whose ID is given by `id`
-        If the user doesn't have a Cases document in the database, first create that.
 
         Parameters
         ----------
@@ -134,28 +491,40 @@ class UserService:
 
         Returns
         -------
-        Cases
-            [description]
-        """
-
-        cases = Cases.objects(_id=id).first()
-        # first we ensure this user has a Cases document in the database before continuing
-        if cases is None:
-            cases = Cases()
-            cases._id = id
-            cases.save()
-            return []
-
-        cases = cases.cases
-        cases = filter(lambda x: x._type != "UNMUTE", cases)
-        cases = sorted(cases, key=lambda i: i['date'])
-        cases.reverse()
-        return cases[0:3]
-
-    def retrieve_birthdays(self, date):
-        return User.objects(birthday=date)
+        List[Case]
+            Up to 3 of the user's most recent cases, excluding unmutes
+        """
+
+        return self.get_cases_page(id, 0, 3, exclude_types=("UNMUTE",))
+
+    def get_birthday_calendar(self) -> Dict[Tuple[int, int], List[int]]:
+        """Return the IDs of the users who have a birthday set, by (month, day)
+
+        Users who are banned from birthdays are left out.
+
+        Returns
+        -------
+        Dict[Tuple[int, int], List[int]]
+            IDs of the users whose birthday is on each (month, day)
+        """
+
+        calendar = {}
+        # the range matches every user with a non-empty birthday, and can be answered from the birthday index
+        users = User._get_collection().find(
+            {"birthday": {"$gt": 0}, "birthday_excluded": {"$ne": True}}, {"birthday": 1})
+        for user in users:
+            if len(user["birthday"]) != 2:
+                continue
+
+            month, day = user["birthday"]
+            calendar.setdefault((month, day), []).append(user["_id"])
+
+        return calendar
     
     def transfer_profile(self, oldmember, newmember):
+        self.invalidate_xp(oldmember)
+        self.invalidate_xp(newmember)
+
         u = self.get_user(oldmember)
         u._id = newmember
         u.save()
@@ -165,65 +534,127 @@ class UserService:
         u2.level = 0
         u2.save()
         
-        cases = self.get_cases(oldmember)
-        cases._id = newmember
-        cases.save()
-        
-        cases2 = self.get_cases(oldmember)
-        cases2.cases = []
-        cases2.save()
+        case_count = CaseEntry.objects(user_id=oldmember).update(set__user_id=newmember)
+
+        if self.rank_index is not None:
+            self.rank_index.update(newmember, u.xp, u.level)
+            self.rank_index.update(oldmember, 0, 0)
         
-        return u, len(cases.cases)
+        return u, case_count
     
     def fetch_raids(self):
-        values = {}
-        values["Join spam"] = Cases.objects(cases__reason__contains="Join spam detected").count()
-        values["Join spam over time"] = Cases.objects(cases__reason__contains="Join spam over time detected").count()
-        values["Raid phrase"] = Cases.objects(cases__reason__contains="Raid phrase detected").count()
-        values["Ping spam"] = Cases.objects(cases__reason__contains="Ping spam").count()
-        values["Message spam"] = Cases.objects(cases__reason__contains="Message spam").count()
-        
-        return values
+        counts = {stat._id: stat.count for stat in RaidStat.objects()}
+        return {raid_type: counts.get(raid_type, 0) for raid_type in RAID_CASE_REASONS}
 
     def fetch_cases_by_mod(self, _id):
         values = {}
-        cases = Cases.objects(cases__mod_id=str(_id))
-        values["total"] = 0
-        cases = list(cases.all())
-        final_cases = []
-        for target in cases:
-            for case in target.cases:
-                if str(case.mod_id) == str(_id):
-                    final_cases.append(case)
-                    values["total"] += 1
-
-        def get_case_reason(reason):
-            string = reason.lower()
-            return ''.join(e for e in string if e.isalnum() or e == " ").strip()
-
-        case_reasons = [get_case_reason(case.reason) for case in final_cases if get_case_reason(case.reason) != "temporary mute expired"]
-        values["counts"] = sorted(Counter(case_reasons).items(), key=lambda item: item[1])
+        stats = list(CaseStat.objects(mod_id=_id, count__gt=0))
+        values["total"] = sum(stat.count for stat in stats)
+
+        case_reasons = Counter()
+        for stat in stats:
+            if stat.reason != "temporary mute expired":
+                case_reasons[stat.reason] += stat.count
+
+        values["counts"] = sorted(case_reasons.items(), key=lambda item: item[1])
         values["counts"].reverse()
         return values
 
     def fetch_cases_by_keyword(self, keyword):
         values = {}
-        cases = Cases.objects(cases__reason__contains=keyword)
-        cases = list(cases.all())
-        values["total"] = 0
-        final_cases = []
-
-        for target in cases:
-            for case in target.cases:
-                if keyword.lower() in case.reason:
-                    values["total"] += 1
-                    final_cases.append(case)
-
-        case_mods = [case.mod_tag for case in final_cases]
-        values["counts"] = sorted(Counter(case_mods).items(), key=lambda item: item[1])
+        stats = list(CaseStat.objects(reason__contains=normalize_case_reason(keyword), count__gt=0))
+        values["total"] = sum(stat.count for stat in stats)
+
+        case_mods = Counter()
+        for stat in stats:
+            case_mods[stat.mod_tag] += stat.count
+
+        values["counts"] = sorted(case_mods.items(), key=lambda item: item[1])
         values["counts"].reverse()
         return values
 
+    def backfill_case_stats(self) -> int:
+        """Rebuilds the raid and moderator case statistics from every case in the database.
+        Only needs to be run once, afterwards `add_case` keeps the statistics up to date.
+
+        The statistics are built in temporary collections that then replace the old ones,
+        so they are never missing while this runs. Cases are counted up to a cutoff ID;
+        the statistics of cases added later are held back and applied to the new
+        collections once they are in place, so no case is lost or counted twice.
+
+        Returns
+        -------
+        int
+            The number of cases that were counted
+        """
+
+        with self._case_stats_lock:
+            cutoff = self._case_stats_cutoff = ObjectId()
+            started_before_cutoff = set(self._case_writes_in_flight)
+
+        try:
+            total = self._rebuild_case_stats(cutoff, started_before_cutoff)
+        finally:
+            with self._case_stats_lock:
+                self._case_stats_cutoff = None
+                held, self._held_case_stats = self._held_case_stats, []
+
+            for mod_id, mod_tag, reason in held:
+                self._record_case_stats(mod_id, mod_tag, reason)
+
+        return total
+
+    def _rebuild_case_stats(self, cutoff: ObjectId, started_before_cutoff: set) -> int:
+        # cases that got their ID before the cutoff but aren't saved yet have to be
+        # in the database before counting, or neither the count nor `add_case` would have them
+        while True:
+            with self._case_stats_lock:
+                if not started_before_cutoff & self._case_writes_in_flight:
+                    break
+            time.sleep(0.05)
+
+        pipeline = [
+            {"$match": {"_id": {"$lte": cutoff}}},
+            {"$group": {
+                "_id": {"mod_id": "$case.mod_id", "mod_tag": "$case.mod_tag", "reason": "$case.reason"},
+                "count": {"$sum": 1}
+            }},
+        ]
+
+        case_stats = Counter()
+        raid_stats = Counter()
+        for group in CaseEntry.objects.aggregate(pipeline, allowDiskUse=True):
+            mod_id, mod_tag, reason = group["_id"].get("mod_id"), group["_id"].get("mod_tag"), group["_id"].get("reason") or ""
+            if mod_id is None:
+                continue
+
+            case_stats[(int(mod_id), mod_tag or str(mod_id), normalize_case_reason(reason))] += group["count"]
+            for raid_type, raid_reason in RAID_CASE_REASONS.items():
+                if raid_reason in reason:
+                    raid_stats[raid_type] += group["count"]
+
+        db = CaseStat._get_db()
+        case_stats_collection = db[f"{CaseStat._get_collection_name()}_backfill"]
+        case_stats_collection.drop()
+        case_stats_collection.create_index([("mod_id", 1), ("mod_tag", 1), ("reason", 1)], unique=True)
+        if case_stats:
+            case_stats_collection.insert_many([{"mod_id": mod_id, "mod_tag": mod_tag, "reason": reason, "count": count}
+                                               for (mod_id, mod_tag, reason), count in case_stats.items()])
+
+        raid_stats_collection = db[f"{RaidStat._get_collection_name()}_backfill"]
+        raid_stats_collection.drop()
+        if raid_stats:
+            raid_stats_collection.insert_many([{"_id": raid_type, "count": count} for raid_type, count in raid_stats.items()])
+
+        # renaming over the old collections replaces them atomically
+        case_stats_collection.rename(CaseStat._get_collection_name(), dropTarget=True)
+        if raid_stats:
+            raid_stats_collection.rename(RaidStat._get_collection_name(), dropTarget=True)
+        else:
+            RaidStat.drop_collection()
+
+        return sum(case_stats.values())
+
     def set_sticky_roles(self, _id: int, roles) -> None:
         self.get_user(_id)
         User.objects(_id=_id).update_one(set__sticky_roles=roles)
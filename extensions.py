@@ -26,6 +26,7 @@ initial_extensions = [
     "cogs.monitors.mod.unban_appeals",
     "cogs.monitors.utils.applenews",
     "cogs.monitors.utils.birthday",
+    "cogs.monitors.utils.channel_caches",
     "cogs.monitors.utils.jailbreak_monitors",
     "cogs.monitors.utils.xp",
 ]
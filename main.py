@@ -1,12 +1,13 @@
 import asyncio
 import os
+import signal
 import traceback
 import discord
 from discord.ext import commands
 from discord import app_commands
 from discord.app_commands import AppCommandError, Command, ContextMenu, CommandInvokeError, TransformerError
 from extensions import initial_extensions
-from utils import cfg, db, logger, GIRContext, BanCache, IssueCache, Tasks, RuleCache, init_client_session, scam_cache, get_ios_cfw
+from utils import cfg, db, logger, GIRContext, AuditLogCache, BanCache, IssueCache, Tasks, RuleCache, http_client, log_sink, scam_cache, get_appledb, warmup
 from utils.framework import PermissionsFailure, gatekeeper, find_triggered_filters
 from cogs.commands.context_commands import setup_context_commands
 
@@ -30,6 +31,7 @@ class Bot(commands.Bot):
         self.ban_cache = BanCache(self)
         self.issue_cache = IssueCache(self)
         self.rule_cache = RuleCache(self)
+        self.audit_log_cache = AuditLogCache(self)
 
         # force the config object and database connection to be loaded
         if cfg and db and gatekeeper:
@@ -43,7 +45,22 @@ class Bot(commands.Bot):
         setup_context_commands(self)
 
         self.tasks = Tasks(self)
-        await init_client_session()
+
+        # filled in on_ready, concurrently. The channel caches only fetch new
+        # messages, so they also catch up after every reconnect
+        warmup.register("bans", self.ban_cache.fetch_ban_cache)
+        warmup.register("issues", self.issue_cache.fetch_issue_cache, rerun_on_reconnect=True)
+        warmup.register("rules", self.rule_cache.fetch_rule_cache, rerun_on_reconnect=True)
+        warmup.register("scam_urls", scam_cache.fetch_scam_cache, rerun_on_reconnect=True)
+        warmup.register("appledb", get_appledb)
+
+    async def close(self):
+        # send buffered logs while the connection to Discord is still up
+        await log_sink.close()
+        await self.ban_cache.save()
+        await self.tasks.close()
+        await super().close()
+        await http_client.close()
 
 
 class MyTree(app_commands.CommandTree):
@@ -70,7 +87,7 @@ class MyTree(app_commands.CommandTree):
         else:
             command_name = command.name
 
-        db_user = user_service.get_user(interaction.user.id)
+        db_user = await user_service.aio.get_user(interaction.user.id)
 
         if db_user.command_bans.get(command_name):
             ctx = GIRContext(interaction)
@@ -156,14 +173,16 @@ async def on_ready():
         f'Logged in as: {bot.user.name} - {bot.user.id} ({discord.__version__})')
     logger.info(f'Successfully logged in and booted...!')
 
-    await bot.ban_cache.fetch_ban_cache()
-    await bot.issue_cache.fetch_issue_cache()
-    await bot.rule_cache.fetch_rule_cache()
-    await scam_cache.fetch_scam_cache()
-    await get_ios_cfw()
+    await warmup.run()
 
 async def main():
     async with bot:
+        try:
+            # shut down cleanly on SIGTERM (i.e docker stop) so cogs can flush their state
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(bot.close()))
+        except NotImplementedError:
+            pass
+
         await bot.start(os.environ.get("GIR_TOKEN"), reconnect=True)
 
 asyncio.run(main())
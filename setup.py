@@ -15,8 +15,9 @@ async def setup():
     # you should have this setup in the .env file beforehand
     guild._id          = int(os.environ.get("MAIN_GUILD_ID"))
 
-    # If you're re-running this script to update a value, set case_id
-    # to the last unused case ID or else it will start over from 1!
+    # only seeds the case ID counter (the "case_id" document in the counters
+    # collection) the first time a case is made. Afterwards case IDs come from that
+    # counter, so to change the next case ID, update its value instead of this.
     guild.case_id      = 1
 
     # you can fill these in if you want with IDs, or you ca use commands later
@@ -1,8 +1,13 @@
 from .config import *
 from .context import *
 from .database import *
+from .http import *
 from .fetchers import *
 from .logging import *
+from .logsink import *
 from .misc import *
+from .appledb import *
+from .repos import *
 from .cache import *
+from .warmup import *
 from .jobs import *
\ No newline at end of file
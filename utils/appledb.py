@@ -0,0 +1,370 @@
+import asyncio
+import json
+import sys
+import time
+import tracemalloc
+from itertools import groupby
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from .misc import transform_groups
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JAILBREAKABLE_DEVICE_TYPES = ['iPhone', 'iPod', 'iPad', 'Apple TV', 'Apple Watch', 'HomePod']
+
+
+def sort_versions(version):
+    version = f'{version.get("osStr")} {version.get("version")}'
+    v = version.split(' ')
+    try:
+        v[0] = list(map(int, v[1].split('.')))
+    except ValueError:
+        v[0] = [0]
+    return v
+
+
+def better_compatibility(current: Optional[dict], candidate: dict) -> bool:
+    """Whether `candidate` should be shown instead of `current` for a jailbreak,
+    preferring entries with the lowest priority set."""
+
+    if current is None:
+        return True
+    if current.get("priority") is None:
+        return candidate.get("priority") is not None
+    return candidate.get("priority") is not None and candidate.get("priority") < current.get("priority")
+
+
+class JailbreakMatrix:
+    """Which jailbreaks work on which device and build, precomputed from the
+    compatibility info of every jailbreak.
+
+    Builds are stored as small integers and device identifiers are interned,
+    so the matrix stays compact. For every (device, build) pair it holds the best
+    compatibility entry of each jailbreak that supports it, as (jailbreak index, entry index).
+    """
+
+    def __init__(self, jailbreaks: List[dict]):
+        self.jailbreaks = jailbreaks
+        self.builds: List[str] = []
+        self._build_ids: Dict[str, int] = {}
+        self._matrix: Dict[str, Dict[int, Dict[int, int]]] = {}
+
+        for jb_index, jb in enumerate(jailbreaks):
+            for entry_index, entry in enumerate(jb.get("compatibility") or []):
+                build_ids = [self._encode(build) for build in entry.get("firmwares") or []]
+                for device in entry.get("devices") or []:
+                    by_build = self._matrix.setdefault(sys.intern(device), {})
+                    for build_id in build_ids:
+                        best = by_build.setdefault(build_id, {})
+                        current = best.get(jb_index)
+                        if better_compatibility(jb.get("compatibility")[current] if current is not None else None, entry):
+                            best[jb_index] = entry_index
+
+    def _encode(self, build: str) -> int:
+        build_id = self._build_ids.get(build)
+        if build_id is None:
+            build_id = self._build_ids[build] = len(self.builds)
+            self.builds.append(sys.intern(build))
+        return build_id
+
+    def _entries(self, devices: List[str], build: str) -> Dict[int, int]:
+        build_id = self._build_ids.get(build)
+        if build_id is None:
+            return {}
+
+        best: Dict[int, int] = {}
+        for device in devices:
+            for jb_index, entry_index in self._matrix.get(device, {}).get(build_id, {}).items():
+                current = best.get(jb_index)
+                if current is None:
+                    best[jb_index] = entry_index
+                    continue
+
+                compatibility = self.jailbreaks[jb_index].get("compatibility")
+                if better_compatibility(compatibility[current], compatibility[entry_index]):
+                    best[jb_index] = entry_index
+                # on a tie the first compatibility entry wins, like a scan over the entries would pick
+                elif entry_index < current and not better_compatibility(compatibility[entry_index], compatibility[current]):
+                    best[jb_index] = entry_index
+
+        return best
+
+    def jailbreaks_for(self, devices: List[str], build: str) -> List[Tuple[dict, dict]]:
+        """Returns (jailbreak, best compatibility entry) for every jailbreak that works
+        on any of the given device identifiers on the given build."""
+
+        return [(self.jailbreaks[jb_index], self.jailbreaks[jb_index].get("compatibility")[entry_index])
+                for jb_index, entry_index in sorted(self._entries(devices, build).items())]
+
+    def is_jailbreakable(self, devices: List[str], build: str) -> bool:
+        build_id = self._build_ids.get(build)
+        return build_id is not None and any(self._matrix.get(device, {}).get(build_id) for device in devices)
+
+    def jailbreakable_builds(self, device: str) -> List[str]:
+        return [self.builds[build_id] for build_id in self._matrix.get(device, {})]
+
+
+class AppleDB:
+    """Lookup tables over the AppleDB data in main.json, built once per load
+    so that commands and autocompleters don't have to scan the raw lists.
+    """
+
+    def __init__(self, data: dict):
+        self.data = data
+
+        # devices by identifier (their "key")
+        self.devices: Dict[str, dict] = {}
+        for device in data.get("device") or []:
+            self.devices.setdefault(device.get("key"), device)
+
+        # device groups, looked up by lowercase name or by any of their device identifiers
+        self.groups: List[dict] = transform_groups(data.get("group") or [])
+        self._groups_by_name: Dict[str, dict] = {}
+        for group in self.groups:
+            self._groups_by_name.setdefault(group.get("name").lower(), group)
+        for group in self.groups:
+            for identifier in group.get("devices"):
+                self._groups_by_name.setdefault(identifier.lower(), group)
+
+        self.group_released: Dict[str, str] = {}
+        self.group_search_keys: Dict[str, List[str]] = {}
+        for group in self.groups:
+            self.group_released[group.get("name")] = self._release_of(group)
+            self.group_search_keys[group.get("name")] = [group.get("name").lower()] + [x.lower() for x in group.get("devices")]
+
+        # groups in the order the device autocompleters suggest them:
+        # newest first, then by device type and order within that type
+        devices = sorted(self.groups, key=lambda x: x.get('type') or "zzz")
+        self.groups_by_release: List[dict] = []
+        for _, group in groupby(devices, lambda x: x.get('type')):
+            group = list(group)
+            group.sort(key=lambda x: x.get('order'), reverse=True)
+            self.groups_by_release.extend(group)
+        self.groups_by_release.sort(key=lambda x: self.group_released[x.get("name")], reverse=True)
+
+        self.jailbreakable_groups_by_release: List[dict] = [
+            d for d in self.groups_by_release if any(x in (d.get("type") or "") for x in JAILBREAKABLE_DEVICE_TYPES)]
+
+        # firmwares
+        self.firmwares: List[dict] = data.get("ios") or []
+        self._firmwares_by_label: Dict[str, dict] = {}
+        self._firmwares_by_build: Dict[str, dict] = {}
+        self._firmwares_by_version: Dict[str, dict] = {}
+        self._firmwares_by_device: Dict[str, List[dict]] = {}
+        self._firmwares_by_device_version: Dict[Tuple[str, str], dict] = {}
+        for firmware in self.firmwares:
+            self._firmwares_by_label.setdefault(
+                f"{firmware.get('osStr')} {firmware.get('version')} ({firmware.get('build')})", firmware)
+            if firmware.get("uniqueBuild"):
+                self._firmwares_by_build.setdefault(firmware.get("uniqueBuild").lower(), firmware)
+            if firmware.get("version"):
+                self._firmwares_by_version.setdefault(firmware.get("version").lower(), firmware)
+            for identifier in firmware.get("devices") or []:
+                self._firmwares_by_device.setdefault(identifier, []).append(firmware)
+                if firmware.get("version"):
+                    self._firmwares_by_device_version.setdefault((identifier, firmware.get("version")), firmware)
+
+        for identifier, firmwares in self._firmwares_by_device.items():
+            firmwares.sort(key=sort_versions, reverse=True)
+
+        # iOS and iPadOS releases, newest first
+        ios_releases = [v for v in self.firmwares if v.get('osStr') in ["iOS", "iPadOS"] and v.get('build') is not None]
+        ios_releases.sort(key=lambda x: str(x.get("released") or "1970-01-01"), reverse=True)
+        self.ios_releases: List[dict] = [v for v in ios_releases if not v.get('beta')]
+        self.ios_beta_releases: List[dict] = [v for v in ios_releases if v.get('beta')]
+
+        # jailbreaks and bypasses, sorted by name
+        self.jailbreaks: List[dict] = sorted(data.get("jailbreak") or [], key=lambda x: x["name"].lower())
+        self._jailbreaks_by_name: Dict[str, dict] = {}
+        for jailbreak in data.get("jailbreak") or []:
+            self._jailbreaks_by_name.setdefault(jailbreak.get("name").lower(), jailbreak)
+
+        self.bypasses: List[dict] = sorted(data.get("bypass") or [], key=lambda x: x.get("name").lower())
+
+        self.jailbreak_matrix = JailbreakMatrix(self.jailbreaks)
+
+    def _release_of(self, group: dict) -> str:
+        device = self.devices.get(group.get("devices")[0]) if group.get("devices") else None
+        if device is None:
+            return "-1"
+
+        released = device.get('released') or '-1'
+        if isinstance(released, list):
+            released = released[0]
+        return str(released)
+
+    def find_group(self, name: str) -> Optional[dict]:
+        """Returns the device group with the given name or device identifier, case insensitive."""
+
+        return self._groups_by_name.get(name.lower())
+
+    def find_jailbreak(self, name: str) -> Optional[dict]:
+        return self._jailbreaks_by_name.get(name.lower())
+
+    def find_firmware(self, version: str, beta: bool = False) -> Optional[dict]:
+        """Returns the firmware matching a label like "iOS 16.0 (20A362)", a build or a version."""
+
+        label = version
+        for os_version in ["iOS", "tvOS", "watchOS", "audioOS"]:
+            version = version.replace(os_version + " ", "")
+
+        candidates = [self._firmwares_by_label.get(label), self._firmwares_by_build.get(version.lower()),
+                      self._firmwares_by_version.get(version.lower())]
+        for firmware in candidates:
+            if firmware is not None and (not beta or firmware.get('beta')):
+                return firmware
+
+        if beta:
+            # the first firmware with this version might not be the beta one
+            version = version.lower()
+            for firmware in self.firmwares:
+                if firmware.get('beta') and (firmware.get('version') or "").lower() == version:
+                    return firmware
+
+    def firmwares_for_device(self, identifier: str) -> List[dict]:
+        """Returns the firmwares supported by a device, newest version first."""
+
+        return self._firmwares_by_device.get(identifier, [])
+
+    def find_firmware_on_device(self, identifier: str, version: str) -> Optional[dict]:
+        """Returns the firmware with the given version for a device, or with the given build for any device."""
+
+        for os_version in ["iOS", "tvOS", "watchOS"]:
+            version = version.replace(os_version + " ", "")
+
+        firmware = self._firmwares_by_device_version.get((identifier, version))
+        if firmware is not None:
+            return firmware
+
+        return self._firmwares_by_build.get(version.lower())
+
+    def jailbreakable_version_ranges(self, identifier: str) -> List[Tuple[dict, dict]]:
+        """Returns the ranges of firmwares a device can be jailbroken on, as (lowest, highest)
+        firmware pairs, newest range first. Firmwares the device supports but that can't be
+        jailbroken split the ranges.
+        """
+
+        builds = set(self.jailbreak_matrix.jailbreakable_builds(identifier))
+        ranges = []
+        current = None
+        for firmware in self.firmwares_for_device(identifier):
+            if firmware.get("build") in builds or firmware.get("uniqueBuild") in builds:
+                if current is None:
+                    current = [firmware, firmware]
+                    ranges.append(current)
+                else:
+                    current[0] = firmware
+            else:
+                current = None
+
+        return [tuple(r) for r in ranges]
+
+
+MAIN_JSON_PATH = Path("main.json")
+
+_appledb: AppleDB = None
+_appledb_stamp: Optional[Tuple[int, int]] = None
+_appledb_lock = asyncio.Lock()
+
+appledb_load_stats = {
+    "loads": 0,
+    "size": 0,
+    "parse_seconds": 0.0,
+    "index_seconds": 0.0,
+    "peak_memory": 0,
+}
+
+
+def _stamp_of(path: Path) -> Tuple[int, int]:
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        raise FileNotFoundError(f"The file {path} does not exist.")
+
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _load_appledb(path: Path) -> Tuple[AppleDB, dict]:
+    """Parses main.json and builds its index. Runs in a worker thread, so that
+    the event loop isn't blocked while a large dump is loaded.
+    """
+
+    started = time.perf_counter()
+    raw = path.read_bytes()
+
+    # peak memory of parsing and indexing only. Tracing is on just for these two steps,
+    # and left alone if something else (i.e a debugging session) is tracing already
+    trace = not tracemalloc.is_tracing()
+    if trace:
+        tracemalloc.start()
+    else:
+        tracemalloc.reset_peak()
+    try:
+        traced_before = tracemalloc.get_traced_memory()[0]
+        data = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        parsed = time.perf_counter()
+        appledb = AppleDB(data)
+        indexed = time.perf_counter()
+        peak = tracemalloc.get_traced_memory()[1] - traced_before
+    finally:
+        if trace:
+            tracemalloc.stop()
+
+    return appledb, {
+        "size": len(raw),
+        "parse_seconds": parsed - started,
+        "index_seconds": indexed - parsed,
+        "peak_memory": peak,
+    }
+
+
+async def get_appledb() -> AppleDB:
+    """Returns the AppleDB index for main.json.
+
+    The file is only parsed again when its modification time or size changed.
+    Parsing and indexing happen in a worker thread, and the new index replaces
+    the old one in a single assignment, so callers always see a complete dataset.
+
+    Returns
+    -------
+    AppleDB
+        The index over the current main.json
+
+    Raises
+    ------
+    FileNotFoundError
+        If main.json does not exist
+    """
+
+    global _appledb, _appledb_stamp
+
+    stamp = _stamp_of(MAIN_JSON_PATH)
+    if _appledb is not None and _appledb_stamp == stamp:
+        return _appledb
+
+    async with _appledb_lock:
+        # another caller might have reloaded it while we waited
+        stamp = _stamp_of(MAIN_JSON_PATH)
+        if _appledb is None or _appledb_stamp != stamp:
+            appledb, stats = await asyncio.to_thread(_load_appledb, MAIN_JSON_PATH)
+            _appledb, _appledb_stamp = appledb, stamp
+            appledb_load_stats.update(stats)
+            appledb_load_stats["loads"] += 1
+
+    return _appledb
+
+
+async def get_ios_cfw() -> dict:
+    """Gets all apps on ios.cfw.guide from a local JSON file.
+
+    Returns
+    -------
+    dict
+        "ios, jailbreaks, devices"
+    """
+
+    return (await get_appledb()).data
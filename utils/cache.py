@@ -1,86 +1,628 @@
+import asyncio
+import traceback
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
 import discord
 from utils.fetchers import fetch_scam_urls
 
 from .config import cfg 
 from .logging import logger
+from .snapshot import read_snapshot, read_snapshot_bytes, write_snapshot, write_snapshot_bytes
+
+
+class CompactIdSet:
+    """A set of user IDs stored as a sorted array of 64 bit integers,
+    which takes a fraction of the memory of a set of Python ints.
+
+    Changes go to small overlay sets, and are merged into the array by `compact`.
+    """
+
+    COMPACT_THRESHOLD = 10000
+
+    def __init__(self, ids: array = None):
+        self._ids = ids if ids is not None else array("Q")
+        self._added: Set[int] = set()
+        self._removed: Set[int] = set()
+
+    def __contains__(self, user_id: int) -> bool:
+        if user_id in self._added:
+            return True
+        if user_id in self._removed:
+            return False
+
+        i = bisect_left(self._ids, user_id)
+        return i < len(self._ids) and self._ids[i] == user_id
+
+    def __len__(self):
+        return len(self._ids) + len(self._added) - len(self._removed)
+
+    def add(self, user_id: int) -> None:
+        self._removed.discard(user_id)
+        if user_id not in self:
+            self._added.add(user_id)
+        self._compact_if_needed()
+
+    def discard(self, user_id: int) -> None:
+        self._added.discard(user_id)
+        if user_id in self:
+            self._removed.add(user_id)
+        self._compact_if_needed()
+
+    @property
+    def max_id(self) -> Optional[int]:
+        candidates = list(self._added)
+        if self._ids:
+            candidates.append(self._ids[-1])
+        return max(candidates) if candidates else None
+
+    def compact(self) -> None:
+        if not self._added and not self._removed:
+            return
+
+        # a linear merge of the sorted array with the (few) changes. The IDs in between
+        # are copied as array slices, so they never become Python ints
+        ids = self._ids
+        inserts = sorted(self._added)
+        # every removed ID is in the array, `add` and `discard` make sure of that
+        skips = sorted(bisect_left(ids, user_id) for user_id in self._removed)
+        skips.append(len(ids))
+
+        merged = array("Q")
+        start = k = 0
+        for skip in skips:
+            while k < len(inserts) and (skip == len(ids) or inserts[k] < ids[skip]):
+                cut = bisect_left(ids, inserts[k], start, skip)
+                merged.extend(ids[start:cut])
+                merged.append(inserts[k])
+                start = cut
+                k += 1
+            merged.extend(ids[start:skip])
+            start = skip + 1
+
+        self._ids = merged
+        self._added = set()
+        self._removed = set()
+
+    def _compact_if_needed(self) -> None:
+        if len(self._added) + len(self._removed) > self.COMPACT_THRESHOLD:
+            self.compact()
+
+    def to_bytes(self) -> bytes:
+        self.compact()
+        return self._ids.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CompactIdSet":
+        ids = array("Q")
+        ids.frombytes(data)
+        return cls(ids)
+
+    @classmethod
+    def from_ids(cls, ids: array) -> "CompactIdSet":
+        """Builds a set from an array of IDs. The IDs are expected to be mostly in ascending
+        order, as the API lists bans; the ones that aren't are merged in afterwards.
+        """
+
+        ascending = array("Q")
+        out_of_order = set()
+        for user_id in ids:
+            if not ascending or user_id > ascending[-1]:
+                ascending.append(user_id)
+            else:
+                out_of_order.add(user_id)
+
+        result = cls(ascending)
+        for user_id in out_of_order:
+            if user_id not in result:
+                result._added.add(user_id)
+        result.compact()
+        return result
 
 
 class BanCache:
+    """IDs of the users banned from the guild.
+
+    The ban list is streamed page by page into a CompactIdSet, and saved to a local
+    snapshot so the next start doesn't have to page through the whole list again.
+    The API lists bans by user ID rather than by ban date, so the only bans that can
+    be fetched incrementally are those of users newer than the newest one in the
+    snapshot; conveniently, that covers the accounts banned during a raid. When the
+    snapshot is older than a day, the whole list is fetched again in the background
+    to pick up anything else that changed while the bot was offline.
+    """
+
+    snapshot_name = "bans"
+    RECONCILE_AFTER = timedelta(days=1)
+
     def __init__(self, bot):
         self.bot = bot
-        self.cache = set()
+        self.cache = CompactIdSet()
+        # changes made while the ban list is being fetched, applied on top of the fetched list
+        self._pending: Optional[Dict[int, bool]] = None
+        self._reconcile_task: Optional[asyncio.Task] = None
+        self._loaded = False
 
     async def fetch_ban_cache(self):
         guild = self.bot.get_guild(cfg.guild_id)
-        the_list = [ban async for ban in guild.bans(limit=None)]
-        self.cache = {entry.user.id for entry in the_list}
+        if self._loaded:
+            # loading again means the list was marked stale (i.e after a long outage),
+            # so the snapshot and the incremental fetch can't be trusted
+            if self._reconcile_task is not None and not self._reconcile_task.done():
+                # already fetching the whole list
+                await self._reconcile_task
+            else:
+                await self._fetch_all(guild)
+            return
+
+        snapshot = await asyncio.to_thread(self._load_snapshot, guild.id)
+        if snapshot is None:
+            await self._fetch_all(guild)
+            self._loaded = True
+            return
+
+        cache, saved_at = snapshot
+        self.cache = cache
+        # users are listed by ID, so this only goes through accounts newer than the snapshot
+        kwargs = {"after": discord.Object(cache.max_id)} if cache.max_id is not None else {}
+        added = 0
+        async for entry in guild.bans(limit=None, **kwargs):
+            self.cache.add(entry.user.id)
+            added += 1
+
+        logger.info(f"Loaded {len(self.cache)} bans from the snapshot, {added} new")
+        self._loaded = True
+        if discord.utils.utcnow() - saved_at > self.RECONCILE_AFTER:
+            self._reconcile_task = asyncio.create_task(self._reconcile(guild))
+        elif added:
+            await self._save(guild.id)
+
+    async def _reconcile(self, guild: discord.Guild):
+        try:
+            await self._fetch_all(guild)
+        except Exception:
+            logger.error(f"Failed to reconcile the ban cache: {traceback.format_exc()}")
+
+    async def _fetch_all(self, guild: discord.Guild):
+        self._pending = {}
+        try:
+            ids = array("Q")
+            async for entry in guild.bans(limit=None):
+                ids.append(entry.user.id)
+
+            cache = await asyncio.to_thread(CompactIdSet.from_ids, ids)
+            for user_id, banned in self._pending.items():
+                if banned:
+                    cache.add(user_id)
+                else:
+                    cache.discard(user_id)
+            self.cache = cache
+        finally:
+            self._pending = None
+
+        logger.info(f"Fetched {len(self.cache)} bans")
+        await self._save(guild.id)
+
+    def _load_snapshot(self, guild_id: int):
+        meta = read_snapshot(self.snapshot_name)
+        data = read_snapshot_bytes(self.snapshot_name)
+        if meta is None or data is None:
+            return None
+
+        try:
+            cache = CompactIdSet.from_bytes(data)
+            if meta["guild_id"] != guild_id or meta["count"] != len(cache):
+                return None
+            return cache, datetime.fromisoformat(meta["saved_at"])
+        except (KeyError, TypeError, ValueError):
+            logger.warn("Ignoring malformed ban cache snapshot")
+            return None
+
+    async def _save(self, guild_id: int):
+        data = self.cache.to_bytes()
+        meta = {"guild_id": guild_id, "count": len(self.cache), "max_id": self.cache.max_id,
+                "saved_at": discord.utils.utcnow().isoformat()}
+
+        def write():
+            write_snapshot_bytes(self.snapshot_name, data)
+            write_snapshot(self.snapshot_name, meta)
+
+        try:
+            await asyncio.to_thread(write)
+        except OSError as e:
+            logger.error(f"Failed to save the ban cache snapshot: {e}")
+
+    async def save(self):
+        """Saves the current ban list, i.e before shutting down."""
+
+        guild = self.bot.get_guild(cfg.guild_id)
+        if guild is not None and self._pending is None:
+            await self._save(guild.id)
 
     def is_banned(self, user_id):
         return user_id in self.cache
 
     def ban(self, user_id):
         self.cache.add(user_id)
+        if self._pending is not None:
+            self._pending[user_id] = True
 
     def unban(self, user_id):
         self.cache.discard(user_id)
+        if self._pending is not None:
+            self._pending[user_id] = False
+
+
+class CachedMessage:
+    """The parts of a message that the channel caches need, in a form that can be saved to disk.
 
+    It has the same `id`, `embeds`, `components` and `jump_url` attributes as the
+    message it was made from, so it can be used in its place when reading it.
+    """
+
+    def __init__(self, guild_id: int, channel_id: int, id: int, embeds: List[dict], components: List[dict]):
+        self.guild_id = guild_id
+        self.channel_id = channel_id
+        self.id = id
+        self._embeds = embeds
+        self._components = components
+        self.embeds: List[discord.Embed] = [discord.Embed.from_dict(embed) for embed in embeds]
+
+    @classmethod
+    def from_message(cls, message: discord.Message) -> "CachedMessage":
+        return cls(message.guild.id, message.channel.id, message.id,
+                   [embed.to_dict() for embed in message.embeds], [component.to_dict() for component in message.components])
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CachedMessage":
+        return cls(data["guild_id"], data["channel_id"], data["id"], data["embeds"], data["components"])
+
+    def to_dict(self) -> dict:
+        return {"guild_id": self.guild_id, "channel_id": self.channel_id, "id": self.id,
+                "embeds": self._embeds, "components": self._components}
+
+    @property
+    def components(self) -> List[discord.ActionRow]:
+        return [discord.ActionRow(component) for component in self._components]
+
+    @property
+    def jump_url(self) -> str:
+        return f"https://discord.com/channels/{self.guild_id}/{self.channel_id}/{self.id}"
+
+
+class ChannelMessageCache:
+    """Base for caches built from the messages of one channel.
+
+    The messages that matter are saved to a local snapshot along with the ID of the last
+    message seen, so that after a restart or reconnect only newer messages are fetched.
+    New messages, edits and deletes are applied as they happen (see the ChannelCaches cog).
+    The whole history is only read again when a full rebuild is requested, the snapshot is
+    missing, or the channel changed.
+    """
+
+    snapshot_name: str = None
 
-class IssueCache():
     def __init__(self, bot):
         self.bot = bot
-        self.cache = {}
+        self.records: Dict[int, CachedMessage] = {}
+        self.channel_id: Optional[int] = None
+        self.last_message_id: Optional[int] = None
+        self._loaded = False
+        self._lock = asyncio.Lock()
+
+    def get_channel(self) -> Optional[discord.TextChannel]:
+        raise NotImplementedError
+
+    def accept(self, message: discord.Message) -> bool:
+        """Whether a message should be kept in the cache."""
+
+        raise NotImplementedError
+
+    def rebuild(self) -> None:
+        """Rebuilds the lookups from the cached messages."""
+
+        raise NotImplementedError
+
+    async def sync(self, full: bool = False) -> None:
+        async with self._lock:
+            channel = self.get_channel()
+            if channel is None:
+                return
+
+            if not self._loaded:
+                self._load()
+
+            if full or self.channel_id != channel.id or self.last_message_id is None:
+                records = {}
+                last_message_id = None
+                after = None
+            else:
+                records = dict(self.records)
+                last_message_id = self.last_message_id
+                after = discord.Object(self.last_message_id)
+
+            async for message in channel.history(limit=None, after=after, oldest_first=True):
+                last_message_id = max(message.id, last_message_id or 0)
+                if self.accept(message):
+                    records[message.id] = CachedMessage.from_message(message)
+
+            self.channel_id = channel.id
+            self.last_message_id = last_message_id
+            self.records = records
+            self.rebuild()
+            await self._save()
+
+    async def handle_message(self, message: discord.Message) -> None:
+        """Applies a new or edited message from the channel."""
+
+        if self.channel_id is None or message.channel.id != self.channel_id:
+            return
+
+        async with self._lock:
+            if self.accept(message):
+                self.records[message.id] = CachedMessage.from_message(message)
+            elif self.records.pop(message.id, None) is None:
+                return
+
+            self.last_message_id = max(message.id, self.last_message_id or 0)
+            self.rebuild()
+            await self._save()
+
+    async def handle_delete(self, channel_id: int, message_ids: Iterable[int]) -> None:
+        if self.channel_id is None or channel_id != self.channel_id:
+            return
+
+        async with self._lock:
+            removed = [self.records.pop(message_id, None) for message_id in message_ids]
+            if not any(removed):
+                return
+
+            self.rebuild()
+            await self._save()
+
+    def _sorted_records(self) -> List[CachedMessage]:
+        return [self.records[message_id] for message_id in sorted(self.records)]
+
+    def _load(self) -> None:
+        self._loaded = True
+        snapshot = read_snapshot(self.snapshot_name)
+        if snapshot is None:
+            return
+
+        try:
+            self.records = {record["id"]: CachedMessage.from_dict(record) for record in snapshot["messages"]}
+            self.channel_id = snapshot["channel_id"]
+            self.last_message_id = snapshot["last_message_id"]
+        except (KeyError, TypeError):
+            logger.warn(f"Ignoring malformed {self.snapshot_name} snapshot")
+            self.records = {}
+            self.channel_id = None
+            self.last_message_id = None
+
+    async def _save(self) -> None:
+        snapshot = {
+            "channel_id": self.channel_id,
+            "last_message_id": self.last_message_id,
+            "messages": [record.to_dict() for record in self._sorted_records()],
+        }
+        try:
+            await asyncio.to_thread(write_snapshot, self.snapshot_name, snapshot)
+        except OSError as e:
+            logger.error(f"Failed to save {self.snapshot_name} snapshot: {e}")
+
+
+class IssueCache(ChannelMessageCache):
+    snapshot_name = "common_issues"
+
+    def __init__(self, bot):
+        super().__init__(bot)
+        self._cache: Dict[str, CachedMessage] = {}
+        self.toc_message_ids: List[int] = []
+        # bumped whenever the set of issues changes
+        self.version = 0
+
+    @property
+    def cache(self):
+        return self._cache
+
+    @cache.setter
+    def cache(self, value):
+        self._cache = value
+        self.version += 1
 
     def __contains__(self, item):
         if item in self.cache:
             return True
 
-    async def fetch_issue_cache(self):
-        guild: discord.TextChannel = self.bot.get_guild(cfg.guild_id)
+    def get_channel(self):
+        guild = self.bot.get_guild(cfg.guild_id)
         if not guild:
-            return
+            return None
 
         channel = guild.get_channel(cfg.channels.common_issues)
         if channel is None:
             logger.warn("#rules-and-info channel not found! The /issue command will not work! Make sure to set `channel_common_issues` in the database if you want it.")
-            return
+        return channel
 
-        async for message in channel.history(limit=None, oldest_first=True):
-            if message.author.id != self.bot.user.id:
-                continue
+    def accept(self, message):
+        if message.author.id != self.bot.user.id:
+            return False
+        if not message.embeds or not message.embeds[0].footer.text:
+            return False
 
-            if not message.embeds:
-                continue
-
-            embed = message.embeds[0]
-            if not embed.footer.text:
-                continue
+        footer = message.embeds[0].footer.text
+        return footer.startswith("Submitted by") or footer.startswith("Table of Contents")
 
+    def rebuild(self):
+        cache = {}
+        toc_message_ids = []
+        for record in self._sorted_records():
+            embed = record.embeds[0]
             if embed.footer.text.startswith("Submitted by"):
-                self.cache[f"{embed.title}"] = message
+                cache[f"{embed.title}"] = record
             else:
-                continue
+                toc_message_ids.append(record.id)
+
+        self.toc_message_ids = toc_message_ids
+        self.cache = cache
+
+    async def fetch_issue_cache(self, full: bool = False):
+        await self.sync(full=full)
+
+
+class RuleCache(ChannelMessageCache):
+    snapshot_name = "rules"
 
-class RuleCache():
     def __init__(self, bot):
-        self.bot = bot
-        self.cache = {}
+        super().__init__(bot)
+        self.cache: Dict[str, discord.Embed] = {}
+        # bumped whenever the set of rules changes
+        self.version = 0
 
-    async def fetch_rule_cache(self):
-        guild: discord.TextChannel = self.bot.get_guild(cfg.guild_id)
+    def get_channel(self):
+        guild = self.bot.get_guild(cfg.guild_id)
         if not guild:
-            return
+            return None
 
         channel = guild.get_channel(cfg.channels.rules)
         if channel is None:
             logger.warn("#rules-and-info channel not found! The /rule command will not work! Make sure to set `channel_rules` in the database if you want it.")
+        return channel
+
+    def accept(self, message):
+        return bool(message.embeds)
+
+    def rebuild(self):
+        cache = {}
+        for record in self._sorted_records():
+            for embed in record.embeds:
+                cache[f"{embed.title}"] = embed
+
+        self.cache = cache
+        self.version += 1
+
+    async def fetch_rule_cache(self, full: bool = False):
+        await self.sync(full=full)
+
+
+class AuditLogCache:
+    """Recent audit log entries by action and target, fed by on_audit_log_entry_create.
+
+    Used to find out who kicked, banned or timed out a member without asking
+    the API. Entries are only kept for a few minutes, which is plenty to attribute the
+    member leave/ban/update event that goes with them.
+
+    The gateway event and the member event can arrive in either order, so a lookup
+    that misses first waits a moment for the entry. If it still isn't there, the recent
+    entries for that action are fetched once; lookups for the same action share that
+    fetch, and it is skipped if another one just happened, so a mass leave doesn't
+    turn into one request per member.
+    """
+
+    # how long entries are kept
+    TTL = timedelta(minutes=5)
+    MAX_ENTRIES = 5000
+    # how long a lookup waits for the gateway event before fetching
+    WAIT_SECONDS = 2
+    # at most one fallback fetch per action in this many seconds
+    FETCH_COOLDOWN = 10
+    FETCH_LIMIT = 100
+
+    def __init__(self, bot):
+        self.bot = bot
+        self._entries: "OrderedDict[Tuple[discord.AuditLogAction, int], discord.AuditLogEntry]" = OrderedDict()
+        self._waiters: Dict[Tuple[discord.AuditLogAction, int], asyncio.Event] = {}
+        self._fetches: Dict[discord.AuditLogAction, asyncio.Task] = {}
+        self._fetched_at: Dict[discord.AuditLogAction, float] = {}
+
+    def add(self, entry: discord.AuditLogEntry) -> None:
+        target_id = getattr(entry.target, "id", None)
+        if target_id is None:
+            return
+
+        key = (entry.action, target_id)
+        current = self._entries.get(key)
+        if current is not None and current.created_at > entry.created_at:
             return
 
-        async for message in channel.history(limit=None, oldest_first=True):
-            if not message.embeds:
-                continue
-            
-            for embed in message.embeds:
-                self.cache[f"{embed.title}"] = embed
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.MAX_ENTRIES:
+            self._entries.popitem(last=False)
+
+        waiter = self._waiters.pop(key, None)
+        if waiter is not None:
+            waiter.set()
+
+    def get(self, action: discord.AuditLogAction, target_id: int) -> Optional[discord.AuditLogEntry]:
+        entry = self._entries.get((action, target_id))
+        if entry is None:
+            return None
+        if discord.utils.utcnow() - entry.created_at > self.TTL:
+            del self._entries[(action, target_id)]
+            return None
+        return entry
+
+    async def find(self, guild: discord.Guild, action: discord.AuditLogAction, target_id: int) -> Optional[discord.AuditLogEntry]:
+        """Returns the recent audit log entry for an action on a target, if there is one.
+
+        Parameters
+        ----------
+        guild : discord.Guild
+            "Guild the action happened in"
+        action : discord.AuditLogAction
+            "Action to look for"
+        target_id : int
+            "ID of the user the action was done to"
+
+        Returns
+        -------
+        discord.AuditLogEntry
+            "The entry, or None if the action wasn't done to the target recently"
+        """
+
+        entry = self.get(action, target_id)
+        if entry is not None:
+            return entry
+
+        key = (action, target_id)
+        waiter = self._waiters.setdefault(key, asyncio.Event())
+        try:
+            await asyncio.wait_for(waiter.wait(), timeout=self.WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            if self._waiters.get(key) is waiter:
+                del self._waiters[key]
+        else:
+            return self.get(action, target_id)
+
+        await self._fetch(guild, action)
+        return self.get(action, target_id)
+
+    async def _fetch(self, guild: discord.Guild, action: discord.AuditLogAction) -> None:
+        loop = asyncio.get_running_loop()
+        task = self._fetches.get(action)
+        if task is None:
+            fetched_at = self._fetched_at.get(action)
+            if fetched_at is not None and loop.time() - fetched_at < self.FETCH_COOLDOWN:
+                return
+
+            self._fetched_at[action] = loop.time()
+            task = self._fetches[action] = asyncio.create_task(self._fetch_recent(guild, action))
+            task.add_done_callback(lambda _: self._fetches.pop(action, None))
+
+        try:
+            await asyncio.shield(task)
+        except discord.HTTPException:
+            pass
+
+    async def _fetch_recent(self, guild: discord.Guild, action: discord.AuditLogAction) -> None:
+        after = discord.utils.utcnow() - self.TTL
+        async for entry in guild.audit_logs(limit=self.FETCH_LIMIT, action=action, after=after, oldest_first=False):
+            self.add(entry)
+
 
 class ScamCache:
     def __init__(self):
@@ -1,32 +1,19 @@
 import json
 import urllib
 
-from pathlib import Path
-
-import aiohttp
 from aiocache import cached
 
-client_session = None
-
-
-@cached(ttl=3600)
-async def get_ios_cfw():
-    """Gets all apps on ios.cfw.guide from a local JSON file.
+from .http import http_client
+from .request_cache import RequestCache
 
-    Returns
-    -------
-    dict
-        "ios, jailbreaks, devices"
-    """
+# searches are repeated a lot (i.e everyone looking up a new tweak at once),
+# so results are cached for a few minutes and served stale while refreshing
+canister_package_cache = RequestCache(maxsize=512, ttl=300, stale_ttl=3600, negative_ttl=60)
+canister_repo_cache = RequestCache(maxsize=128, ttl=300, stale_ttl=3600, negative_ttl=60)
 
-    json_file_path = Path("main.json")
 
-    if json_file_path.exists():
-        with json_file_path.open("r", encoding="utf-8") as file:
-            data = json.load(file)
-        return data
-    else:
-        raise FileNotFoundError(f"The file {json_file_path} does not exist.")
+def normalize_search_query(query: str) -> str:
+    return " ".join(query.lower().split())
 
 
 @cached(ttl=3600)
@@ -39,7 +26,7 @@ async def get_ipsw_firmware_info(version: str):
         "ios, jailbreaks, devices"
     """
 
-    async with client_session.get(f"https://api.ipsw.me/v4/ipsw/{version}") as resp:
+    async with http_client.session.get(f"https://api.ipsw.me/v4/ipsw/{version}") as resp:
         if resp.status == 200:
             data = await resp.json()
             return data
@@ -49,7 +36,7 @@ async def get_ipsw_firmware_info(version: str):
 
 @cached(ttl=600)
 async def get_dstatus_components():
-    async with client_session.get("https://discordstatus.com/api/v2/components.json") as resp:
+    async with http_client.session.get("https://discordstatus.com/api/v2/components.json") as resp:
         if resp.status == 200:
             components = await resp.json()
             return components
@@ -57,7 +44,7 @@ async def get_dstatus_components():
 
 @cached(ttl=600)
 async def get_dstatus_incidents():
-    async with client_session.get("https://discordstatus.com/api/v2/incidents.json") as resp:
+    async with http_client.session.get("https://discordstatus.com/api/v2/incidents.json") as resp:
         if resp.status == 200:
             incidents = await resp.json()
             return incidents
@@ -77,8 +64,13 @@ async def canister_search_package(query):
         "List of packages that Canister found matching the query"
 
     """
+    query = normalize_search_query(query)
+    return await canister_package_cache.get(query, lambda: _canister_search_package(query))
+
+
+async def _canister_search_package(query):
     ignored_repos = ["zodttd", "modmyi"]
-    async with client_session.get(f'https://api.canister.me/v2/jailbreak/package/search?q={urllib.parse.quote(query)}') as resp:
+    async with http_client.session.get(f'https://api.canister.me/v2/jailbreak/package/search?q={urllib.parse.quote(query)}') as resp:
         if resp.status == 200:
             response = json.loads(await resp.text())
             packages = response.get('data')
@@ -103,7 +95,12 @@ async def canister_search_repo(query):
 
     """
 
-    async with client_session.get(f'https://api.canister.me/v2/jailbreak/repository/search?q={urllib.parse.quote(query)}') as resp:
+    query = normalize_search_query(query)
+    return await canister_repo_cache.get(query, lambda: _canister_search_repo(query))
+
+
+async def _canister_search_repo(query):
+    async with http_client.session.get(f'https://api.canister.me/v2/jailbreak/repository/search?q={urllib.parse.quote(query)}') as resp:
         if resp.status == 200:
             response = json.loads(await resp.text())
             return response.get('data')
@@ -113,7 +110,7 @@ async def canister_search_repo(query):
 
 @cached(ttl=3600)
 async def canister_fetch_repos():
-    async with client_session.get('https://api.canister.me/v2/jailbreak/repository/ranking?rank=*') as resp:
+    async with http_client.session.get('https://api.canister.me/v2/jailbreak/repository/ranking?rank=*') as resp:
         if resp.status == 200:
             response = await resp.json(content_type=None)
             return response.get("data")
@@ -123,12 +120,8 @@ async def canister_fetch_repos():
 
 @cached(ttl=3600)
 async def fetch_scam_urls():
-    async with client_session.get("https://raw.githubusercontent.com/SlimShadyIAm/Anti-Scam-Json-List/main/antiscam.json") as resp:
+    async with http_client.session.get("https://raw.githubusercontent.com/SlimShadyIAm/Anti-Scam-Json-List/main/antiscam.json") as resp:
         if resp.status == 200:
             obj = json.loads(await resp.text())
             return obj
 
-
-async def init_client_session():
-    global client_session
-    client_session = aiohttp.ClientSession()
@@ -1,3 +1,4 @@
+from .autocomplete import *
 from .birthday import *
 from .checks import *
 from .cooldown import *
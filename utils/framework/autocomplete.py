@@ -0,0 +1,131 @@
+from bisect import bisect_left
+from typing import Callable, Dict, Hashable, Iterable, List, Sequence, Set, Tuple
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class AutocompleteIndex:
+    """Search index over the entries of one autocomplete source.
+
+    Entries are given as (name, value, keys) tuples in the order they should be suggested in.
+    The keys are the strings a query is matched against, i.e a timezone is matched both
+    with and without underscores. Keys are lowercased once, when the index is built.
+
+    Prefix lookups use a sorted array of keys. Substring lookups use an index from
+    trigrams to entries, so that only entries sharing every trigram of the query are checked.
+    The same trigram index is used to rank entries by similarity for typo tolerant lookups.
+    """
+
+    def __init__(self, entries: Iterable[Tuple[str, str, Sequence[str]]]):
+        self.entries: List[Tuple[str, str]] = []
+        self.keys: List[Tuple[str, ...]] = []
+        self._sorted_keys: List[Tuple[str, int]] = []
+        self._trigrams: Dict[str, Set[int]] = {}
+        self._trigram_counts: List[int] = []
+
+        for rank, (name, value, keys) in enumerate(entries):
+            keys = tuple(key.lower() for key in keys)
+            self.entries.append((name, value))
+            self.keys.append(keys)
+            entry_trigrams = set()
+            for key in keys:
+                self._sorted_keys.append((key, rank))
+                entry_trigrams |= _trigrams(key)
+
+            for trigram in entry_trigrams:
+                self._trigrams.setdefault(trigram, set()).add(rank)
+            self._trigram_counts.append(len(entry_trigrams))
+
+        self._sorted_keys.sort()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def prefix(self, query: str, limit: int = 25) -> List[Tuple[str, str]]:
+        """Returns up to `limit` entries with a key starting with `query`, in suggestion order."""
+
+        query = query.lower()
+        if not query:
+            return self.entries[:limit]
+
+        ranks = set()
+        i = bisect_left(self._sorted_keys, (query,))
+        while i < len(self._sorted_keys) and self._sorted_keys[i][0].startswith(query):
+            ranks.add(self._sorted_keys[i][1])
+            i += 1
+
+        return [self.entries[rank] for rank in sorted(ranks)[:limit]]
+
+    def search(self, query: str, limit: int = 25, fuzzy: bool = False) -> List[Tuple[str, str]]:
+        """Returns up to `limit` entries with a key containing `query`, in suggestion order.
+        If `fuzzy` is set and there are fewer matches than `limit`, the rest is filled with
+        the entries most similar to the query, so that typos still give suggestions.
+        """
+
+        query = query.lower()
+        if not query:
+            return self.entries[:limit]
+
+        if len(query) < 3:
+            candidates = range(len(self.entries))
+        else:
+            sets = sorted((self._trigrams.get(trigram, set()) for trigram in _trigrams(query)), key=len)
+            candidates = sorted(set.intersection(*sets)) if sets[0] else []
+
+        matches = []
+        for rank in candidates:
+            if any(query in key for key in self.keys[rank]):
+                matches.append(rank)
+                if len(matches) == limit:
+                    break
+
+        if fuzzy and len(matches) < limit and len(query) >= 3:
+            matches.extend(self._similar(query, limit - len(matches), exclude=set(matches)))
+
+        return [self.entries[rank] for rank in matches]
+
+    def _similar(self, query: str, limit: int, exclude: Set[int]) -> List[int]:
+        query_trigrams = _trigrams(query)
+        scores: Dict[int, int] = {}
+        for trigram in query_trigrams:
+            for rank in self._trigrams.get(trigram, ()):
+                if rank not in exclude:
+                    scores[rank] = scores.get(rank, 0) + 1
+
+        def similarity(rank):
+            shared = scores[rank]
+            return shared / (len(query_trigrams) + self._trigram_counts[rank] - shared)
+
+        # require at least a third of the query's trigrams to be shared
+        threshold = max(1, len(query_trigrams) // 3)
+        ranked = sorted((rank for rank, score in scores.items() if score >= threshold),
+                        key=lambda rank: (-similarity(rank), rank))
+        return ranked[:limit]
+
+
+class AutocompleteIndexes:
+    """Holds one AutocompleteIndex per source (tags, memes, filter words...).
+
+    Each source passes a version along with a function that lists its entries.
+    An index is only rebuilt when the version of its own source changed,
+    so a lookup is usually just a search in an index that already exists.
+    """
+
+    def __init__(self):
+        self._indexes: Dict[str, Tuple[Hashable, AutocompleteIndex]] = {}
+
+    def get(self, source: str, version: Hashable, build: Callable[[], Iterable[Tuple[str, str, Sequence[str]]]]) -> AutocompleteIndex:
+        cached = self._indexes.get(source)
+        if cached is None or cached[0] != version:
+            cached = (version, AutocompleteIndex(build()))
+            self._indexes[source] = cached
+
+        return cached[1]
+
+    def invalidate(self, source: str) -> None:
+        self._indexes.pop(source, None)
+
+
+autocomplete_indexes = AutocompleteIndexes()
@@ -1,5 +1,6 @@
 import string
-from typing import List
+from collections import deque
+from typing import Dict, List, Set
 
 import discord
 from data.model import FilterWord
@@ -7,40 +8,143 @@ from data.services import guild_service
 from fold_to_ascii import fold
 from utils.framework import gatekeeper
 
+cyrillic_lookalikes = (u"абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ",
+                       u"abBrdeex3nnKnmHonpcTyoxu4wwbbbeoRABBrDEEX3NNKNMHONPCTyOXU4WWbbbEOR")
 
-async def find_triggered_filters(input, member: discord.Member) -> List[FilterWord]:
+cyrillic_translation = {ord(a): ord(b) for a, b in zip(*cyrillic_lookalikes)}
+strip_punctuation = str.maketrans('', '', string.punctuation)
+
+
+class FilterMatcher:
+    """Aho-Corasick automaton over every filtered word, so that a message
+    can be checked against the whole filter list in a single pass.
+
+    Each word is added both as-is (lowercased) and with its whitespace removed,
+    matching the forms that ``find_triggered_filters`` used to test one by one.
     """
-    BAD WORD FILTER
+
+    def __init__(self, words: List[FilterWord]):
+        self.words = words
+        self.entries = []
+
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[Set[str]] = [set()]
+
+        for word in words:
+            word_lowercase = word.word.lower()
+            word_without_spaces = "".join(word_lowercase.split())
+            self.entries.append((word, word_lowercase, word_without_spaces))
+
+            self._add_pattern(word_lowercase)
+            self._add_pattern(word_without_spaces)
+
+        self._build_failure_links()
+
+    def _add_pattern(self, pattern: str) -> None:
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append(set())
+                self._goto[state][char] = next_state
+            state = next_state
+
+        self._output[state].add(pattern)
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] |= self._output[self._fail[next_state]]
+
+    def scan(self, text: str) -> Set[str]:
+        """Returns every pattern that occurs somewhere in `text`.
+
+        Parameters
+        ----------
+        text : str
+            The (already normalized) text to scan
+
+        Returns
+        -------
+        Set[str]
+            The patterns found in the text
+        """
+
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+
+        # the empty pattern is trivially contained in any string
+        found = set(output[0])
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found |= output[state]
+
+        return found
+
+
+_filter_matcher: FilterMatcher = None
+
+
+def get_filter_matcher(words: List[FilterWord]) -> FilterMatcher:
+    """Returns the automaton for the current filter list, only rebuilding it
+    when the list itself was replaced (i.e the filter words were modified).
     """
-    symbols = (u"абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ",
-               u"abBrdeex3nnKnmHonpcTyoxu4wwbbbeoRABBrDEEX3NNKNMHONPCTyOXU4WWbbbEOR")
 
-    tr = {ord(a): ord(b) for a, b in zip(*symbols)}
+    global _filter_matcher
+    if _filter_matcher is None or _filter_matcher.words is not words:
+        _filter_matcher = FilterMatcher(words)
+
+    return _filter_matcher
 
-    input_lowercase = fold(input.translate(tr).lower()).lower().strip(":")   
-    folded_without_spaces = "".join(input_lowercase.split())
-    folded_without_spaces_and_punctuation = folded_without_spaces.translate(
-        str.maketrans('', '', string.punctuation))
 
-    db_guild = guild_service.get_guild()
+async def find_triggered_filters(input, member: discord.Member) -> List[FilterWord]:
+    """
+    BAD WORD FILTER
+    """
+    input_lowercase = fold(input.translate(cyrillic_translation).lower()).lower().strip(":")   
+    folded_without_spaces = "".join(input_lowercase.split())
+    folded_without_spaces_and_punctuation = folded_without_spaces.translate(strip_punctuation)
 
     if not input_lowercase:
         return []
     # reported = False
 
+    matcher = get_filter_matcher(await guild_service.get_filtered_words())
+    found_in_input = matcher.scan(input_lowercase)
+    found_without_spaces = matcher.scan(folded_without_spaces)
+    found_without_spaces_and_punctuation = matcher.scan(folded_without_spaces_and_punctuation)
+
     words_found = []
-    for word in await guild_service.get_filtered_words():
-        if gatekeeper.has(member.guild, member, word.bypass):
-            continue
+    for word, word_lowercase, word_without_spaces in matcher.entries:
+        if (word_lowercase in found_in_input) or \
+            (not word.false_positive and word_lowercase in found_without_spaces) or \
+                (not word.false_positive and word_lowercase in found_without_spaces_and_punctuation or
+                    (not word.false_positive and word_without_spaces in found_without_spaces_and_punctuation)):
 
-        filter_word_without_spaces = "".join(word.word.lower().split())
-        if (word.word.lower() in input_lowercase) or \
-            (not word.false_positive and word.word.lower() in folded_without_spaces) or \
-                (not word.false_positive and word.word.lower() in folded_without_spaces_and_punctuation or
-                    (not word.false_positive and filter_word_without_spaces in folded_without_spaces_and_punctuation)):
+            if gatekeeper.has(member.guild, member, word.bypass):
+                continue
 
             # remove all whitespace, punctuation in message and run filter again
-            if word.false_positive and word.word.lower() not in input_lowercase.split():
+            if word.false_positive and word_lowercase not in input_lowercase.split():
                 continue
 
             if word.notify:
@@ -58,15 +162,9 @@ def has_only_silent_filtered_words(triggered_filter_words: List[FilterWord]):
 
 
 async def find_triggered_raid_phrases(input, member):
-    symbols = (u"абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ",
-               u"abBrdeex3nnKnmHonpcTyoxu4wwbbbeoRABBrDEEX3NNKNMHONPCTyOXU4WWbbbEOR")
-
-    tr = {ord(a): ord(b) for a, b in zip(*symbols)}
-
-    folded_message = fold(input.translate(tr).lower()).lower()
+    folded_message = fold(input.translate(cyrillic_translation).lower()).lower()
     folded_without_spaces = "".join(folded_message.split())
-    folded_without_spaces_and_punctuation = folded_without_spaces.translate(
-        str.maketrans('', '', string.punctuation))
+    folded_without_spaces_and_punctuation = folded_without_spaces.translate(strip_punctuation)
 
     if folded_message:
         for word in await guild_service.get_raid_phrases():
@@ -4,23 +4,19 @@ import discord
 import pytimeparse
 from discord import AppCommandOptionType, app_commands
 from discord.ext import commands
-from utils import get_ios_cfw, transform_groups
+from utils import get_appledb
 from utils.framework import PermissionsFailure
 
 
 async def get_device(value):
-    response = await get_ios_cfw()
-    device_groups = response.get("group")
+    appledb = await get_appledb()
+    device = appledb.find_group(value)
 
-    transformed_groups = transform_groups(device_groups)
-    devices = [group for group in transformed_groups if group.get(
-        'name').lower() == value.lower() or value.lower() in [x.lower() for x in group.get('devices')]]
-
-    if not devices:
+    if device is None:
         raise app_commands.TransformerError(
             "No device found with that name.")
 
-    return devices[0]
+    return device
 
 class DeviceTransformer(app_commands.Transformer):
     async def transform(self, interaction: discord.Interaction, value: str):
@@ -34,24 +30,16 @@ class VersionOnDevice(app_commands.Transformer):
             raise app_commands.TransformerError(
                 "No device found with that name.")
 
-        response = await get_ios_cfw()
-        if isinstance(device, str):
-            board = await get_device(device)
+        appledb = await get_appledb()
+        board = await get_device(device) if isinstance(device, str) else device
         board = board.get("devices")[0]
 
-        ios = response.get("ios")
-
-        # ios = [i for _, i in ios.items()]
-        version = value
-        for os_version in ["iOS", "tvOS", "watchOS"]:
-            version = version.replace(os_version + " ", "")
-        firmware = [v for v in ios if board in v.get(
-            'devices') and version == v.get('version') or version.lower() == v.get("uniqueBuild").lower()]
-        if not firmware:
+        firmware = appledb.find_firmware_on_device(board, value)
+        if firmware is None:
             raise app_commands.TransformerError(
                 "No firmware found with that version.")
 
-        return firmware[0]
+        return firmware
 
 
 class Duration(app_commands.Transformer):
@@ -0,0 +1,85 @@
+import asyncio
+from typing import Dict, Optional
+
+import aiohttp
+
+# connections are kept alive and reused across requests, and DNS lookups
+# are cached, so repeated requests to the same API skip the TCP/TLS handshake
+MAX_CONNECTIONS = 100
+MAX_CONNECTIONS_PER_HOST = 10
+KEEPALIVE_TIMEOUT = 30
+DNS_CACHE_TTL = 300
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=60, connect=10)
+
+
+class HttpClient:
+    """One pooled aiohttp session shared by the whole bot.
+
+    The session is created on first use, inside the running event loop. Requests
+    made through it are counted per host, along with their latency and errors,
+    using aiohttp's tracing hooks so callers don't have to do anything special.
+    """
+
+    def __init__(self):
+        self._session: Optional[aiohttp.ClientSession] = None
+        self.stats: Dict[str, Dict[str, float]] = {}
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            trace_config = aiohttp.TraceConfig()
+            trace_config.on_request_start.append(self._on_request_start)
+            trace_config.on_request_end.append(self._on_request_end)
+            trace_config.on_request_exception.append(self._on_request_exception)
+
+            connector = aiohttp.TCPConnector(limit=MAX_CONNECTIONS, limit_per_host=MAX_CONNECTIONS_PER_HOST,
+                                             keepalive_timeout=KEEPALIVE_TIMEOUT, ttl_dns_cache=DNS_CACHE_TTL)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=DEFAULT_TIMEOUT, trace_configs=[trace_config])
+
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    def _record(self, host: str, started: Optional[float], error: bool) -> None:
+        stats = self.stats.setdefault(host, {"requests": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+        stats["requests"] += 1
+        if error:
+            stats["errors"] += 1
+        if started is not None:
+            elapsed = asyncio.get_running_loop().time() - started
+            stats["total_seconds"] += elapsed
+            stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+
+    async def _on_request_start(self, session, context, params) -> None:
+        context.started = asyncio.get_running_loop().time()
+
+    async def _on_request_end(self, session, context, params) -> None:
+        self._record(params.url.host, getattr(context, "started", None), error=params.response.status >= 500)
+
+    async def _on_request_exception(self, session, context, params) -> None:
+        self._record(params.url.host, getattr(context, "started", None), error=True)
+
+    @property
+    def total_requests(self) -> int:
+        return sum(stats["requests"] for stats in self.stats.values())
+
+    @property
+    def total_errors(self) -> int:
+        return sum(stats["errors"] for stats in self.stats.values())
+
+    def average_latency(self, host: str = None) -> float:
+        """Returns the average request latency in seconds, for one host or for all of them."""
+
+        if host is not None:
+            stats = [self.stats[host]] if host in self.stats else []
+        else:
+            stats = list(self.stats.values())
+
+        requests = sum(s["requests"] for s in stats)
+        return sum(s["total_seconds"] for s in stats) / requests if requests else 0.0
+
+
+http_client = HttpClient()
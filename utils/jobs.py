@@ -1,31 +1,61 @@
-import os
+import asyncio
+import heapq
+import itertools
 import random
-from datetime import datetime, timedelta
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, List, Set, Tuple
 
 import discord
-from apscheduler.executors.pool import ThreadPoolExecutor
-from apscheduler.jobstores.mongodb import MongoDBJobStore
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from data.model import Case
-from data.services import guild_service, user_service
-
-from pytz import utc
+from data.services import guild_service, job_service, user_service
 
 from utils import cfg
+from utils.logging import scheduler_logger
 
-executors = {
-    'default': ThreadPoolExecutor(20)
-}
+BOT_GLOBAL = None
 
-job_defaults = {
-    # 'coalesce': True
-}
+# jobs that are more than this late when the bot starts are dropped instead of run
+MISFIRE_GRACE_SECONDS = 3600
+# the scheduler never sleeps longer than this, so a changed system clock is noticed
+MAX_SLEEP_SECONDS = 60
 
-BOT_GLOBAL = None
+
+class ConflictingJobError(Exception):
+    """Raised when scheduling a job whose ID is already pending."""
+
+
+class Job:
+    __slots__ = ("id", "kind", "run_at", "args")
+
+    def __init__(self, id: str, kind: str, run_at: datetime, args: list):
+        self.id = id
+        self.kind = kind
+        self.run_at = run_at
+        self.args = args
+
+
+def _to_utc(date: datetime) -> datetime:
+    """Naive datetimes are taken to be UTC, like the old APScheduler setup did."""
+
+    if date.tzinfo is None:
+        return date.replace(tzinfo=timezone.utc)
+    return date.astimezone(timezone.utc)
 
 
 class Tasks():
-    """Job scheduler for unmute, using APScheduler"""
+    """Job scheduler for unmutes, reminders, giveaways and birthday roles.
+
+    Pending jobs live in a heap ordered by run time, on the bot's event loop: a single
+    task sleeps until the earliest job is due and runs its coroutine directly, so the
+    cost of waiting doesn't grow with the number of pending jobs. Cancelled or rescheduled
+    jobs are skipped lazily when they reach the top of the heap.
+
+    Jobs are written to Mongo (see JobService) when they are scheduled and removed once
+    they ran or are cancelled. The store is only read once, at startup, to resume the
+    jobs that were pending when the bot stopped.
+    """
 
     def __init__(self, bot: discord.Client):
         """Initialize scheduler
@@ -40,21 +70,123 @@ class Tasks():
         global BOT_GLOBAL
         BOT_GLOBAL = bot
 
-        # logging.basicConfig()
-        # logging.getLogger('apscheduler').setLevel(logging.DEBUG)
+        self._jobs: Dict[str, Job] = {}
+        self._heap: List[Tuple[float, int, str]] = []
+        self._sequence = itertools.count()
+        self._wakeup = asyncio.Event()
+        # store writes in flight, so a job's deletion never overtakes its insertion
+        self._writes: Dict[str, asyncio.Task] = {}
+        self._running: Set[asyncio.Task] = set()
+        self._runner = asyncio.create_task(self._run())
+
+    def __len__(self):
+        return len(self._jobs)
+
+    async def close(self) -> None:
+        """Stops running jobs and waits for pending writes to the job store."""
 
-        if os.environ.get("DB_CONNECTION_STRING") is None:
-            jobstores = {
-                'default': MongoDBJobStore(database="botty", collection="jobs", host=os.environ.get("DB_HOST"), port=int(os.environ.get("DB_PORT"))),
-            }
-        else:
-            jobstores = {
-                'default': MongoDBJobStore(database="botty", collection="jobs", host=os.environ.get("DB_CONNECTION_STRING")),
-            }
+        self._runner.cancel()
+        if self._writes:
+            await asyncio.wait(list(self._writes.values()), timeout=10)
 
-        self.tasks = AsyncIOScheduler(
-            jobstores=jobstores, executors=executors, job_defaults=job_defaults, event_loop=bot.loop, timezone=utc)
-        self.tasks.start()
+    def schedule(self, job_id: str, kind: str, date: datetime, args: list, replace_existing: bool = False) -> None:
+        """Schedules the coroutine registered for `kind` to run with `args` at `date`.
+
+        Raises
+        ------
+        ConflictingJobError
+            If a job with the same ID is pending and `replace_existing` is False
+        """
+
+        if not replace_existing and job_id in self._jobs:
+            raise ConflictingJobError(job_id)
+
+        job = Job(job_id, kind, _to_utc(date), list(args))
+        self._add(job)
+        self._write(job_id, job_service.aio.save_job(job_id, kind, job.run_at, job.args))
+
+    def cancel(self, job_id: str) -> None:
+        if self._jobs.pop(job_id, None) is not None:
+            self._write(job_id, job_service.aio.delete_job(job_id))
+
+    def _add(self, job: Job) -> None:
+        self._jobs[job.id] = job
+        run_at = job.run_at.timestamp()
+        heapq.heappush(self._heap, (run_at, next(self._sequence), job.id))
+        if self._heap[0][2] == job.id:
+            # the new job is due before whatever the runner is waiting for
+            self._wakeup.set()
+
+    def _write(self, job_id: str, write: Awaitable) -> None:
+        previous = self._writes.get(job_id)
+
+        async def run():
+            if previous is not None:
+                await asyncio.wait([previous])
+            try:
+                await write
+            except Exception:
+                scheduler_logger.error(f"Failed to update stored job {job_id}: {traceback.format_exc()}")
+
+        task = asyncio.create_task(run())
+        self._writes[job_id] = task
+        task.add_done_callback(lambda t: self._writes.pop(job_id, None) if self._writes.get(job_id) is t else None)
+
+    async def load(self) -> None:
+        """Schedules the stored jobs that aren't pending yet, i.e on startup or after a migration."""
+
+        now = time.time()
+        dropped = 0
+        for stored in await job_service.aio.get_jobs():
+            if stored._id in self._jobs:
+                # rescheduled since the bot started
+                continue
+
+            job = Job(stored._id, stored.kind, _to_utc(stored.run_at), list(stored.args))
+            if job.run_at.timestamp() < now - MISFIRE_GRACE_SECONDS or job.kind not in JOB_CALLBACKS:
+                self._write(job.id, job_service.aio.delete_job(job.id))
+                dropped += 1
+                continue
+
+            self._add(job)
+
+        scheduler_logger.info(f"{len(self._jobs)} scheduled jobs pending, dropped {dropped} that missed their time")
+
+    async def _run(self) -> None:
+        try:
+            await self.load()
+        except Exception:
+            scheduler_logger.error(f"Failed to load scheduled jobs: {traceback.format_exc()}")
+
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                run_at, _, job_id = heapq.heappop(self._heap)
+                job = self._jobs.get(job_id)
+                if job is None or job.run_at.timestamp() != run_at:
+                    # cancelled or rescheduled
+                    continue
+
+                del self._jobs[job_id]
+                task = asyncio.create_task(self._fire(job))
+                self._running.add(task)
+                task.add_done_callback(self._running.discard)
+
+            delay = min(self._heap[0][0] - now, MAX_SLEEP_SECONDS) if self._heap else MAX_SLEEP_SECONDS
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(delay, 0))
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, job: Job) -> None:
+        try:
+            await JOB_CALLBACKS[job.kind](*job.args)
+        except Exception:
+            scheduler_logger.error(f"Scheduled job {job.id} failed: {traceback.format_exc()}")
+        finally:
+            if job.id not in self._jobs:
+                self._write(job.id, job_service.aio.delete_job(job.id))
 
     def schedule_untimeout(self, _id: int, date: datetime) -> None:
         """Create a task to unmute user given by ID `_id`, at time `date`
@@ -68,8 +200,7 @@ class Tasks():
 
         """
 
-        self.tasks.add_job(untimeout_callback, 'date', id=str(
-            _id), next_run_time=date, args=[_id], misfire_grace_time=3600)
+        self.schedule(f"untimeout:{_id}", "untimeout", date, [_id])
 
     def schedule_remove_bday(self, _id: int, date: datetime) -> None:
         """Create a task to remove birthday role from user given by ID `_id`, at time `date`
@@ -83,8 +214,7 @@ class Tasks():
 
         """
 
-        self.tasks.add_job(remove_bday_callback, 'date', id=str(
-            _id+1), next_run_time=date, args=[_id], misfire_grace_time=3600)
+        self.schedule(f"remove_bday:{_id}", "remove_bday", date, [_id])
 
     def cancel_unmute(self, _id: int) -> None:
         """When we manually unmute a user given by ID `_id`, stop the task to unmute them.
@@ -96,19 +226,7 @@ class Tasks():
 
         """
 
-        self.tasks.remove_job(str(_id), 'default')
-
-    def cancel_unmute(self, id: int) -> None:
-        """When we manually unmute a user given by ID `_id`, stop the task to unmute them.
-
-        Parameters
-        ----------
-        _id : int
-            User whose unmute task we want to cancel
-
-        """
-
-        self.tasks.remove_job(str(id), 'default')
+        self.cancel(f"untimeout:{_id}")
 
     def cancel_unbirthday(self, _id: int) -> None:
         """When we manually unset the birthday of a user given by ID `_id`, stop the task to remove the role.
@@ -119,7 +237,7 @@ class Tasks():
             User whose task we want to cancel
 
         """
-        self.tasks.remove_job(str(_id+1), 'default')
+        self.cancel(f"remove_bday:{_id}")
 
     def schedule_end_giveaway(self, channel_id: int, message_id: int, date: datetime, winners: int) -> None:
         """
@@ -136,8 +254,19 @@ class Tasks():
 
         """
 
-        self.tasks.add_job(end_giveaway_callback, 'date', id=str(
-            message_id+2), next_run_time=date, args=[channel_id, message_id, winners], misfire_grace_time=3600)
+        self.schedule(f"end_giveaway:{message_id}", "end_giveaway", date, [channel_id, message_id, winners])
+
+    def cancel_end_giveaway(self, message_id: int) -> None:
+        """When a giveaway is ended early, stop the task that would end it.
+
+        Parameters
+        ----------
+        message_id : int
+            Giveaway message ID
+
+        """
+
+        self.cancel(f"end_giveaway:{message_id}")
 
     def schedule_reminder(self, _id: int, guild: int, channel: int, reminder: str, date: datetime) -> None:
         """Create a task to remind someone of id `_id` of something `reminder` at time `date`
@@ -153,8 +282,7 @@ class Tasks():
 
         """
 
-        self.tasks.add_job(reminder_callback, 'date', id=str(
-            _id+random.randint(5, 100)), next_run_time=date, args=[_id, guild, channel, reminder], misfire_grace_time=3600)
+        self.schedule(f"remind:{_id}:{random.getrandbits(48)}", "remind", date, [_id, guild, channel, reminder])
 
     def schedule_remove_new_member_role(self, member_id: int) -> None:
         """Create a task to remove new member role from user given by ID `_id`, at time `date`
@@ -168,23 +296,8 @@ class Tasks():
 
         """
 
-        day_from_now = datetime.now() + timedelta(days=1)
-        self.tasks.add_job(remove_new_member_role_callback, 'date', id=str(
-            member_id+random.randint(100, 200)), next_run_time=day_from_now, args=[member_id], misfire_grace_time=3600)
-
-
-def untimeout_callback(_id: int) -> None:
-    """Callback function for actually unmuting. Creates asyncio task
-    to do the actual unmute.
-
-    Parameters
-    ----------
-    _id : int
-        User who we want to unmute
-
-    """
-
-    BOT_GLOBAL.loop.create_task(remove_timeout(_id))
+        day_from_now = datetime.now(timezone.utc) + timedelta(days=1)
+        self.schedule(f"remove_new_member_role:{member_id}", "remove_new_member_role", day_from_now, [member_id])
 
 
 async def remove_timeout(_id: int) -> None:
@@ -197,17 +310,14 @@ async def remove_timeout(_id: int) -> None:
 
     """
 
-    db_guild = guild_service.get_guild()
-
     case = Case(
-        _id=db_guild.case_id,
+        _id=guild_service.next_case_id(),
         _type="UNMUTE",
         mod_id=BOT_GLOBAL.user.id,
         mod_tag=str(BOT_GLOBAL.user),
         reason="Temporary mute expired.",
     )
-    guild_service.inc_caseid()
-    user_service.add_case(_id, case)
+    await user_service.aio.add_case(_id, case)
 
     guild = BOT_GLOBAL.get_guild(cfg.guild_id)
     user: discord.Member = guild.get_member(_id)
@@ -233,10 +343,6 @@ async def remove_timeout(_id: int) -> None:
     await public_chan.send(user.mention if not dmed else "", embed=log)
 
 
-def reminder_callback(id: int, guild: int, channel: int, reminder: str):
-    BOT_GLOBAL.loop.create_task(remind(id, guild, channel, reminder))
-
-
 async def remind(_id, guild_id, channel_id, reminder):
     """Remind the user callback
 
@@ -280,20 +386,6 @@ async def remind(_id, guild_id, channel_id, reminder):
 
 
 
-def remove_bday_callback(_id: int) -> None:
-    """Callback function for actually unmuting. Creates asyncio task
-    to do the actual unmute.
-
-    Parameters
-    ----------
-    _id : int
-        User who we want to unmute
-
-    """
-
-    BOT_GLOBAL.loop.create_task(remove_bday(_id))
-
-
 async def remove_bday(_id: int) -> None:
     """Remove the bday role of the user given by ID `_id`
 
@@ -317,22 +409,6 @@ async def remove_bday(_id: int) -> None:
     await user.remove_roles(bday_role)
 
 
-def end_giveaway_callback(channel_id: int, message_id: int, winners: int) -> None:
-    """
-    Callback function for ending a giveaway
-
-    Parameters
-    ----------
-    channel_id : int
-        ID of the channel that the giveaway is in
-    message_id : int
-        Message ID of the giveaway
-
-    """
-
-    BOT_GLOBAL.loop.create_task(end_giveaway(channel_id, message_id, winners))
-
-
 async def end_giveaway(channel_id: int, message_id: int, winners: int) -> None:
     """
     End a giveaway.
@@ -406,19 +482,6 @@ async def end_giveaway(channel_id: int, message_id: int, winners: int) -> None:
     else:
         await channel.send(f"Congratulations {', '.join(mentions)}! You won the giveaway of **{g.name}**! Please DM or contact <@{g.sponsor}> to collect.")
 
-def remove_new_member_role_callback(member_id: int) -> None:
-    """Callback function for actually removing new member role. Creates asyncio task
-    to do the actual removal.
-
-    Parameters
-    ----------
-    _id : int
-        User who we want to remove the role from
-
-    """
-
-    BOT_GLOBAL.loop.create_task(remove_new_member_role(member_id))
-
 async def remove_new_member_role(member_id: int) -> None:
     """Remove the new member role of the user given by ID `_id`
 
@@ -442,3 +505,13 @@ async def remove_new_member_role(member_id: int) -> None:
 
     user = guild.get_member(member_id)
     await user.remove_roles(new_member_role)
+
+
+# job kind -> coroutine that runs it
+JOB_CALLBACKS: Dict[str, Callable[..., Awaitable]] = {
+    "untimeout": remove_timeout,
+    "remind": remind,
+    "remove_bday": remove_bday,
+    "end_giveaway": end_giveaway,
+    "remove_new_member_role": remove_new_member_role,
+}
@@ -142,16 +142,19 @@ class Logger:
             discord_logger.addHandler(self.HNDLR)
             if not args.disable_webhook_logging:
                 discord_logger.addHandler(WebhookLogger())
+        # used by the job scheduler in utils.jobs
+        self.scheduler_logger = logging.getLogger('scheduler')
         if not args.disable_scheduler_logs:
-            ap_logger = logging.getLogger('apscheduler')
-            ap_logger.setLevel(logging.INFO)
-            ap_logger.addHandler(self.HNDLR)
+            self.scheduler_logger.setLevel(logging.INFO)
+            self.scheduler_logger.addHandler(self.HNDLR)
             if not args.disable_webhook_logging:
-                ap_logger.addHandler(WebhookLogger())
+                self.scheduler_logger.addHandler(WebhookLogger())
         self.logger = logging.Logger(__name__)
         self.logger.setLevel(logging.INFO)
         self.logger.addHandler(self.HNDLR)
         if not args.disable_webhook_logging:
             self.logger.addHandler(WebhookLogger())
         
-logger = Logger().logger
+_logger = Logger()
+logger = _logger.logger
+scheduler_logger = _logger.scheduler_logger
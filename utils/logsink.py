@@ -0,0 +1,149 @@
+import asyncio
+import traceback
+from collections import deque
+from typing import Deque, Dict, List
+
+import discord
+
+from .logging import logger
+
+# a message can hold at most 10 embeds, with at most 6000 characters between them
+LOG_BATCH_SIZE = 10
+LOG_BATCH_CHARACTERS = 6000
+# how long to wait for more embeds before sending a batch, in seconds.
+# It starts at the minimum and grows while sends are being throttled.
+MIN_FLUSH_INTERVAL = 0.5
+MAX_FLUSH_INTERVAL = 10
+# a send taking longer than this means discord.py waited for the channel's rate limit bucket
+THROTTLED_SEND_SECONDS = 1
+# past this many buffered embeds per channel, the oldest are dropped
+MAX_BUFFERED_EMBEDS = 2000
+
+
+class _ChannelBuffer:
+    def __init__(self, channel: discord.abc.Messageable):
+        self.channel = channel
+        self.embeds: Deque[discord.Embed] = deque(maxlen=MAX_BUFFERED_EMBEDS)
+        self.interval = MIN_FLUSH_INTERVAL
+        # how many of the next embeds to send one per message, after a batch was rejected
+        self.single = 0
+        self.lock = asyncio.Lock()
+        self.wakeup = asyncio.Event()
+        self.task: asyncio.Task = None
+
+
+class LogSink:
+    """Buffers log embeds per channel and sends them in messages of up to 10 embeds.
+
+    Each channel has its own worker that sends whatever is buffered a short interval
+    after the first embed arrives. The interval adapts to the channel's rate limit:
+    it doubles whenever a send was throttled and halves back when sends go through
+    right away, so a raid turns into a few full messages instead of thousands of single ones.
+
+    Urgent embeds (i.e bans) are sent immediately, together with anything already
+    buffered for that channel so the order of the log is kept.
+    """
+
+    def __init__(self):
+        self._buffers: Dict[int, _ChannelBuffer] = {}
+
+    def _buffer(self, channel: discord.abc.Messageable) -> _ChannelBuffer:
+        buffer = self._buffers.get(channel.id)
+        if buffer is None:
+            buffer = self._buffers[channel.id] = _ChannelBuffer(channel)
+        buffer.channel = channel
+
+        if buffer.task is None or buffer.task.done():
+            buffer.task = asyncio.create_task(self._worker(buffer))
+
+        return buffer
+
+    def send(self, channel: discord.abc.Messageable, embed: discord.Embed) -> None:
+        """Queues an embed to be logged in a channel."""
+
+        if channel is None:
+            return
+
+        buffer = self._buffer(channel)
+        buffer.embeds.append(embed)
+        buffer.wakeup.set()
+
+    async def send_urgent(self, channel: discord.abc.Messageable, embed: discord.Embed) -> None:
+        """Sends an embed right away, after anything already buffered for the channel."""
+
+        if channel is None:
+            return
+
+        buffer = self._buffer(channel)
+        buffer.embeds.append(embed)
+        await self._drain(buffer)
+
+    async def flush(self) -> None:
+        """Sends everything buffered, i.e before shutting down."""
+
+        for buffer in list(self._buffers.values()):
+            await self._drain(buffer)
+
+    async def close(self) -> None:
+        await self.flush()
+        for buffer in self._buffers.values():
+            if buffer.task is not None:
+                buffer.task.cancel()
+
+    async def _worker(self, buffer: _ChannelBuffer) -> None:
+        while True:
+            await buffer.wakeup.wait()
+            await asyncio.sleep(buffer.interval)
+            buffer.wakeup.clear()
+            try:
+                await self._drain(buffer)
+            except Exception:
+                logger.error(traceback.format_exc())
+
+    @staticmethod
+    def _take_batch(buffer: _ChannelBuffer) -> List[discord.Embed]:
+        if buffer.single:
+            buffer.single -= 1
+            return [buffer.embeds.popleft()]
+
+        batch = [buffer.embeds.popleft()]
+        characters = len(batch[0])
+        while buffer.embeds and len(batch) < LOG_BATCH_SIZE:
+            characters += len(buffer.embeds[0])
+            if characters > LOG_BATCH_CHARACTERS:
+                break
+            batch.append(buffer.embeds.popleft())
+
+        return batch
+
+    async def _drain(self, buffer: _ChannelBuffer) -> None:
+        loop = asyncio.get_running_loop()
+        async with buffer.lock:
+            while buffer.embeds:
+                batch = self._take_batch(buffer)
+                started = loop.time()
+                try:
+                    await buffer.channel.send(embeds=batch)
+                except discord.HTTPException as e:
+                    if e.status == 429:
+                        # still rate limited after discord.py's retries, try again later
+                        buffer.embeds.extendleft(reversed(batch))
+                        buffer.interval = min(buffer.interval * 2, MAX_FLUSH_INTERVAL)
+                        buffer.wakeup.set()
+                        return
+                    if len(batch) == 1:
+                        logger.error(f"Failed to send a log embed to {buffer.channel}: {e}")
+                        continue
+
+                    # one bad embed shouldn't lose the whole batch, so send them one at a time
+                    buffer.embeds.extendleft(reversed(batch))
+                    buffer.single = len(batch)
+                    continue
+
+                if loop.time() - started > THROTTLED_SEND_SECONDS:
+                    buffer.interval = min(buffer.interval * 2, MAX_FLUSH_INTERVAL)
+                else:
+                    buffer.interval = max(buffer.interval / 2, MIN_FLUSH_INTERVAL)
+
+
+log_sink = LogSink()
@@ -38,9 +38,7 @@ async def mute(ctx, target_member: discord.Member, mod: discord.Member, dur_seco
     else:
         time = now + timedelta(days=14)
 
-    db_guild = guild_service.get_guild()
     case = Case(
-        _id=db_guild.case_id,
         _type="MUTE",
         date=now,
         mod_id=mod.id,
@@ -60,8 +58,9 @@ async def mute(ctx, target_member: discord.Member, mod: discord.Member, dur_seco
     except Exception:
         return
 
-    guild_service.inc_caseid()
-    user_service.add_case(target_member.id, case)
+    # only take a case ID once the mute went through
+    case._id = await guild_service.aio.next_case_id()
+    await user_service.aio.add_case(target_member.id, case)
 
     log = prepare_mute_log(mod, target_member, case)
     await response_log(ctx, log)
@@ -89,7 +88,6 @@ async def unmute(ctx, target_member: discord.Member, mod: discord.Member, reason
     """
 
     await target_member.edit(timed_out_until=None)
-    db_guild = guild_service.get_guild()
 
     try:
         if isinstance(ctx, discord.Interaction):
@@ -100,14 +98,13 @@ async def unmute(ctx, target_member: discord.Member, mod: discord.Member, reason
         pass
 
     case = Case(
-        _id=db_guild.case_id,
+        _id=guild_service.next_case_id(),
         _type="UNMUTE",
         mod_id=mod.id,
         mod_tag=str(mod),
         reason=reason,
     )
 
-    guild_service.inc_caseid()
     user_service.add_case(target_member.id, case)
 
     log = prepare_unmute_log(mod, target_member, case)
@@ -118,10 +115,8 @@ async def unmute(ctx, target_member: discord.Member, mod: discord.Member, reason
 
 
 async def ban(ctx, target_member: Union[discord.Member, discord.User], mod: discord.Member, reason="No reason."):
-    db_guild = guild_service.get_guild()
-
     member_is_external = isinstance(target_member, discord.User)
-    log = await add_ban_case(target_member, mod, reason, db_guild)
+    log = await add_ban_case(target_member, mod, reason)
 
     if not member_is_external:
         if cfg.ban_appeal_url is None:
@@ -143,13 +138,11 @@ async def ban(ctx, target_member: Union[discord.Member, discord.User], mod: disc
 
 
 async def warn(ctx, target_member: discord.Member, mod: discord.Member, points, reason):
-    db_guild = guild_service.get_guild()
-
     reason = escape_markdown(reason)
 
     # prepare the case object for database
     case = Case(
-        _id=db_guild.case_id,
+        _id=guild_service.next_case_id(),
         _type="WARN",
         mod_id=mod.id,
         mod_tag=str(mod),
@@ -157,8 +150,6 @@ async def warn(ctx, target_member: discord.Member, mod: discord.Member, points,
         punishment=str(points)
     )
 
-    # increment case ID in database for next available case ID
-    guild_service.inc_caseid()
     # add new case to DB
     user_service.add_case(target_member.id, case)
     # add warnpoints to the user in DB
@@ -173,7 +164,7 @@ async def warn(ctx, target_member: discord.Member, mod: discord.Member, points,
     log.add_field(name="Current points", value=cur_points, inline=True)
 
     # also send response in channel where command was called
-    dmed = await notify_user_warn(ctx, target_member, mod, db_user, db_guild, cur_points, log)
+    dmed = await notify_user_warn(ctx, target_member, mod, db_user, cur_points, log)
     await response_log(ctx, log)
     await submit_public_log(ctx, target_member, log, dmed)
 
@@ -3,7 +3,6 @@ import discord
 
 from typing import Union
 from data.model.case import Case
-from data.model.guild import Guild
 from data.services.guild_service import guild_service
 from data.services.user_service import user_service
 from utils.context import GIRContext
@@ -12,7 +11,7 @@ from utils.mod.mod_logs import prepare_ban_log, prepare_kick_log
 from utils.config import cfg
 
 
-def add_kick_case(target_member: discord.Member, mod: discord.Member, reason: str, db_guild):
+def add_kick_case(target_member: discord.Member, mod: discord.Member, reason: str):
     """Adds kick case to user
 
     Parameters
@@ -23,21 +22,17 @@ def add_kick_case(target_member: discord.Member, mod: discord.Member, reason: st
         "Member that kicked"
     reason : str
         "Reason member was kicked"
-    db_guild
-        "Guild DB"
 
     """
     # prepare case for DB
     case = Case(
-        _id=db_guild.case_id,
+        _id=guild_service.next_case_id(),
         _type="KICK",
         mod_id=mod.id,
         mod_tag=str(mod),
         reason=reason,
     )
 
-    # increment max case ID for next case
-    guild_service.inc_caseid()
     # add new case to DB
     user_service.add_case(target_member.id, case)
 
@@ -63,7 +58,7 @@ async def notify_user(target_member, text, log):
     return True
 
 
-async def notify_user_warn(ctx: GIRContext, target_member: discord.Member, mod: discord.Member, db_user, db_guild, cur_points: int, log):
+async def notify_user_warn(ctx: GIRContext, target_member: discord.Member, mod: discord.Member, db_user, cur_points: int, log):
     """Notifies a specified user about a warn
 
     Parameters
@@ -76,8 +71,6 @@ async def notify_user_warn(ctx: GIRContext, target_member: discord.Member, mod:
         "User that warned"
     db_user
         "User DB"
-    db_guild
-        "Guild DB"
     cur_points : int
         "Number of points the user currently has"
     log : discord.Embed
@@ -94,7 +87,7 @@ async def notify_user_warn(ctx: GIRContext, target_member: discord.Member, mod:
         else:
             dmed = await notify_user(target_member, f"You were banned from {ctx.guild.name} for reaching 600 or more points.\n\nIf you would like to appeal your ban, please fill out this form: <{cfg.ban_appeal_url}>", log)
 
-        log_kickban = await add_ban_case(target_member, mod, "600 or more warn points reached.", db_guild)
+        log_kickban = await add_ban_case(target_member, mod, "600 or more warn points reached.")
         await target_member.ban(reason="600 or more warn points reached.")
 
         if isinstance(ctx, discord.Interaction):
@@ -107,7 +100,7 @@ async def notify_user_warn(ctx: GIRContext, target_member: discord.Member, mod:
         user_service.set_warn_kicked(target_member.id)
 
         dmed = await notify_user(target_member, f"You were kicked from {ctx.guild.name} for reaching 400 or more points. Please note that you will be banned at 600 points.", log)
-        log_kickban = add_kick_case(target_member, mod, "400 or more warn points reached.", db_guild)
+        log_kickban = add_kick_case(target_member, mod, "400 or more warn points reached.")
         await target_member.kick(reason="400 or more warn points reached.")
     else:
         if isinstance(target_member, discord.Member):
@@ -168,7 +161,7 @@ async def submit_public_log(ctx: GIRContext, user: Union[discord.Member, discord
             await public_chan.send(embed=log)
 
 
-async def add_ban_case(target_member: discord.Member, mod: discord.Member, reason, db_guild: Guild = None):
+async def add_ban_case(target_member: discord.Member, mod: discord.Member, reason):
     """Adds ban case to user
 
     Parameters
@@ -179,13 +172,11 @@ async def add_ban_case(target_member: discord.Member, mod: discord.Member, reaso
         "Member who was banned"
     reason : str
         "Reason member was banned"
-    db_guild
-        "Guild DB"
 
     """
     # prepare the case to store in DB
     case = Case(
-        _id=db_guild.case_id,
+        _id=guild_service.next_case_id(),
         _type="BAN",
         mod_id=mod.id,
         mod_tag=str(mod),
@@ -193,8 +184,6 @@ async def add_ban_case(target_member: discord.Member, mod: discord.Member, reaso
         reason=reason,
     )
 
-    # increment DB's max case ID for next case
-    guild_service.inc_caseid()
     # add case to db
     user_service.add_case(target_member.id, case)
     # prepare log embed to send to #public-mod-logs, user and context
@@ -0,0 +1,111 @@
+from typing import Dict, List, Optional, Set
+
+from .fetchers import canister_fetch_repos
+
+default_repos = [
+    "apt.bingner.com",
+    "apt.elucubratus.com",
+    "apt.procurs.us",
+    "table.nickchan.gq",
+    "ftp.sudhip.com/procursus",
+    "repo.quiprr.dev/procursus",
+    "apt.saurik.com",
+    "apt.oldcurs.us",
+    "repo.chimera.sh",
+    "diatr.us/apt",
+    "repo.theodyssey.dev",
+]
+
+
+def canonicalize_repo_url(url: str) -> str:
+    """Returns a repo URL as lowercase "host/path", without scheme, query,
+    fragment or trailing slashes, so that different spellings of the same repo compare equal.
+    """
+
+    url = url.strip().lower()
+    if "://" in url:
+        url = url.split("://", 1)[1]
+    for separator in "?#":
+        url = url.split(separator, 1)[0]
+    return url.rstrip("/")
+
+
+def _prefixes(canonical: str) -> List[str]:
+    """Returns the URL and every parent path of it, longest first."""
+
+    parts = canonical.split("/")
+    return ["/".join(parts[:i]) for i in range(len(parts), 0, -1)]
+
+
+_canonical_default_repos: Set[str] = {canonicalize_repo_url(repo) for repo in default_repos}
+
+
+def is_default_repo(url: str) -> bool:
+    """Whether a URL points to one of the default repos, or anything under one."""
+
+    return any(prefix in _canonical_default_repos for prefix in _prefixes(canonicalize_repo_url(url)))
+
+
+class RepoIndex:
+    """Canister's repos, looked up by canonical URL.
+
+    Most URLs sent in chat aren't repos, so the host is checked first;
+    only URLs on a host that has a repo go on to the full URL lookup.
+    """
+
+    def __init__(self, repos: Optional[List[dict]]):
+        self.repos = repos
+        self._by_uri: Dict[str, dict] = {}
+        self._by_host: Dict[str, List[dict]] = {}
+
+        for repo in repos or []:
+            if not repo.get("uri"):
+                continue
+
+            canonical = canonicalize_repo_url(repo.get("uri"))
+            self._by_uri.setdefault(canonical, repo)
+            self._by_host.setdefault(canonical.split("/", 1)[0], []).append(repo)
+
+    def __len__(self):
+        return len(self._by_uri)
+
+    def find(self, url: str, include_subpaths: bool = False) -> Optional[dict]:
+        """Returns the repo at the given URL.
+
+        Parameters
+        ----------
+        url : str
+            "URL to look up"
+        include_subpaths : bool
+            "Also match URLs pointing inside a repo, i.e to a file in it"
+
+        Returns
+        -------
+        dict
+            "The repo, or None if the URL isn't a known repo"
+        """
+
+        canonical = canonicalize_repo_url(url)
+        if canonical.split("/", 1)[0] not in self._by_host:
+            return None
+
+        if not include_subpaths:
+            return self._by_uri.get(canonical)
+
+        for prefix in _prefixes(canonical):
+            if prefix in self._by_uri:
+                return self._by_uri[prefix]
+
+
+_repo_index: RepoIndex = None
+
+
+async def get_repo_index() -> RepoIndex:
+    """Returns the index over Canister's repos, rebuilt only when the list was refetched."""
+
+    global _repo_index
+    repos = await canister_fetch_repos()
+    if _repo_index is None or _repo_index.repos is not repos:
+        _repo_index = RepoIndex(repos)
+
+    return _repo_index
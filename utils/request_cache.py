@@ -0,0 +1,102 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from .logging import logger
+
+
+class RequestCache:
+    """LRU cache for the results of remote lookups, such as searches.
+
+    - A result is fresh for `ttl` seconds. Empty results are cached too, but only
+      for `negative_ttl` seconds, so a new package shows up quickly once it exists.
+    - After that, a non-empty result is still returned for up to `stale_ttl` seconds
+      while it is refreshed in the background.
+    - Concurrent lookups for the same key share a single request. The request is
+      shielded, so a caller being cancelled (i.e an autocomplete that was superseded)
+      doesn't cancel it for the others.
+    - A fetch returning None is treated as an error and not cached.
+    """
+
+    def __init__(self, maxsize: int, ttl: float, stale_ttl: float, negative_ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+
+        self._entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.stale_hits + self.misses + self.coalesced
+        return (self.hits + self.stale_hits + self.coalesced) / total if total else 0.0
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        entry = self._entries.get(key)
+        if entry is not None:
+            fetched_at, value = entry
+            age = time.monotonic() - fetched_at
+            if age < (self.ttl if value else self.negative_ttl):
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return value
+
+            if value and age < self.stale_ttl:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                self._start(key, fetch)
+                return value
+
+            del self._entries[key]
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = self._start(key, fetch)
+
+        return await asyncio.shield(task)
+
+    def invalidate(self, key: str = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    def _start(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._run(key, fetch))
+            task.add_done_callback(self._log_error)
+            self._inflight[key] = task
+
+        return task
+
+    async def _run(self, key: str, fetch: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await fetch()
+            if value is not None:
+                self._entries[key] = (time.monotonic(), value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    def _log_error(task: asyncio.Task) -> None:
+        # background refreshes have nobody awaiting them, so their errors would be lost
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Request cache refresh failed: {task.exception()!r}")
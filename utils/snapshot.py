@@ -0,0 +1,53 @@
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from .logging import logger
+
+# local state that lets caches resume instead of being rebuilt from scratch on startup
+SNAPSHOT_DIR = Path(os.environ.get("GIR_SNAPSHOT_DIR", "snapshots"))
+
+
+def read_snapshot(name: str) -> Optional[dict]:
+    """Returns the snapshot with the given name, or None if there is none or it can't be read."""
+
+    path = SNAPSHOT_DIR / f"{name}.json"
+    try:
+        with path.open("r", encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warn(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+
+def write_snapshot(name: str, data: dict) -> None:
+    """Writes a snapshot atomically, so a crash mid-write never leaves a truncated file behind."""
+
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    path = SNAPSHOT_DIR / f"{name}.json"
+    tmp_path = path.with_suffix(".json.tmp")
+    with tmp_path.open("w", encoding="utf-8") as file:
+        json.dump(data, file, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+def read_snapshot_bytes(name: str) -> Optional[bytes]:
+    path = SNAPSHOT_DIR / f"{name}.bin"
+    try:
+        return path.read_bytes()
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        logger.warn(f"Ignoring unreadable snapshot {path}: {e}")
+        return None
+
+
+def write_snapshot_bytes(name: str, data: bytes) -> None:
+    SNAPSHOT_DIR.mkdir(parents=True, exist_ok=True)
+    path = SNAPSHOT_DIR / f"{name}.bin"
+    tmp_path = path.with_suffix(".bin.tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
@@ -1,5 +1,5 @@
 import re
-from itertools import groupby
+from itertools import islice
 from typing import List
 
 import discord
@@ -8,15 +8,17 @@ from data.model import Case
 from data.services import guild_service, user_service
 from discord import app_commands
 from discord.ext.commands import Command
-from utils import get_ios_cfw, transform_groups, canister_fetch_repos
-from utils.framework import MONTH_MAPPING, gatekeeper
+from utils import get_appledb, canister_fetch_repos
+from utils.framework import MONTH_MAPPING, autocomplete_indexes, gatekeeper
 
 
-def sort_versions(version):
-    version = f'{version.get("osStr")} {version.get("version")}'
-    v = version.split(' ')
-    v[0] = list(map(int, v[1].split('.')))
-    return v
+def alphanum_key(text):
+    def convert(part): return int(part) if part.isdigit() else part.lower()
+    return [convert(c) for c in re.split('([0-9]+)', text)]
+
+
+def to_choices(entries) -> List[app_commands.Choice[str]]:
+    return [app_commands.Choice(name=name, value=value) for name, value in entries]
 
 
 async def command_list_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
@@ -33,172 +35,87 @@ async def command_list_autocomplete(interaction: discord.Interaction, current: s
     return [app_commands.Choice(name=cmd, value=cmd) for cmd in commands if current.lower() in cmd.lower()][:25]
 
 
+def build_name_entries(names):
+    names = sorted(name.lower() for name in names)
+    return [(name, name, (name,)) for name in names]
+
+
 async def tags_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    tags = [tag.name.lower() for tag in guild_service.get_guild().tags]
-    tags.sort()
-    return [app_commands.Choice(name=tag, value=tag) for tag in tags if current.lower() in tag.lower()][:25]
+    store = guild_service.tag_store
+    index = autocomplete_indexes.get("tags", store.version, lambda: build_name_entries(store.names()))
+    return to_choices(index.search(current, fuzzy=True))
 
 
 async def memes_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    meme = [meme.name.lower() for meme in guild_service.get_guild().memes]
-    meme.sort()
-    return [app_commands.Choice(name=meme, value=meme) for meme in meme if current.lower() in meme.lower()][:25]
+    store = guild_service.meme_store
+    index = autocomplete_indexes.get("memes", store.version, lambda: build_name_entries(store.names()))
+    return to_choices(index.search(current, fuzzy=True))
 
 
 async def ios_version_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    versions = await get_ios_cfw()
-    if versions is None:
-        return []
-
-    versions = versions.get("ios")
-
-    versions = filter(lambda x: x.get('osStr') in ["iOS", "iPadOS"], versions)
-    versions = filter(lambda x: x.get('build') is not None, versions)
-    versions = list(versions)
-
-    versions.sort(key=lambda x: str(x.get("released")
-                  or "1970-01-01"), reverse=True)
-    return [app_commands.Choice(name=f"{v['osStr']} {v['version']} ({v['build']})", value=v["uniqueBuild"]) for v in versions if (current.lower() in v['version'].lower() or current.lower() in v['build'].lower()) and not v['beta']][:25]
+    appledb = await get_appledb()
+    current = current.lower()
 
+    return [app_commands.Choice(name=f"{v['osStr']} {v['version']} ({v['build']})", value=v["uniqueBuild"]) for v in appledb.ios_releases if current in v['version'].lower() or current in v['build'].lower()][:25]
 
 
 async def ios_beta_version_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    versions = await get_ios_cfw()
-    if versions is None:
-        return []
+    appledb = await get_appledb()
+    current = current.lower()
 
-    versions = versions.get("ios")
-    versions = filter(lambda x: x.get('osStr') in ["iOS", "iPadOS"], versions)
-    versions = filter(lambda x: x.get('build') is not None, versions)
-    versions = list(versions)
-    # versions = [v for _, v in versions.items()]
-    versions.sort(key=lambda x: x.get("released")
-                  or "1970-01-01", reverse=True)
-    return [app_commands.Choice(name=f"{v['osStr']} {v['version']} ({v['build']})", value=v["uniqueBuild"]) for v in versions if (current.lower() in v['version'].lower() or current.lower() in v['build'].lower()) and v['beta']][:25]
+    return [app_commands.Choice(name=f"{v['osStr']} {v['version']} ({v['build']})", value=v["uniqueBuild"]) for v in appledb.ios_beta_releases if current in v['version'].lower() or current in v['build'].lower()][:25]
 
 
 async def ios_on_device_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    cfw = await get_ios_cfw()
-    if cfw is None:
-        return []
-
-    ios = cfw.get("ios")
-    # ios = [i for _, i in ios.items()]
-    devices = cfw.get("group")
-    transformed_devices = transform_groups(devices)
+    appledb = await get_appledb()
     selected_device = interaction.namespace["device"]
 
     if selected_device is None:
         return []
-    matching_devices = [
-        d for d in transformed_devices if selected_device.lower() == d.get('name').lower() or any(selected_device.lower() == x.lower() for x in d.get("devices"))]
 
-    if not matching_devices:
+    matching_device = appledb.find_group(selected_device)
+    if matching_device is None:
         return []
 
-    matching_device = matching_devices[0].get("devices")[0]
-    matching_ios = [version for version in ios if matching_device in version.get(
-        'devices') and current.lower() in version.get('version').lower()]
+    matching_ios = appledb.firmwares_for_device(matching_device.get("devices")[0])
+    current = current.lower()
 
-    matching_ios.sort(key=sort_versions, reverse=True)
+    return [app_commands.Choice(name=f'{version.get("osStr")} {version.get("version")}', value=version.get("uniqueBuild") or version.get("build")) for version in matching_ios if current in version.get('version').lower()][:25]
 
-    return [app_commands.Choice(name=f'{version.get("osStr")} {version.get("version")}', value=version.get("uniqueBuild") or version.get("build")) for version in matching_ios][:25]
 
+def match_device_groups(appledb, groups, current: str):
+    current = current.lower()
+    for group in groups:
+        if any(current in key for key in appledb.group_search_keys[group.get("name")]):
+            yield group
 
-async def device_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    res = await get_ios_cfw()
-    if res is None:
-        return []
 
-    all_devices = res.get("group")
-    transformed_devices = transform_groups(all_devices)
-    devices = [d for d in transformed_devices if (any(current.lower() in x.lower(
-    ) for x in d.get('devices')) or current.lower() in d.get('name').lower())]
-
-    devices.sort(key=lambda x: x.get('type') or "zzz")
-    devices_groups = groupby(devices, lambda x: x.get('type'))
-
-    devices = []
-    for _, group in devices_groups:
-        group = list(group)
-        group.sort(key=lambda x: x.get('order'), reverse=True)
-        devices.extend(group)
-
-    all_devices = res.get("device")
-    for device in devices:
-        ident = device.get("devices")[0]
-        # detailed = all_devices.get(ident)
-        detailed = [ td for td in all_devices if td.get('identifer') == ident ]
-        if detailed:
-            detailed = detailed[0]
-            released = detailed.get('released') or '-1'
-            if isinstance(released, list):
-                released = released[0]
-            device['released'] = str(released)
-        else:
-            device['released'] = "-1"
+async def device_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    appledb = await get_appledb()
+    devices = match_device_groups(appledb, appledb.groups_by_release, current)
 
-    devices.sort(key=lambda x: x.get('released'), reverse=True)
-    return [app_commands.Choice(name=device.get('name'), value=device.get("devices")[0] if device.get("devices") else device.get("name")) for device in devices][:25]
+    return [app_commands.Choice(name=device.get('name'), value=device.get("devices")[0] if device.get("devices") else device.get("name")) for device in islice(devices, 25)]
 
 
 async def jailbreakable_device_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    res = await get_ios_cfw()
-    if res is None:
-        return []
+    appledb = await get_appledb()
+    devices = match_device_groups(appledb, appledb.jailbreakable_groups_by_release, current)
 
-    all_devices = res.get("group")
-    transformed_devices = transform_groups(all_devices)
-    devices = [d for d in transformed_devices if (any(current.lower() in x.lower(
-    ) for x in d.get('devices')) or current.lower() in d.get('name').lower())]
-
-    devices = [d for d in devices if any(x in d.get("type") for x in ['iPhone','iPod','iPad','Apple TV','Apple Watch','HomePod'])]
-
-    devices.sort(key=lambda x: x.get('type') or "zzz")
-    devices_groups = groupby(devices, lambda x: x.get('type'))
-
-    devices = []
-    for _, group in devices_groups:
-        group = list(group)
-        group.sort(key=lambda x: x.get('order'), reverse=True)
-        devices.extend(group)
-
-    all_devices = res.get("device")
-    for device in devices:
-        ident = device.get("devices")[0]
-        # detailed = all_devices.get(ident)
-        detailed = [ td for td in all_devices if td.get('identifer') == ident ]
-        if detailed:
-            detailed = detailed[0]
-            released = detailed.get('released') or '-1'
-            if isinstance(released, list):
-                released = released[0]
-            device['released'] = str(released)
-
-        else:
-            device['released'] = "-1"
-
-    devices.sort(key=lambda x: x.get('released'), reverse=True)
-    return [app_commands.Choice(name=device.get('name'), value=device.get("devices")[0] if device.get("devices") else device.get("name")) for device in devices][:25]
+    return [app_commands.Choice(name=device.get('name'), value=device.get("devices")[0] if device.get("devices") else device.get("name")) for device in islice(devices, 25)]
 
 
 async def jb_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    apps = await get_ios_cfw()
-    if apps is None:
-        return []
+    appledb = await get_appledb()
+    current = current.lower()
 
-    apps = apps.get("jailbreak")
-    # apps = [jb for _, jb in apps.items()]
-    apps.sort(key=lambda x: x["name"].lower())
-    return [app_commands.Choice(name=app["name"], value=app["name"]) for app in apps if app["name"].lower().startswith(current.lower())][:25]
+    return [app_commands.Choice(name=app["name"], value=app["name"]) for app in appledb.jailbreaks if app["name"].lower().startswith(current)][:25]
 
 
 async def bypass_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    data = await get_ios_cfw()
-    apps = data.get("bypass")
-    # apps = [app for _, app in bypasses.items()]
-    apps.sort(key=lambda x: x.get("name").lower())
-    return [app_commands.Choice(name=app.get("name"), value=app.get("bundleId")) for app in apps if current.lower() in app.get("name").lower()][:25]
+    appledb = await get_appledb()
+    current = current.lower()
+
+    return [app_commands.Choice(name=app.get("name"), value=app.get("bundleId")) for app in appledb.bypasses if current in app.get("name").lower()][:25]
 
 
 async def repo_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
@@ -212,20 +129,26 @@ async def repo_autocomplete(_: discord.Interaction, current: str) -> List[app_co
 
 
 async def issue_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    issue_titles = [issue for issue in interaction.client.issue_cache.cache]
-    issue_titles.sort(key=lambda issue: issue.lower())
-    return [app_commands.Choice(name=issue_title, value=issue_title) for issue_title in issue_titles if current.lower() in issue_title.lower()][:25]
+    issue_cache = interaction.client.issue_cache
+
+    def build():
+        issue_titles = sorted(issue_cache.cache, key=lambda issue: issue.lower())
+        return [(issue_title, issue_title, (issue_title,)) for issue_title in issue_titles]
+
+    index = autocomplete_indexes.get("issues", issue_cache.version, build)
+    return to_choices(index.search(current, fuzzy=True))
 
 
 async def rule_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    rule_titles = [(issue_title, issue.description) for issue_title,
-                   issue in interaction.client.rule_cache.cache.items()]
+    rule_cache = interaction.client.rule_cache
 
-    def convert(text): return int(text) if text.isdigit() else text.lower()
-    def alphanum_key(key): return [convert(c)
-                                   for c in re.split('([0-9]+)', key[0])]
-    rule_titles.sort(key=alphanum_key)
-    return [app_commands.Choice(name=f"{title} - {description}"[:100], value=title) for title, description in rule_titles if current.lower() in title.lower() or current.lower() in description.lower()][:25]
+    def build():
+        rule_titles = [(rule_title, rule.description or "") for rule_title, rule in rule_cache.cache.items()]
+        rule_titles.sort(key=lambda rule: alphanum_key(rule[0]))
+        return [(f"{title} - {description}"[:100], title, (title, description)) for title, description in rule_titles]
+
+    index = autocomplete_indexes.get("rules", rule_cache.version, build)
+    return to_choices(index.search(current))
 
 
 async def time_suggestions(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
@@ -246,22 +169,27 @@ async def filterwords_autocomplete(interaction: discord.Interaction, current: st
     if not gatekeeper.has(interaction.guild, interaction.user, 5):
         return []
 
-    words = [word.word for word in await guild_service.get_filtered_words()]
-    words.sort()
+    words = await guild_service.get_filtered_words()
+
+    def build():
+        return [(word, word, (word,)) for word in sorted(word.word for word in words)]
 
-    return [app_commands.Choice(name=word, value=word) for word in words if str(word).startswith(str(current))][:25]
+    index = autocomplete_indexes.get("filter_words", guild_service.snapshot_version, build)
+    return to_choices(index.prefix(current))
 
 
 async def warn_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
     if not gatekeeper.has(interaction.guild, interaction.user, 5):
         return []
 
-    cases: List[Case] = [case for case in user_service.get_cases(
-        int(interaction.namespace["member"].id)).cases if case._type == "WARN" and not case.lifted]
-    cases.sort(key=lambda x: x._id, reverse=True)
+    cases: List[Case] = await user_service.aio.get_warns(int(interaction.namespace["member"].id))
 
     return [app_commands.Choice(name=f"{case._id} - {case.punishment} points - {case.reason}", value=str(case._id)) for case in cases if (not current or str(case._id).startswith(str(current)))][:25]
 
 
 async def timezone_autocomplete(_: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
-    return [app_commands.Choice(name=tz, value=tz) for tz in pytz.common_timezones_set if current.lower() in tz.lower() or current.lower() in tz.replace("_", " ").lower()][:25]
+    def build():
+        return [(tz, tz, (tz, tz.replace("_", " "))) for tz in sorted(pytz.common_timezones_set)]
+
+    index = autocomplete_indexes.get("timezones", 0, build)
+    return to_choices(index.search(current))
@@ -3,7 +3,7 @@ import re
 from datetime import datetime
 
 import discord
-from utils import GIRContext
+from utils import GIRContext, default_repos
 from utils.framework import gatekeeper
 
 from .menu import Menu
@@ -12,21 +12,6 @@ url_pattern = re.compile(
     r"((http|https)\:\/\/)[a-zA-Z0-9\.\/\?\:@\-_=#]+\.([a-zA-Z]){2,6}([a-zA-Z0-9\.\&\/\?\:@\-_=#])*")
 
 
-default_repos = [
-    "apt.bingner.com",
-    "apt.elucubratus.com",
-    "apt.procurs.us",
-    "table.nickchan.gq",
-    "ftp.sudhip.com/procursus",
-    "repo.quiprr.dev/procursus",
-    "apt.saurik.com",
-    "apt.oldcurs.us",
-    "repo.chimera.sh",
-    "diatr.us/apt",
-    "repo.theodyssey.dev",
-]
-
-
 def tweak_embed_format(entry):
     titleKey = entry.get('name')
     description = discord.utils.escape_markdown(entry.get('description'))
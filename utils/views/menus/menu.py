@@ -1,13 +1,38 @@
 import inspect
-from typing import Callable, Union
+from math import ceil
+from typing import Awaitable, Callable, Union
 
 import discord
 from discord import ui
 from utils import GIRContext
 
 
+class LazyPages:
+    """Page source for a Menu whose entries are only fetched once a page is shown,
+    for when there are too many entries to load up front.
+
+    Parameters
+    ----------
+    total : int
+        "The total number of entries"
+    per_page : int
+        "The number of entries on each page"
+    fetch : Callable[[int], Awaitable[list]]
+        "Coroutine that returns the entries on the page with the given index, starting at 0"
+
+    """
+
+    def __init__(self, total: int, per_page: int, fetch: Callable[[int], Awaitable[list]]):
+        self.total = total
+        self.per_page = per_page
+        self.fetch = fetch
+
+    def __len__(self):
+        return max(1, ceil(self.total / self.per_page))
+
+
 class Menu(ui.View):
-    def __init__(self, ctx: GIRContext, entries: list, per_page: int, page_formatter: Callable[[GIRContext, list, int, list], None], whisper: bool, show_skip_buttons: bool = True, start_page=1, timeout_function=None):
+    def __init__(self, ctx: GIRContext, entries: Union[list, LazyPages], per_page: int, page_formatter: Callable[[GIRContext, list, int, list], None], whisper: bool, show_skip_buttons: bool = True, start_page=1, timeout_function=None):
         super().__init__(timeout=60)
 
         self.ctx = ctx
@@ -19,7 +44,10 @@ class Menu(ui.View):
             for i in range(0, len(lst), n):
                 yield lst[i:i + n]
 
-        self.pages = list(chunks(entries, per_page))
+        if isinstance(entries, LazyPages):
+            self.pages = entries
+        else:
+            self.pages = list(chunks(entries, per_page))
         self.per_page = per_page
         self.page_formatter = page_formatter
         self.whisper = whisper
@@ -41,11 +69,16 @@ class Menu(ui.View):
         if self.current_page in self.page_cache:
             return self.page_cache.get(self.current_page)
 
+        if isinstance(self.pages, LazyPages):
+            entries = await self.pages.fetch(self.current_page - 1)
+        else:
+            entries = self.pages[self.current_page - 1]
+
         if inspect.iscoroutinefunction(self.page_formatter):
-            embed = await self.page_formatter(self.ctx, self.pages[self.current_page - 1], self.current_page, self.pages)
+            embed = await self.page_formatter(self.ctx, entries, self.current_page, self.pages)
         else:
             embed = self.page_formatter(
-                self.ctx, self.pages[self.current_page - 1], self.current_page, self.pages)
+                self.ctx, entries, self.current_page, self.pages)
 
         self.page_cache[self.current_page] = embed
         return embed
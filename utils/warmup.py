@@ -0,0 +1,104 @@
+import asyncio
+import traceback
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from .logging import logger
+
+
+class WarmUp:
+    """Runs the loaders that fill the bot's caches when it connects.
+
+    All loaders run concurrently, so getting ready takes as long as the slowest one
+    instead of all of them added up. Each loader runs once per process: discord.py fires
+    on_ready again after a reconnect, and that only reruns the loaders registered with
+    `rerun_on_reconnect` (cheap incremental ones), the loaders marked stale, and the ones
+    that failed before.
+
+    Filters and commands that depend on a cache can check `is_ready` or `wait_ready`.
+    """
+
+    def __init__(self):
+        self._loaders: Dict[str, Callable[[], Awaitable]] = {}
+        self._rerun_on_reconnect: Set[str] = set()
+        self._ready: Dict[str, asyncio.Event] = {}
+        self._stale: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._runs = 0
+        self.durations: Dict[str, float] = {}
+        self.failures: Dict[str, str] = {}
+
+    def register(self, name: str, loader: Callable[[], Awaitable], rerun_on_reconnect: bool = False) -> None:
+        self._loaders[name] = loader
+        self._ready.setdefault(name, asyncio.Event())
+        self._stale.add(name)
+        if rerun_on_reconnect:
+            self._rerun_on_reconnect.add(name)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._loaders)
+
+    def mark_stale(self, *names: str) -> None:
+        """Makes the next run reload the given loaders, or all of them if none are given."""
+
+        self._stale.update(names or self._loaders)
+
+    def is_ready(self, name: str = None) -> bool:
+        """Whether a loader, or every loader if no name is given, has finished at least once."""
+
+        if name is not None:
+            return name in self._ready and self._ready[name].is_set()
+        return all(event.is_set() for event in self._ready.values())
+
+    async def wait_ready(self, name: str, timeout: float = None) -> bool:
+        """Waits for a loader to finish for the first time. Returns whether it did before the timeout."""
+
+        event = self._ready.setdefault(name, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+        return True
+
+    async def run(self) -> None:
+        if self._task is not None and not self._task.done():
+            await asyncio.shield(self._task)
+            return
+
+        if self._runs:
+            self._stale.update(self._rerun_on_reconnect)
+        names = [name for name in self._loaders if name in self._stale]
+        if not names:
+            return
+
+        self._runs += 1
+        self._task = asyncio.create_task(self._run(names))
+        await asyncio.shield(self._task)
+
+    async def _run(self, names) -> None:
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.gather(*(self._load(name) for name in names))
+
+        timings = ", ".join(f"{name} {self.durations[name]:.2f}s" for name in names)
+        logger.info(f"Warm-up finished in {loop.time() - started:.2f}s ({timings})")
+
+    async def _load(self, name: str) -> None:
+        loop = asyncio.get_running_loop()
+        self._stale.discard(name)
+        started = loop.time()
+        try:
+            await self._loaders[name]()
+        except Exception:
+            # try again on the next run
+            self._stale.add(name)
+            self.failures[name] = traceback.format_exc()
+            logger.error(f"Warm-up of {name} failed:\n{self.failures[name]}")
+        else:
+            self.failures.pop(name, None)
+            self._ready[name].set()
+        finally:
+            self.durations[name] = loop.time() - started
+
+
+warmup = WarmUp()